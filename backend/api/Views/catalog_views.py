@@ -0,0 +1,19 @@
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from ..utils.snapshot import reload_catalog
+
+
+@api_view(["POST"])
+@permission_classes([IsAdminUser])
+def reload_catalog_view(request):
+    """
+    Recompiles the catalog snapshot from the CSVs and swaps it in. Other
+    workers pick the new snapshot up through their file watch.
+    """
+    try:
+        catalog = reload_catalog(compile=True)
+    except Exception as e:
+        return Response({"error": "Catalog reload failed", "details": str(e)}, status=500)
+
+    return Response({"products": len(catalog), "stores": list(catalog.stores)})
@@ -0,0 +1,24 @@
+from django.http import JsonResponse
+from ..utils.health import readiness
+
+
+def health(request):
+    """
+    Liveness: the process is up and serving requests.
+    """
+    return JsonResponse({"status": "ok"})
+
+
+def ready(request):
+    """
+    Readiness: 200 once this worker has warmed up and its database and
+    cache answer, 503 until then. ?wait=N holds the request up to N seconds
+    (max 30) for the warm-up.
+    """
+    try:
+        wait = min(max(float(request.GET.get("wait", 0)), 0), 30)
+    except ValueError:
+        wait = 0
+
+    ok, details = readiness(wait)
+    return JsonResponse({"ready": ok, **details}, status=200 if ok else 503)
@@ -0,0 +1,80 @@
+from rest_framework.decorators import api_view, authentication_classes, throttle_classes
+from rest_framework.response import Response
+from ..utils.jobs import submit_job, get_job, start_workers
+from ..utils.recommend import recommendation_params, ingredients_params
+from ..utils.meal_plan import meal_plan_params
+from ..utils.budget import requester_of
+from ..utils.throttling import AI_AUTHENTICATION, ai_throttles
+
+
+def job_response(job, status=200):
+    return Response({
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "partial": job["partial"],
+        "result": job["result"],
+        "error": job["error"],
+        "created": job["created"],
+        "updated": job["updated"],
+    }, status=status)
+
+
+def request_payload(request):
+    return request.data.dict() if hasattr(request.data, "dict") else dict(request.data)
+
+
+@api_view(["POST"])
+@authentication_classes(AI_AUTHENTICATION)
+@throttle_classes(ai_throttles("recommendation"))
+def submit_recommendation_job(request):
+    """
+    Queues a recommendation (same body as generate/) and returns its job id.
+    """
+    _, error = recommendation_params(request.data)
+    if error:
+        return Response({"error": error}, status=400)
+
+    return job_response(submit_job("recommendation", request_payload(request), requester_of(request)), status=202)
+
+
+@api_view(["POST"])
+@authentication_classes(AI_AUTHENTICATION)
+@throttle_classes(ai_throttles("ingredients"))
+def submit_ingredients_job(request):
+    """
+    Queues ingredient generation (same body as generate/ingredients/) and returns its job id.
+    """
+    _, error = ingredients_params(request.data)
+    if error:
+        return Response({"error": error}, status=400)
+
+    return job_response(submit_job("ingredients", request_payload(request), requester_of(request)), status=202)
+
+
+@api_view(["POST"])
+@authentication_classes(AI_AUTHENTICATION)
+@throttle_classes(ai_throttles("meal_plan"))
+def submit_meal_plan_job(request):
+    """
+    Queues a meal plan (same body as generate/plan/) and returns its job id.
+    """
+    _, error = meal_plan_params(request.data)
+    if error:
+        return Response({"error": error}, status=400)
+
+    return job_response(submit_job("meal_plan", request_payload(request), requester_of(request)), status=202)
+
+
+@api_view(["GET"])
+def job_status(request, job_id):
+    """
+    Status, partial results and, once done, the result of a job.
+    """
+    job = get_job(job_id)
+    if job is None:
+        return Response({"error": "Job not found or expired."}, status=404)
+
+    # Make sure queued jobs get picked up even if this process hasn't submitted any
+    start_workers()
+    return job_response(job)
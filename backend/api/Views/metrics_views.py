@@ -0,0 +1,12 @@
+from django.http import HttpResponse
+from ..utils.tracing import prometheus_text
+from ..utils.upstream import upstream_metrics
+
+
+def metrics(request):
+    """
+    Span, request and job duration histograms and AI token counters of
+    this process, plus the shared AI circuit breaker and rate limiter
+    state, in the Prometheus text format.
+    """
+    return HttpResponse(prometheus_text() + upstream_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
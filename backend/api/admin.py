@@ -1,3 +1,16 @@
 from django.contrib import admin
+from .models import PriceObservation, AIUsage
 
-# Register your models here.
+
+@admin.register(PriceObservation)
+class PriceObservationAdmin(admin.ModelAdmin):
+    list_display = ("name", "quantity", "store", "price", "source", "observed_at")
+    list_filter = ("source", "store")
+    search_fields = ("name", "key")
+
+
+@admin.register(AIUsage)
+class AIUsageAdmin(admin.ModelAdmin):
+    list_display = ("requester", "day", "calls", "prompt_tokens", "output_tokens", "total_tokens")
+    list_filter = ("day",)
+    search_fields = ("requester",)
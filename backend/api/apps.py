@@ -1,26 +1,58 @@
+import logging
+import threading
 from django.apps import AppConfig
-from .utils.generate import generate, read_csv, check_loaded
+
+
+logger = logging.getLogger(__name__)
+
+_started = False
+_started_lock = threading.Lock()
+
+
+def start_services():
+    """
+    The server's background work, once per process. Called by the ASGI and
+    WSGI entrypoints (daphne workers, runserver), not by ApiConfig.ready(),
+    so migrate, check, test and other management commands don't compile
+    snapshots or start threads.
+    """
+    global _started
+    with _started_lock:
+        if _started:
+            return
+        _started = True
+
+    from django.conf import settings
+    from .utils.snapshot import load_catalog, start_watcher
+
+    # Map the compiled catalog snapshot once per process and pick up
+    # new snapshots without a restart
+    catalog = load_catalog()
+    logger.info("catalog is loaded (%d products)", len(catalog))
+    start_watcher()
+
+    from .utils.price_history import start_refresher
+
+    # Re-price popular ingredients before their prices go stale
+    start_refresher()
+
+    from .utils.ledger import start_flusher
+
+    # Per-user AI usage counters -> AIUsage rows
+    start_flusher()
+
+    from .utils.health import start_warm_up
+
+    # ready/ answers 200 once this is done
+    start_warm_up()
+
+    if settings.DISH_CACHE_WARM_ON_STARTUP:
+        from .utils.dish_cache import warm_dish_cache
+
+        # Don't hold up startup on AI calls
+        threading.Thread(target=warm_dish_cache, name="warm_dish_cache", daemon=True).start()
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
-    
-    def ready(self):
-            from django.conf import settings
-
-            # Only initialize cache if not already done
-            if not hasattr(settings, "CSV_CACHE"):
-                osave = read_csv("osave")
-                dali = read_csv("dali")
-                dti = read_csv("dti")
-
-                check_loaded(osave)
-                check_loaded(dali)
-                check_loaded(dti)
-
-                settings.CSV_CACHE = {
-                    "osave": osave,
-                    "dali": dali,
-                    "dti": dti
-                }
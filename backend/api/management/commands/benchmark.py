@@ -0,0 +1,181 @@
+import contextlib
+import io
+import json
+import platform
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory
+from api.Views.generate_views import generate_recommendation, generate_ingredients
+from api.utils.ai_client import AIClient, set_client
+from api.utils.catalog import get_catalog
+from api.utils.fake_model import FakeModel
+
+
+def int_list(value):
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def recommendation_payload(scenario, request_no, count, catalog_share, catalog_names):
+    """
+    count ingredients: catalog_share of them catalog products, the rest
+    names only the (fake) AI can price, unique per request so the caches
+    don't hide upstream calls.
+    """
+    from_catalog = int(round(count * catalog_share))
+    ingredients = [
+        {"name": catalog_names[(request_no * count + n) % len(catalog_names)], "quantity": "1 pc"}
+        for n in range(from_catalog)
+    ]
+    ingredients += [
+        {"name": f"bench {scenario} {request_no} item {n}", "quantity": "500 g"}
+        for n in range(count - from_catalog)
+    ]
+    return {"ingredients": ingredients, "people": 4, "budget": 100000}
+
+
+def ingredients_payload(scenario, request_no, count, catalog_share, catalog_names):
+    return {"dish": f"bench dish {scenario} {request_no}", "people": 4}
+
+
+# endpoint -> (view, path, payload builder)
+DRIVERS = {
+    "recommendation": (generate_recommendation, "/api/generate/", recommendation_payload),
+    "ingredients": (generate_ingredients, "/api/generate/ingredients/", ingredients_payload),
+}
+
+
+def percentiles(latencies):
+    values = np.array(latencies) * 1000
+    return {
+        "p50": round(float(np.percentile(values, 50)), 2),
+        "p95": round(float(np.percentile(values, 95)), 2),
+        "p99": round(float(np.percentile(values, 99)), 2),
+        "mean": round(float(values.mean()), 2),
+        "max": round(float(values.max()), 2),
+    }
+
+
+def git_commit():
+    try:
+        done = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=settings.BASE_DIR)
+        return done.stdout.strip() or None
+    except OSError:
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Offline benchmark of the generate endpoints against a fake Gemini model: "
+        "p50/p95/p99 latency, throughput, upstream calls and tokens per scenario, written as JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--endpoints", default="recommendation,ingredients")
+        parser.add_argument("--ingredients", type=int_list, default=[5, 20, 50], help="Ingredient counts, e.g. 5,20,50")
+        parser.add_argument("--concurrency", type=int_list, default=[1, 8], help="Concurrent clients, e.g. 1,8,32")
+        parser.add_argument("--requests", type=int, default=20, help="Requests per scenario")
+        parser.add_argument("--latency", type=float, default=0.3, help="Fake model latency (seconds)")
+        parser.add_argument("--jitter", type=float, default=0.1)
+        parser.add_argument("--failure-rate", type=float, default=0.0)
+        parser.add_argument("--catalog-share", type=float, default=0.5, help="Share of recommendation ingredients found in the catalog")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", default="benchmark.json")
+
+    def handle(self, *args, **options):
+        endpoints = [e.strip() for e in options["endpoints"].split(",") if e.strip()]
+        unknown = [e for e in endpoints if e not in DRIVERS]
+        if unknown:
+            self.stderr.write(f"Unknown endpoints: {', '.join(unknown)}")
+            return
+
+        catalog = get_catalog()
+        catalog_names = sorted(set(catalog.product))
+        factory = APIRequestFactory()
+        previous_client = set_client(None)
+
+        # A throwaway cache so results never leak into the real one, no
+        # price history (it would keep bench prices in the database) and no
+        # throttling of the one benchmark caller
+        with tempfile.TemporaryDirectory() as tmp, override_settings(CACHES={"default": {
+            "BACKEND": "api.utils.sqlite_cache.SQLiteCache",
+            "LOCATION": str(Path(tmp) / "cache.sqlite3"),
+        }}, PRICE_HISTORY_ENABLED=False, REST_FRAMEWORK={**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": {}}):
+            scenarios = []
+            try:
+                for endpoint in endpoints:
+                    view, path, build = DRIVERS[endpoint]
+                    for count in options["ingredients"]:
+                        for concurrency in options["concurrency"]:
+                            name = f"{endpoint}-{count}-{concurrency}"
+                            model = FakeModel(
+                                latency=options["latency"], jitter=options["jitter"],
+                                failure_rate=options["failure_rate"], ingredient_count=count, seed=options["seed"],
+                            )
+                            set_client(AIClient(
+                                "fake", timeout=settings.AI_TIMEOUT, attempts=settings.AI_ATTEMPTS,
+                                max_concurrency=settings.AI_GLOBAL_CONCURRENCY, model=model,
+                            ))
+                            cache.clear()
+
+                            def call(request_no):
+                                payload = build(name, request_no, count, options["catalog_share"], catalog_names)
+                                request = factory.post(path, payload, format="json")
+                                started = time.perf_counter()
+                                response = view(request)
+                                return time.perf_counter() - started, response.status_code
+
+                            started = time.perf_counter()
+                            # The app prints every AI reply; keep the report readable
+                            with contextlib.redirect_stdout(io.StringIO()):
+                                with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                                    outcomes = list(pool.map(call, range(options["requests"])))
+                            elapsed = time.perf_counter() - started
+
+                            latencies = [seconds for seconds, _ in outcomes]
+                            upstream = model.stats()
+                            result = {
+                                "name": name,
+                                "endpoint": endpoint,
+                                "ingredients": count,
+                                "concurrency": concurrency,
+                                "requests": len(outcomes),
+                                "errors": sum(1 for _, status in outcomes if status != 200),
+                                "latency_ms": percentiles(latencies),
+                                "throughput_rps": round(len(outcomes) / elapsed, 2),
+                                "upstream_calls": upstream["calls"],
+                                "upstream_failures": upstream["failures"],
+                                "upstream_calls_per_request": round(upstream["calls"] / len(outcomes), 2),
+                                "upstream_tokens_per_request": round(
+                                    (upstream["prompt_tokens"] + upstream["output_tokens"]) / len(outcomes), 1
+                                ),
+                            }
+                            scenarios.append(result)
+                            self.stdout.write(
+                                f"{name:<28} p50 {result['latency_ms']['p50']:>8.1f} ms  "
+                                f"p95 {result['latency_ms']['p95']:>8.1f} ms  p99 {result['latency_ms']['p99']:>8.1f} ms  "
+                                f"{result['throughput_rps']:>7.2f} req/s  {result['upstream_calls']:>4} upstream calls  "
+                                f"{result['errors']} errors"
+                            )
+            finally:
+                set_client(previous_client)
+
+        report = {
+            "commit": git_commit(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "options": {k: options[k] for k in (
+                "endpoints", "ingredients", "concurrency", "requests", "latency", "jitter",
+                "failure_rate", "catalog_share", "seed",
+            )},
+            "scenarios": scenarios,
+        }
+        Path(options["output"]).write_text(json.dumps(report, indent=2))
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(scenarios)} scenarios to {options['output']}"))
@@ -0,0 +1,72 @@
+import json
+import statistics
+import subprocess
+import sys
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+HEAVY_MODULES = ("pandas", "google.generativeai", "google.api_core", "grpc")
+
+# Boots Django the way a worker does and reports what that imported
+BOOT = """
+import json, os, sys, time
+started = time.perf_counter()
+for module in {eager!r}:
+    __import__(module)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+import backend.asgi
+print(json.dumps({{
+    "seconds": time.perf_counter() - started,
+    "heavy": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+def timed(command, cwd):
+    started = time.perf_counter()
+    done = subprocess.run(command, cwd=cwd, capture_output=True, text=True)
+    if done.returncode != 0:
+        raise RuntimeError(done.stderr.strip().splitlines()[-1] if done.stderr else "failed")
+    return time.perf_counter() - started, done.stdout
+
+
+class Command(BaseCommand):
+    help = "Measures cold boot time (fresh interpreter each run) with lazy imports vs. eager SDK/pandas imports"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+
+    def handle(self, *args, **options):
+        cwd = str(settings.BASE_DIR)
+        results = {}
+
+        for name, eager in (("lazy", ()), ("eager", ("pandas", "google.generativeai"))):
+            boots, heavy = [], []
+            for _ in range(options["runs"]):
+                _, out = timed([sys.executable, "-c", BOOT.format(eager=eager, heavy=HEAVY_MODULES)], cwd)
+                report = json.loads(out.strip().splitlines()[-1])
+                boots.append(report["seconds"])
+                heavy = report["heavy"]
+            results[name] = {"boot_median": statistics.median(boots), "boot_min": min(boots), "heavy_modules": heavy}
+
+        checks = [timed([sys.executable, "manage.py", "check"], cwd)[0] for _ in range(options["runs"])]
+        results["manage_py_check_median"] = statistics.median(checks)
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        for name in ("lazy", "eager"):
+            r = results[name]
+            self.stdout.write(
+                f"{name:>5}: boot {r['boot_median'] * 1000:.0f} ms median, {r['boot_min'] * 1000:.0f} ms min, "
+                f"heavy modules: {', '.join(r['heavy_modules']) or 'none'}"
+            )
+        self.stdout.write(f"manage.py check: {results['manage_py_check_median'] * 1000:.0f} ms median")
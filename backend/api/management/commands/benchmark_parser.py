@@ -0,0 +1,78 @@
+import json
+import time
+from django.core.management.base import BaseCommand
+from api.utils.fake_model import fake_prices
+from api.utils.parsing import parse_response, BatchPrices
+
+
+def legacy_parse(raw_text):
+    """
+    The parser generate() used before parsing.py: strip fences, json.loads.
+    """
+    try:
+        text = raw_text.strip()
+        if text.startswith("```"):
+            text = text.replace("```json", "").replace("```", "").strip()
+        return {"success": True, "recommendation": json.loads(text)}
+    except json.JSONDecodeError:
+        return {"success": False}
+
+
+def batch_reply(items):
+    # Quotes and brackets inside keys exercise the string handling
+    names = [f'ingredient {n} ("special" {{cut}} [{n % 7}])' for n in range(items)]
+    return json.dumps({name: fake_prices(name) for name in names}, indent=2)
+
+
+# shape -> reply text around the JSON
+SHAPES = {
+    "bare": lambda body: body,
+    "fenced": lambda body: f"```json\n{body}\n```",
+    "prose": lambda body: f"Here are the prices you asked for:\n```json\n{body}\n```\nLet me know if you need more!",
+}
+
+
+def bench(func, text, min_seconds):
+    runs = 0
+    started = time.perf_counter()
+    while True:
+        result = func(text)
+        runs += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_seconds:
+            return elapsed / runs, result["success"]
+
+
+class Command(BaseCommand):
+    help = "Times the model-response parser (legacy vs. parsing.py, with and without schema) on large replies"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--items", default="10,100,1000,5000", help="Ingredients per batch reply")
+        parser.add_argument("--min-seconds", type=float, default=0.3, help="Minimum time per measurement")
+        parser.add_argument("--output", default=None, help="Also write the results as JSON")
+
+    def handle(self, *args, **options):
+        parsers = {
+            "legacy": legacy_parse,
+            "extract+ujson": parse_response,
+            "extract+ujson+schema": lambda text: parse_response(text, BatchPrices),
+        }
+        results = []
+        for items in [int(v) for v in options["items"].split(",") if v.strip()]:
+            body = batch_reply(items)
+            for shape, wrap in SHAPES.items():
+                text = wrap(body)
+                for name, parse in parsers.items():
+                    seconds, ok = bench(parse, text, options["min_seconds"])
+                    results.append({
+                        "items": items, "shape": shape, "parser": name, "bytes": len(text),
+                        "ok": ok, "ms": round(seconds * 1000, 4), "mb_per_s": round(len(text) / seconds / 1e6, 1),
+                    })
+                    self.stdout.write(
+                        f"{items:>6} items {shape:<7} {name:<22} {'ok  ' if ok else 'FAIL'} "
+                        f"{seconds * 1000:>9.3f} ms  {len(text) / seconds / 1e6:>7.1f} MB/s"
+                    )
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(results, f, indent=2)
@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from api.utils.snapshot import compile_snapshot
+
+
+class Command(BaseCommand):
+    help = "Compiles csv/*.csv into the catalog snapshot; running workers reload it on their own"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", default=None, help="Snapshot path (CATALOG_SNAPSHOT_PATH by default)")
+
+    def handle(self, *args, **options):
+        path = options["output"] or settings.CATALOG_SNAPSHOT_PATH
+        catalog = compile_snapshot(path)
+        self.stdout.write(self.style.SUCCESS(f"Compiled {len(catalog)} products to {path}"))
@@ -0,0 +1,203 @@
+import contextlib
+import http.client
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlsplit
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from api.utils.catalog import get_catalog
+from .benchmark import DRIVERS, int_list, percentiles, git_commit
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Client:
+    """
+    One keep-alive HTTP connection per thread.
+    """
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self._local = threading.local()
+
+    def request(self, method, path, body=None, timeout=120):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        try:
+            conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            return response.status
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            self._local.conn = None
+            return None
+
+
+@contextlib.contextmanager
+def production_server(workers, latency, failure_rate):
+    """
+    manage.py serve with the production settings and the fake model, on a
+    free port with a throwaway database, cache and job queue. Yields its URL
+    once the workers report ready.
+    """
+    port = free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "ALLOWED_HOSTS": "127.0.0.1,localhost",
+            "AI_BACKEND": "fake",
+            "AI_FAKE_LATENCY": str(latency),
+            "AI_FAKE_FAILURE_RATE": str(failure_rate),
+            # Every request comes from one IP; measure the server, not the throttles
+            "THROTTLE_ENABLED": "False",
+            "DATABASE_PATH": str(Path(tmp) / "db.sqlite3"),
+            "CACHE_PATH": str(Path(tmp) / "cache.sqlite3"),
+            "JOB_QUEUE_PATH": str(Path(tmp) / "jobs.sqlite3"),
+            "PYTHONUNBUFFERED": "1",
+        }
+        manage = [sys.executable, "manage.py"]
+        production = "--settings=backend.settings_production"
+        subprocess.run(manage + ["migrate", production, "-v", "0"], env=env, cwd=settings.BASE_DIR, check=True,
+                       stdout=subprocess.DEVNULL)
+
+        log = open(Path(tmp) / "server.log", "w")
+        server = subprocess.Popen(
+            manage + ["serve", production, "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)],
+            env=env, cwd=settings.BASE_DIR, stdout=log, stderr=subprocess.STDOUT,
+        )
+        url = f"http://127.0.0.1:{port}"
+        try:
+            wait_ready(Client(url), workers, server)
+            yield url
+        finally:
+            server.send_signal(signal.SIGTERM)
+            try:
+                server.wait(timeout=settings.SERVE_GRACEFUL_TIMEOUT + 5)
+            except subprocess.TimeoutExpired:
+                server.kill()
+            log.close()
+
+
+def wait_ready(client, workers, server, timeout=120):
+    """
+    Waits until ready/ has answered 200 a few times in a row per worker
+    (the kernel spreads the connections, so that's most workers).
+    """
+    deadline = time.monotonic() + timeout
+    streak = 0
+    while streak < 3 * workers:
+        if server.poll() is not None:
+            raise CommandError(f"server exited with {server.returncode}")
+        if time.monotonic() > deadline:
+            raise CommandError("server didn't become ready")
+        client._local.conn = None
+        if client.request("GET", "/api/ready/?wait=5") == 200:
+            streak += 1
+        else:
+            streak = 0
+            time.sleep(0.2)
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test of the production server (manage.py serve) with the Gemini model stubbed out: "
+        "p50/p95/p99 latency, throughput and status codes per scenario, written as JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default=None, help="Test a running server instead of starting one")
+        parser.add_argument("--workers", type=int, default=None, help="Server workers (default: SERVE_WORKERS, else CPU cores)")
+        parser.add_argument("--endpoints", default="recommendation,ingredients")
+        parser.add_argument("--ingredients", type=int, default=10, help="Ingredients per recommendation request")
+        parser.add_argument("--concurrency", type=int_list, default=[8, 32], help="Concurrent clients, e.g. 8,32,64")
+        parser.add_argument("--requests", type=int, default=200, help="Requests per scenario")
+        parser.add_argument("--latency", type=float, default=0.3, help="Fake model latency (seconds)")
+        parser.add_argument("--failure-rate", type=float, default=0.0)
+        parser.add_argument("--catalog-share", type=float, default=0.5, help="Share of recommendation ingredients found in the catalog")
+        parser.add_argument("--output", default="loadtest.json")
+
+    def handle(self, *args, **options):
+        endpoints = [e.strip() for e in options["endpoints"].split(",") if e.strip()]
+        unknown = [e for e in endpoints if e not in DRIVERS]
+        if unknown:
+            raise CommandError(f"Unknown endpoints: {', '.join(unknown)}")
+
+        workers = options["workers"] or settings.SERVE_WORKERS or os.cpu_count() or 1
+        catalog_names = sorted(set(get_catalog().product))
+
+        if options["url"]:
+            server = contextlib.nullcontext(options["url"])
+        else:
+            self.stdout.write(f"starting the production server with {workers} workers and the fake model...")
+            server = production_server(workers, options["latency"], options["failure_rate"])
+
+        scenarios = []
+        with server as url:
+            client = Client(url)
+            run = int(time.time())
+            for endpoint in endpoints:
+                _, path, build = DRIVERS[endpoint]
+                for concurrency in options["concurrency"]:
+                    name = f"{endpoint}-{concurrency}"
+                    count = options["ingredients"]
+
+                    def call(request_no):
+                        # Unique per run, so no cache from an earlier run answers
+                        payload = build(f"{name}-{run}", request_no, count, options["catalog_share"], catalog_names)
+                        started = time.perf_counter()
+                        status = client.request("POST", path, payload)
+                        return time.perf_counter() - started, status
+
+                    started = time.perf_counter()
+                    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                        outcomes = list(pool.map(call, range(options["requests"])))
+                    elapsed = time.perf_counter() - started
+
+                    statuses = Counter(str(status) for _, status in outcomes)
+                    result = {
+                        "name": name,
+                        "endpoint": endpoint,
+                        "concurrency": concurrency,
+                        "requests": len(outcomes),
+                        "errors": sum(n for status, n in statuses.items() if status != "200"),
+                        "statuses": dict(statuses),
+                        "latency_ms": percentiles([seconds for seconds, _ in outcomes]),
+                        "throughput_rps": round(len(outcomes) / elapsed, 2),
+                    }
+                    scenarios.append(result)
+                    self.stdout.write(
+                        f"{name:<24} p50 {result['latency_ms']['p50']:>8.1f} ms  "
+                        f"p95 {result['latency_ms']['p95']:>8.1f} ms  p99 {result['latency_ms']['p99']:>8.1f} ms  "
+                        f"{result['throughput_rps']:>7.2f} req/s  {result['errors']} errors"
+                    )
+
+        report = {
+            "commit": git_commit(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "cpu_count": os.cpu_count(),
+            "server": options["url"] or f"manage.py serve --workers {workers}",
+            "options": {k: options[k] for k in (
+                "endpoints", "ingredients", "concurrency", "requests", "latency", "failure_rate", "catalog_share",
+            )},
+            "scenarios": scenarios,
+        }
+        Path(options["output"]).write_text(json.dumps(report, indent=2))
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(scenarios)} scenarios to {options['output']}"))
@@ -0,0 +1,97 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from api.utils.snapshot import load_catalog
+
+
+# A worker that dies sooner than this after starting is restarted after a
+# pause, so a crash loop doesn't spin the CPU
+MIN_UPTIME = 5.0
+
+
+class Command(BaseCommand):
+    help = (
+        "Production ASGI server: binds one socket and runs --workers daphne processes "
+        "(one per CPU core by default) that all accept on it, restarting any that die. "
+        "Use with --settings=backend.settings_production."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="0.0.0.0")
+        parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8000)))
+        parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: SERVE_WORKERS, else CPU cores)")
+        parser.add_argument("--access-log", default=None, help="Daphne access log (- for stdout)")
+        parser.add_argument("--proxy-headers", action="store_true", help="Trust X-Forwarded-For from a proxy in front")
+
+    def handle(self, *args, **options):
+        workers = options["workers"] or settings.SERVE_WORKERS or os.cpu_count() or 1
+
+        if settings.DEBUG:
+            self.stderr.write("DEBUG is on; use --settings=backend.settings_production in production")
+        if workers > 1 and "InMemoryChannelLayer" in settings.CHANNEL_LAYERS["default"]["BACKEND"]:
+            self.stderr.write("In-memory channel layer: websocket groups won't span workers (set REDIS_HOST/REDIS_PORT)")
+
+        # Compile the catalog snapshot here, once, so the workers only map
+        # it. Every worker accepts on this one socket.
+        load_catalog()
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((options["host"], options["port"]))
+        sock.listen(settings.SERVE_BACKLOG)
+        sock.set_inheritable(True)
+
+        command = [sys.executable, "-m", "daphne", "--fd", str(sock.fileno()), "-v", "1"]
+        if options["access_log"]:
+            command += ["--access-log", options["access_log"]]
+        if options["proxy_headers"]:
+            command.append("--proxy-headers")
+        command.append("backend.asgi:application")
+
+        def spawn():
+            return subprocess.Popen(command, pass_fds=(sock.fileno(),), cwd=settings.BASE_DIR), time.monotonic()
+
+        stopping = []
+        signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+        signal.signal(signal.SIGINT, lambda *_: stopping.append(True))
+
+        procs = [spawn() for _ in range(workers)]
+        self.stdout.write(
+            f"serving on http://{options['host']}:{options['port']} with {workers} workers "
+            f"({os.environ.get('DJANGO_SETTINGS_MODULE')})"
+        )
+
+        try:
+            while not stopping:
+                time.sleep(0.5)
+                for n, (proc, started) in enumerate(procs):
+                    code = proc.poll()
+                    if code is None or stopping:
+                        continue
+                    self.stderr.write(f"worker {proc.pid} exited with {code}, restarting")
+                    if time.monotonic() - started < MIN_UPTIME:
+                        time.sleep(1)
+                    procs[n] = spawn()
+        finally:
+            self.stop([proc for proc, _ in procs])
+            sock.close()
+
+    def stop(self, procs):
+        """
+        SIGTERM to every worker, SIGKILL to those still running after
+        SERVE_GRACEFUL_TIMEOUT seconds.
+        """
+        for proc in procs:
+            if proc.poll() is None:
+                proc.terminate()
+        deadline = time.monotonic() + settings.SERVE_GRACEFUL_TIMEOUT
+        for proc in procs:
+            try:
+                proc.wait(timeout=max(0.1, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        self.stdout.write("all workers stopped")
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from api.utils.dish_cache import warm_dish_cache, dish_cache_stats
+
+
+class Command(BaseCommand):
+    help = "Generates and caches ingredient lists for popular dishes (POPULAR_DISHES by default)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("dishes", nargs="*", help="Dishes to warm instead of POPULAR_DISHES")
+
+    def handle(self, *args, **options):
+        warmed = warm_dish_cache(options["dishes"] or None)
+        self.stdout.write(self.style.SUCCESS(f"Warmed {warmed} dishes. Cache stats: {dish_cache_stats()}"))
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:32
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceObservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=300)),
+                ('name', models.CharField(max_length=255)),
+                ('quantity', models.CharField(blank=True, max_length=100)),
+                ('store', models.CharField(max_length=32)),
+                ('price', models.FloatField()),
+                ('source', models.CharField(choices=[('ai', 'AI estimate'), ('catalog', 'Catalog')], max_length=16)),
+                ('observed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['key', 'source', '-observed_at'], name='price_obs_key_idx'), models.Index(fields=['observed_at'], name='price_obs_time_idx')],
+            },
+        ),
+    ]
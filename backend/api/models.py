@@ -1,3 +1,56 @@
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+
+class PriceObservation(models.Model):
+    """
+    One store price seen for an ingredient quantity, from the AI or the
+    catalog. Rows are only added, so they double as the price history.
+    """
+
+    AI = "ai"
+    CATALOG = "catalog"
+    SOURCES = [(AI, "AI estimate"), (CATALOG, "Catalog")]
+
+    # Normalized "ingredient|quantity" (see utils/price_history.py)
+    key = models.CharField(max_length=300)
+    name = models.CharField(max_length=255)
+    quantity = models.CharField(max_length=100, blank=True)
+    store = models.CharField(max_length=32)
+    price = models.FloatField()
+    source = models.CharField(max_length=16, choices=SOURCES)
+    observed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Latest observation of a key per source
+            models.Index(fields=["key", "source", "-observed_at"], name="price_obs_key_idx"),
+            models.Index(fields=["observed_at"], name="price_obs_time_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.quantity}) @ {self.store}: {self.price} [{self.source}]"
+
+
+class AIUsage(models.Model):
+    """
+    AI calls and tokens of one requester ("user:<id>", "ip:<address>" or
+    "global") on one UTC day. Counted in the cache and written here in the
+    background (see utils/ledger.py).
+    """
+
+    requester = models.CharField(max_length=64)
+    day = models.DateField()
+    calls = models.PositiveIntegerField(default=0)
+    prompt_tokens = models.PositiveBigIntegerField(default=0)
+    output_tokens = models.PositiveBigIntegerField(default=0)
+    total_tokens = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["requester", "day"], name="ai_usage_requester_day"),
+        ]
+
+    def __str__(self):
+        return f"{self.requester} {self.day}: {self.calls} calls, {self.total_tokens} tokens"
@@ -0,0 +1,6 @@
+from django.conf import settings
+
+
+# Every test gets a private in-process cache instead of the shared one
+LOCMEM = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "tests"}}
+NO_THROTTLES = {**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": {}}
@@ -0,0 +1,76 @@
+import pandas as pd
+from django.test import SimpleTestCase
+
+from ..utils.catalog import Catalog
+
+
+class CatalogQuoteTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        columns = ["Category", "Brand", "Product", "Weight", "Price"]
+        cls.catalog = Catalog.from_frames({
+            "osave": pd.DataFrame([
+                ["Rice & Grains", "Local", "Rice", "400g", 30.0],
+                ["Rice & Grains", "Local", "Rice", "1kg", 60.0],
+                ["Dairy Products", "House", "Egg", None, 8.0],
+            ], columns=columns),
+            "dali": pd.DataFrame([
+                ["Rice & Grains", "Local", "Rice", "400g", 20.0],
+                ["Vinegar", "Datu Puti", "Vinegar", "1l", 40.0],
+            ], columns=columns),
+        })
+
+    def test_cheapest_cover_of_the_quantity(self):
+        quote = self.catalog.quote("rice", "1 kg")
+        self.assertEqual((quote["osave"]["price"], quote["osave"]["packs"]), (60.0, 1))
+        self.assertEqual((quote["dali"]["price"], quote["dali"]["packs"]), (60.0, 3))
+        self.assertIsNone(quote["pampanga_market"])
+
+    def test_counts_priced_per_piece(self):
+        quote = self.catalog.quote("egg", "12 pcs")
+        self.assertEqual((quote["osave"]["price"], quote["osave"]["packs"]), (96.0, 12))
+
+    def test_dimension_mismatch_is_a_miss(self):
+        self.assertIsNone(self.catalog.quote("vinegar", "500 g"))
+        self.assertIsNone(self.catalog.quote("rice", "2 cups"))
+
+    def test_no_quantity_quotes_one_pack(self):
+        self.assertEqual(self.catalog.quote("rice")["dali"]["price"], 20.0)
+        self.assertIsNone(self.catalog.quote("durian", "1 kg"))
+
+
+class CatalogIndexTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        columns = ["Category", "Brand", "Product", "Weight", "Price"]
+        cls.catalog = Catalog.from_frames({
+            "osave": pd.DataFrame([
+                ["Condiments", "Datu Puti", "Soy Sauce", "1l", 50.0],
+                ["Condiments", "Silver Swan", "SOY  SAUCE", "1l", 45.0],
+                ["Rice & Grains", "Local", "Jasmine Rice", "1kg", None],
+            ], columns=columns),
+            "dali": pd.DataFrame([
+                ["Condiments", "Datu Puti", "Vinegar", "1l", 40.0],
+            ], columns=columns),
+        })
+
+    def test_product_name_lookup(self):
+        self.assertEqual(self.catalog.find("soy sauce").tolist(), [0, 1])
+        self.assertEqual(self.catalog.find(" Vinegar ").tolist(), [3])
+
+    def test_category_lookup(self):
+        self.assertEqual(self.catalog.find("condiments").tolist(), [0, 1, 3])
+
+    def test_brand_lookup(self):
+        self.assertEqual(self.catalog.find_brand("DATU PUTI").tolist(), [0, 3])
+        self.assertEqual(self.catalog.find_brand("Ufc").tolist(), [])
+
+    def test_rows(self):
+        self.assertEqual(self.catalog.rows([3, 2]), [
+            {"store": "dali", "category": "Condiments", "brand": "Datu Puti", "product": "Vinegar",
+             "weight": "1l", "price": 40.0, "unit_price": 0.04},
+            {"store": "osave", "category": "Rice & Grains", "brand": "Local", "product": "Jasmine Rice",
+             "weight": "1kg", "price": None, "unit_price": None},
+        ])
@@ -0,0 +1,45 @@
+import asyncio
+import json
+
+from django.test import SimpleTestCase
+
+from ..utils.fake_model import FakeModel, fake_prices
+from ..utils.generate import parse_batch_prices
+from ..utils.lazy import get_google_exceptions
+from ..utils.prompts import batch_lines, render
+
+
+class FakeModelTests(SimpleTestCase):
+    def test_answers_every_prompt_the_app_sends(self):
+        model = FakeModel(latency=0, jitter=0)
+
+        batch = render("batch_prices", lines=batch_lines([("Rice", "1 kg"), ("Soy Sauce", "100 ml")]))
+        reply = json.loads(model.generate_content(batch["prompt"]).text)
+        self.assertEqual(parse_batch_prices({"success": True, "recommendation": reply}), {
+            "rice": fake_prices("Rice"), "soy sauce": fake_prices("Soy Sauce"),
+        })
+
+        single = render("prices", name="Rice", quantity="1 kg")
+        self.assertEqual(json.loads(model.generate_content(single["prompt"]).text), fake_prices("Rice"))
+
+        dish = render("dish_ingredients", dish="Adobo", people=4)
+        ingredients = json.loads(asyncio.run(model.generate_content_async(dish["prompt"])).text)
+        self.assertEqual(len(ingredients), 8)
+        self.assertTrue(all({"name", "quantity"} <= set(i) for i in ingredients))
+
+        stats = model.stats()
+        self.assertEqual((stats["calls"], stats["failures"]), (3, 0))
+        self.assertGreater(stats["prompt_tokens"], 0)
+
+    def test_failures_are_upstream_errors(self):
+        model = FakeModel(latency=0, jitter=0, failure_rate=1)
+        with self.assertRaises(get_google_exceptions().ServiceUnavailable):
+            model.generate_content("anything")
+        self.assertEqual(model.stats()["failures"], 1)
+
+    def test_seeded_runs_repeat(self):
+        def delays(seed):
+            model = FakeModel(latency=0.3, jitter=0.1, failure_rate=0.5, seed=seed)
+            return [model._next() for _ in range(5)]
+
+        self.assertEqual(delays(1), delays(1))
@@ -0,0 +1,69 @@
+import asyncio
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from . import LOCMEM, NO_THROTTLES
+from ..utils.fanout import afan_out, fan_out
+
+
+@override_settings(CACHES=LOCMEM, REST_FRAMEWORK=NO_THROTTLES, PRICE_HISTORY_ENABLED=False, AI_PRICE_BATCH_SIZE=1)
+class RecommendationFanOutTests(TestCase):
+    delay = 0.3
+    fruits = ["durian", "rambutan", "lanzones", "santol", "mangosteen", "duhat", "atis", "chico"]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_wall_time_is_about_one_model_call(self):
+        async def slow_generate(prompt, schema=None, system=None):
+            await asyncio.sleep(self.delay)
+            return {"success": True, "recommendation": {"osave": 10, "dali": 11, "pampanga_market": 12}}
+
+        ingredients = [{"name": fruit, "quantity": "1 pc"} for fruit in self.fruits]
+        with mock.patch("api.utils.generate.agenerate", side_effect=slow_generate) as stub:
+            started = time.monotonic()
+            response = APIClient().post("/api/generate/", {"ingredients": ingredients}, format="json")
+            elapsed = time.monotonic() - started
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(stub.call_count, len(self.fruits))
+        self.assertEqual([i["name"] for i in response.data["ingredients"]], self.fruits)
+        # Sequential calls would take len(fruits) * delay
+        self.assertLess(elapsed, self.delay * 2.5)
+
+
+class FanOutTests(SimpleTestCase):
+    def test_results_in_input_order(self):
+        def work(n):
+            time.sleep(0.01 * (5 - n))
+            return n * n
+
+        self.assertEqual(fan_out(work, range(5), max_workers=5), [0, 1, 4, 9, 16])
+
+    def test_failures_and_stragglers_yield_none(self):
+        def work(n):
+            if n == 1:
+                raise RuntimeError("boom")
+            if n == 2:
+                time.sleep(1)
+            return n
+
+        self.assertEqual(fan_out(work, range(4), max_workers=4, deadline=0.3), [0, None, None, 3])
+
+    def test_async_fan_out_bounds_concurrency(self):
+        running = []
+
+        async def work(n):
+            running.append(n)
+            peak = len(running)
+            await asyncio.sleep(0.01)
+            running.remove(n)
+            return peak
+
+        peaks = asyncio.run(afan_out(work, range(10), max_workers=3))
+        self.assertEqual(len(peaks), 10)
+        self.assertLessEqual(max(peaks), 3)
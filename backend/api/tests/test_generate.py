@@ -0,0 +1,60 @@
+import asyncio
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from ..utils.generate import agenerate_prices_batch, parse_batch_prices
+
+
+PRICES = {"osave": 1, "dali": 2, "pampanga_market": 3}
+
+
+class BatchPricingTests(SimpleTestCase):
+    def test_reply_keyed_by_normalized_name(self):
+        reply = {"success": True, "recommendation": {"Soy  Sauce": {"osave": 50, "dali": None}, "junk": 3}}
+        self.assertEqual(parse_batch_prices(reply), {"soy sauce": {"osave": 50, "dali": None, "pampanga_market": None}})
+        self.assertEqual(parse_batch_prices({"success": False, "error": "boom"}), {})
+
+    def test_missing_items_fall_back_one_by_one(self):
+        prompts = []
+
+        async def batch_reply(prompt, schema=None, system=None):
+            prompts.append(prompt)
+            # The model leaves vinegar out and renames the rest
+            return {"success": True, "recommendation": {"RICE": PRICES, "durian ": PRICES}}
+
+        fallbacks = []
+
+        async def fallback(name, quantity):
+            fallbacks.append((name, quantity))
+            return {"osave": 9, "dali": 9, "pampanga_market": 9}
+
+        items = [("rice", "1 kg"), ("Vinegar", "1 l"), ("durian", "1 pc"), ("Rice", "2 kg")]
+        with mock.patch("api.utils.generate.agenerate", side_effect=batch_reply):
+            prices = asyncio.run(agenerate_prices_batch(items, fallback=fallback, chunk_size=5))
+
+        self.assertEqual(len(prompts), 1)
+        self.assertEqual(fallbacks, [("Vinegar", "1 l")])
+        self.assertEqual(prices, [PRICES, {"osave": 9, "dali": 9, "pampanga_market": 9}, PRICES, PRICES])
+
+
+@override_settings(AI_REQUEST_DEADLINE=0.4)
+class BatchPricingDeadlineTests(SimpleTestCase):
+    def test_fallback_gets_what_is_left_of_one_deadline(self):
+        async def partial_chunk(chunk):
+            await asyncio.sleep(0.25)
+            return {"rice": PRICES}
+
+        async def slow_fallback(name, quantity):
+            await asyncio.sleep(1)
+            return {"osave": 9, "dali": 9, "pampanga_market": 9}
+
+        items = [("rice", "1 kg"), ("durian", "1 pc")]
+        with mock.patch("api.utils.generate.agenerate_prices_chunk", side_effect=partial_chunk):
+            started = time.monotonic()
+            prices = asyncio.run(agenerate_prices_batch(items, fallback=slow_fallback, chunk_size=5))
+            elapsed = time.monotonic() - started
+
+        self.assertEqual(prices, [PRICES, None])
+        self.assertLess(elapsed, 0.6)
@@ -0,0 +1,46 @@
+import threading
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from . import LOCMEM
+from ..utils import health
+
+
+@override_settings(CACHES=LOCMEM)
+class HealthTests(TestCase):
+    def setUp(self):
+        self.warm = threading.Event()
+        for patcher in (
+            mock.patch.object(health, "_warm", self.warm),
+            mock.patch.object(health, "get_catalog", return_value=[]),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_health_is_always_ok(self):
+        response = self.client.get("/api/health/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"status": "ok"})
+
+    def test_ready_after_warm_up(self):
+        response = self.client.get("/api/ready/")
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(response.json()["warmed"])
+
+        self.warm.set()
+        response = self.client.get("/api/ready/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()["database"], response.json()["cache"]), ("ok", "ok"))
+
+    def test_broken_dependency_is_not_ready(self):
+        self.warm.set()
+        broken = mock.Mock(side_effect=RuntimeError("cache round-trip failed"))
+        with mock.patch.dict(health.CHECKS, cache=broken):
+            response = self.client.get("/api/ready/")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()["cache"], "cache round-trip failed")
+
+    def test_ready_waits_for_the_warm_up(self):
+        threading.Timer(0.1, self.warm.set).start()
+        self.assertEqual(self.client.get("/api/ready/?wait=2").status_code, 200)
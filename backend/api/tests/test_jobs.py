@@ -0,0 +1,98 @@
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from . import LOCMEM, NO_THROTTLES
+from ..utils import jobs
+from ..utils.jobs import SQLiteJobQueue, get_job, run_job, submit_job
+
+
+@override_settings(CACHES=LOCMEM, REST_FRAMEWORK=NO_THROTTLES, JOB_LEASE=60, JOB_MAX_ATTEMPTS=3)
+class JobTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.queue = SQLiteJobQueue(Path(tmp.name) / "jobs.sqlite3")
+        for patcher in (
+            mock.patch.object(jobs, "_queue", self.queue),
+            # Tests run the jobs themselves
+            mock.patch.object(jobs, "start_workers"),
+            mock.patch("api.Views.job_views.start_workers"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = APIClient()
+
+    def test_submit_and_poll(self):
+        def runner(payload, progress):
+            progress({"ingredients": ["rice"]})
+            return {"items": payload["items"]}
+
+        with mock.patch.dict(jobs.RUNNERS, recommendation=runner):
+            response = self.client.post("/api/generate/jobs/", {"items": "rice", "budget": 5000}, format="json")
+            self.assertEqual(response.status_code, 202)
+            job_id = response.json()["job_id"]
+            self.assertEqual(self.client.get(f"/api/jobs/{job_id}/").json()["status"], "queued")
+
+            run_job(self.queue.pop(0), self.queue)
+
+        body = self.client.get(f"/api/jobs/{job_id}/").json()
+        self.assertEqual(body["status"], "done")
+        self.assertEqual(body["partial"], {"ingredients": ["rice"]})
+        self.assertEqual(body["result"], {"items": "rice"})
+        # Acked: nothing left to pop
+        self.assertIsNone(self.queue.pop(0))
+
+    def test_failed_job_keeps_its_error(self):
+        def runner(payload, progress):
+            raise RuntimeError("upstream is down")
+
+        with mock.patch.dict(jobs.RUNNERS, recommendation=runner):
+            job = submit_job("recommendation", {"items": "rice"})
+            run_job(self.queue.pop(0), self.queue)
+
+        self.assertEqual(get_job(job["id"])["status"], "failed")
+        self.assertEqual(get_job(job["id"])["error"], "upstream is down")
+        self.assertIsNone(self.queue.pop(0))
+
+    @override_settings(JOB_LEASE=0.2)
+    def test_job_of_a_dead_worker_is_requeued(self):
+        job = submit_job("recommendation", {"items": "rice"})
+        # A worker pops the job and dies without acking it
+        self.assertEqual(self.queue.pop(0), job["id"])
+        self.assertIsNone(self.queue.pop(0))
+
+        time.sleep(0.25)
+        self.assertEqual(self.queue.pop(0), job["id"])
+
+    @override_settings(JOB_LEASE=0.2)
+    def test_running_job_keeps_its_lease(self):
+        def runner(payload, progress):
+            # Outlives the lease; the heartbeat keeps other workers off it
+            time.sleep(0.4)
+            self.assertIsNone(self.queue.pop(0))
+            return {}
+
+        with mock.patch.dict(jobs.RUNNERS, recommendation=runner):
+            job = submit_job("recommendation", {"items": "rice"})
+            run_job(self.queue.pop(0), self.queue)
+
+        self.assertEqual(get_job(job["id"])["status"], "done")
+
+    def test_job_fails_after_max_attempts(self):
+        runner = mock.Mock(return_value={})
+        with mock.patch.dict(jobs.RUNNERS, recommendation=runner):
+            job = submit_job("recommendation", {"items": "rice"})
+            # Three workers died running it
+            jobs.update_job(job["id"], status="running", attempts=3)
+            run_job(self.queue.pop(0), self.queue)
+
+        runner.assert_not_called()
+        self.assertEqual(get_job(job["id"])["status"], "failed")
+        self.assertIsNone(self.queue.pop(0))
@@ -0,0 +1,33 @@
+from django.test import SimpleTestCase
+
+from ..utils.catalog import Catalog
+from ..utils.matcher import Matcher
+
+
+class MatcherTests(SimpleTestCase):
+    products = ["Oishi Onion Rings", "Knorr Beef 10g", "Knorr Cubes Chicken 10g", "Beef Loaf", "Lucky BT Rice", "Rock Salt"]
+    brands = ["Oishi", "Knorr", "Knorr", "Winner", "Lucky", "Local"]
+    categories = ["Snacks & Condiments", "Seasonings & Sauces", "Seasonings & Sauces", "Condensed Milk", "Rice & Grains", "Salt - Rock"]
+
+    def setUp(self):
+        self.matcher = Matcher(self.products, self.brands, self.categories)
+
+    def matched(self, name):
+        return [self.products[row] for row, _ in self.matcher.top_k(name)]
+
+    def test_single_ingredient_skips_processed_products(self):
+        self.assertEqual(self.matched("onion"), [])
+        self.assertEqual(self.matched("beef, 1 kg"), [])
+        self.assertEqual(self.matched("whole chicken"), [])
+
+    def test_more_specific_names_still_match_processed_products(self):
+        self.assertEqual(self.matched("chicken cube"), ["Knorr Cubes Chicken 10g"])
+
+    def test_single_word_in_name_or_category_matches(self):
+        self.assertEqual(self.matched("rice"), ["Lucky BT Rice"])
+        self.assertEqual(self.matched("asin"), ["Rock Salt"])
+
+    def test_catalog_quotes_no_processed_product_for_raw_ingredients(self):
+        catalog = Catalog.from_csv()
+        for name, quantity in [("onion", "2 pcs"), ("beef", "1 kg"), ("chicken", "1 whole"), ("pork", "500 g")]:
+            self.assertIsNone(catalog.quote(name, quantity), name)
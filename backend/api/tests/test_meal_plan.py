@@ -0,0 +1,64 @@
+from unittest import mock
+
+import pandas as pd
+from django.test import SimpleTestCase
+
+from ..utils import catalog as catalog_module
+from ..utils.catalog import Catalog, set_catalog
+from ..utils.meal_plan import meal_plan
+
+
+PRICES = {"osave": 10.0, "dali": 12.0, "pampanga_market": 8.0}
+
+
+class MealPlanTests(SimpleTestCase):
+    def setUp(self):
+        self.addCleanup(set_catalog, catalog_module._catalog)
+        columns = ["Category", "Brand", "Product", "Weight", "Price"]
+        set_catalog(Catalog.from_frames({
+            "osave": pd.DataFrame([["Rice & Grains", "Local", "Rice", "1kg", 60.0]], columns=columns),
+            "dali": pd.DataFrame([["Rice & Grains", "Local", "Rice", "1kg", 55.0]], columns=columns),
+            "dti": pd.DataFrame([["Rice & Grains", "Local", "Rice", "1kg", 50.0]], columns=columns),
+        }))
+        self.ai = mock.Mock(side_effect=lambda items, use_ai=True: [dict(PRICES) for _ in items])
+        for patcher in (
+            mock.patch("api.utils.catalog.get_ai_prices", self.ai),
+            mock.patch("api.utils.catalog.record_catalog_prices"),
+            mock.patch("api.utils.meal_plan.ai_available", return_value=True),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_shared_ingredients_are_priced_once(self):
+        dishes = [
+            {"name": "Adobo", "items": [("Garlic", "3 cloves"), ("Rice", "1 kg"), ("Soy Sauce", "100 ml")]},
+            {"name": "Sinigang", "items": [("garlic", "2 cloves"), ("soy  sauce", "50 ml"), ("Vinegar", "1 l")]},
+        ]
+        response, status = meal_plan(dishes)
+
+        self.assertEqual(status, 200)
+        self.assertEqual((response["line_items"], response["unique_ingredients"]), (6, 4))
+        # One AI batch for the three lines the catalog can't price
+        self.ai.assert_called_once()
+        self.assertEqual([name for name, _ in self.ai.call_args[0][0]], ["Garlic", "Soy Sauce", "Vinegar"])
+
+        garlic = response["combined"]["ingredients"][0]
+        self.assertEqual(garlic["used_by"], ["Adobo", "Sinigang"])
+        adobo, sinigang = response["dishes"]
+        self.assertEqual(adobo["ingredients"][0]["share"], 0.6)
+        self.assertEqual(sinigang["ingredients"][0]["share"], 0.4)
+        self.assertEqual(adobo["ingredients"][0]["prices"]["osave"], 6.0)
+
+    def test_repeated_dishes_are_generated_once(self):
+        generated = {"success": True, "ingredients": [{"name": "Rice", "quantity": "1 kg"}]}
+        dishes = [
+            {"name": "Lunch", "dish": "Adobo", "people": 4},
+            {"name": "Dinner", "dish": "adobo ", "people": 4},
+        ]
+        with mock.patch("api.utils.meal_plan.get_dish_ingredients", return_value=generated) as generate:
+            response, status = meal_plan(dishes)
+
+        self.assertEqual(status, 200)
+        generate.assert_called_once_with("Adobo", 4)
+        self.assertEqual(response["unique_ingredients"], 1)
+        self.ai.assert_not_called()
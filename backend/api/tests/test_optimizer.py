@@ -0,0 +1,40 @@
+from django.test import SimpleTestCase
+
+from ..utils.optimizer import optimize
+
+
+class OptimizerTests(SimpleTestCase):
+    def test_entries_with_the_same_name_keep_their_stores(self):
+        result = optimize([
+            {"name": "egg", "prices": {"osave": 10, "dali": 20}},
+            {"name": "egg", "prices": {"osave": 30, "dali": 5}},
+        ], max_stores=2)
+
+        split = result["best_split"]
+        self.assertEqual(split["assignment"], ["osave", "dali"])
+        self.assertEqual(split["cost"], 15.0)
+
+    def test_missing_prices_are_skipped(self):
+        entries = [
+            {"name": "rice", "prices": {"osave": 60, "dali": None, "pampanga_market": 55}},
+            {"name": "vinegar", "prices": {"osave": None, "dali": 40, "pampanga_market": "n/a"}},
+            {"name": "durian", "prices": {"osave": None, "dali": None, "pampanga_market": None}},
+        ]
+        result = optimize(entries, max_stores=2)
+
+        self.assertEqual(result["store_totals"]["osave"], {"total": 60.0, "covered": 1})
+        self.assertEqual(result["store_totals"]["pampanga_market"], {"total": 55.0, "covered": 1})
+        self.assertEqual(result["best_split"]["assignment"], ["pampanga_market", "dali", None])
+        self.assertEqual((result["best_split"]["cost"], result["best_split"]["covered"]), (95.0, 2))
+        self.assertEqual(result["cheapest"]["cost"], 95.0)
+
+    def test_budget_plan_prefers_fewer_stores(self):
+        entries = [
+            {"name": "rice", "prices": {"osave": 60, "dali": 50}},
+            {"name": "egg", "prices": {"osave": 8, "dali": 10}},
+        ]
+        plan = optimize(entries, budget=70, max_stores=2)["budget_plan"]
+        self.assertEqual((plan["stores"], plan["cost"], plan["fits"]), (["dali"], 60.0, True))
+
+        plan = optimize(entries, budget=50, max_stores=2)["budget_plan"]
+        self.assertEqual((plan["cost"], plan["fits"], plan["shortfall"]), (58.0, False, 8.0))
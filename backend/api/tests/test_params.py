@@ -0,0 +1,16 @@
+from django.test import SimpleTestCase
+
+from ..utils.meal_plan import meal_plan_params
+from ..utils.recommend import ingredients_params, recommendation_params
+
+
+class RequestParamsTests(SimpleTestCase):
+    def test_people_must_be_positive(self):
+        for people in (0, -2, "0"):
+            self.assertEqual(ingredients_params({"dish": "Adobo", "people": people}), (None, "People must be at least 1."))
+            self.assertEqual(recommendation_params({"people": people})[1], "People must be at least 1.")
+            self.assertEqual(meal_plan_params({"dishes": [{"dish": "Adobo"}], "people": people})[1], "People must be at least 1.")
+        self.assertEqual(
+            meal_plan_params({"dishes": [{"dish": "Adobo", "people": 0}]})[1], "People of dish 1 must be at least 1."
+        )
+        self.assertEqual(ingredients_params({"dish": "Adobo", "people": "4"}), ({"dish": "Adobo", "people": 4}, None))
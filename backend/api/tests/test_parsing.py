@@ -0,0 +1,27 @@
+from django.test import SimpleTestCase
+
+from ..utils.parsing import StorePrices, extract_json, parse_response
+
+
+class ExtractJsonTests(SimpleTestCase):
+    def test_skips_prose_and_broken_brackets(self):
+        self.assertEqual(extract_json('Sure! [note} here: {"a": [1, "]"]} done'), '{"a": [1, "]"]}')
+        self.assertEqual(extract_json("[x {} }"), "{}")
+
+    def test_mismatched_brackets_dont_recurse(self):
+        self.assertIsNone(extract_json("[}" * 3000))
+        self.assertEqual(extract_json("[" * 50000 + "}" + '{"a": 1}'), '{"a": 1}')
+
+
+class ParseResponseTests(SimpleTestCase):
+    def test_json_in_code_fences(self):
+        result = parse_response('```json\n{"osave": 12.5}\n```')
+        self.assertEqual(result, {"success": True, "recommendation": {"osave": 12.5}})
+
+    def test_schema_normalizes_prices(self):
+        result = parse_response('{"osave": "₱1,250.50", "dali": -3, "pampanga_market": "n/a"}', StorePrices)
+        self.assertEqual(result["recommendation"], {"osave": 1250.5, "dali": None, "pampanga_market": None})
+
+    def test_failures(self):
+        self.assertEqual(parse_response("no json here")["error"], "JSON parse failed")
+        self.assertEqual(parse_response("[1, 2]", StorePrices)["error"], "Schema validation failed")
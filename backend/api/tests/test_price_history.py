@@ -0,0 +1,87 @@
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from . import LOCMEM
+from ..utils import price_history
+from ..utils.price_history import cache_key, get_ai_prices, price_key
+from ..utils.tiered_cache import TieredCache
+
+
+OLD = {"osave": 50, "dali": 55, "pampanga_market": 45}
+NEW = {"osave": 60, "dali": 65, "pampanga_market": 55}
+RICE = ("rice", "1 kg")
+
+
+@override_settings(CACHES=LOCMEM, PRICE_HISTORY_ENABLED=True)
+class PriceHistoryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        for patcher in (
+            # No L1, so every read sees what the test put in the cache
+            mock.patch.object(price_history, "_prices_cache", TieredCache("test_prices", 0, 0)),
+            mock.patch.object(price_history, "_writer"),
+            mock.patch.object(price_history, "upstream_degraded", return_value=False),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def put(self, entry):
+        cache.set(cache_key(price_key(*RICE)), entry)
+
+    def entry(self):
+        return cache.get(cache_key(price_key(*RICE)))
+
+    def test_stale_price_is_served_and_refreshed_in_the_background(self):
+        self.put({"prices": OLD, "observed": time.time() - settings.PRICE_FRESH_TTL - 1})
+
+        ai = mock.Mock(return_value=[NEW])
+        with mock.patch.object(price_history, "generate_prices_batch", ai), \
+                mock.patch.object(price_history, "refresh_later") as refresh_later:
+            self.assertEqual(get_ai_prices([RICE]), [OLD])
+            ai.assert_not_called()
+            refresh_later.assert_called_once_with([RICE])
+
+            # What the refresher then does
+            self.assertEqual(price_history.refresh([RICE]), 1)
+
+        self.assertEqual(self.entry()["prices"], NEW)
+
+    def test_fresh_price_is_not_refreshed(self):
+        self.put({"prices": OLD, "observed": time.time()})
+
+        with mock.patch.object(price_history, "generate_prices_batch") as ai, \
+                mock.patch.object(price_history, "refresh_later") as refresh_later:
+            self.assertEqual(get_ai_prices([RICE]), [OLD])
+
+        ai.assert_not_called()
+        refresh_later.assert_not_called()
+
+    def test_failures_are_remembered_for_the_negative_ttl_only(self):
+        ai = mock.Mock(return_value=[None])
+        with mock.patch.object(price_history, "generate_prices_batch", ai):
+            self.assertEqual(get_ai_prices([RICE]), [None])
+            self.assertIn("failed", self.entry())
+
+            # Within PRICE_NEGATIVE_TTL the AI isn't asked again
+            self.assertEqual(get_ai_prices([RICE]), [None])
+            self.assertEqual(ai.call_count, 1)
+
+            # After it, it is
+            self.put({"failed": time.time() - settings.PRICE_NEGATIVE_TTL - 1})
+            ai.return_value = [NEW]
+            self.assertEqual(get_ai_prices([RICE]), [NEW])
+            self.assertEqual(ai.call_count, 2)
+
+        self.assertEqual(self.entry()["prices"], NEW)
+
+    def test_failed_refresh_keeps_the_stale_price(self):
+        self.put({"prices": OLD, "observed": time.time() - settings.PRICE_FRESH_TTL - 1})
+
+        with mock.patch.object(price_history, "generate_prices_batch", return_value=[None]):
+            self.assertEqual(price_history.refresh([RICE]), 0)
+
+        self.assertEqual(self.entry()["prices"], OLD)
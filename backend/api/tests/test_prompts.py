@@ -0,0 +1,18 @@
+from django.test import SimpleTestCase, override_settings
+
+from ..utils.prompts import PRICING, render
+
+
+class RenderTests(SimpleTestCase):
+    @override_settings(AI_SYSTEM_INSTRUCTIONS=True)
+    def test_system_instruction_apart(self):
+        rendered = render("prices", name="rice", quantity="1 kg")
+        self.assertEqual(rendered["system"], PRICING)
+        self.assertNotIn(PRICING, rendered["prompt"])
+
+    @override_settings(AI_SYSTEM_INSTRUCTIONS=False)
+    def test_system_instruction_in_prompt_when_off(self):
+        rendered = render("prices", name="rice", quantity="1 kg")
+        self.assertIsNone(rendered["system"])
+        self.assertTrue(rendered["prompt"].startswith(PRICING))
+        self.assertIn('"rice"', rendered["prompt"])
@@ -0,0 +1,91 @@
+import asyncio
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache, caches
+from django.test import SimpleTestCase, override_settings
+
+from . import LOCMEM
+from ..utils.singleflight import PENDING, flight_entry, single_flight, single_flight_async
+
+
+@override_settings(CACHES=LOCMEM)
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_callers_share_one_call(self):
+        calls = []
+
+        def work():
+            calls.append(1)
+            time.sleep(0.2)
+            return {"value": 42}
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(single_flight("k", work))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"value": 42}] * 5)
+        # Every caller gets its own copy
+        results[0]["value"] = 0
+        self.assertEqual(results[1], {"value": 42})
+
+    def test_async_callers_share_one_call(self):
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.1)
+            return [1, 2]
+
+        async def run():
+            return await asyncio.gather(*[single_flight_async("k", work) for _ in range(5)])
+
+        self.assertEqual(asyncio.run(run()), [[1, 2]] * 5)
+        self.assertEqual(len(calls), 1)
+
+    def test_one_shared_lock_and_publish_per_upstream_call(self):
+        def work():
+            time.sleep(0.1)
+            return {"value": 1}
+
+        shared = mock.Mock(wraps=caches["default"])
+        with mock.patch("api.utils.singleflight.cache", shared):
+            threads = [threading.Thread(target=single_flight, args=("k", work)) for _ in range(5)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        # The other threads wait in process, without touching the shared cache
+        self.assertEqual((shared.get.call_count, shared.add.call_count, shared.set.call_count), (1, 1, 1))
+        shared.delete.assert_not_called()
+
+    def test_result_of_another_process_is_reused(self):
+        cache.set(flight_entry("k"), {"value": 7})
+        work = mock.Mock(return_value={"value": 1})
+        self.assertEqual(single_flight("k", work), {"value": 7})
+        work.assert_not_called()
+
+    @override_settings(SINGLE_FLIGHT_POLL_INTERVAL=0.01)
+    def test_waits_for_a_flight_in_another_process(self):
+        cache.add(flight_entry("k"), PENDING)
+        threading.Timer(0.1, lambda: cache.set(flight_entry("k"), {"value": 7})).start()
+        work = mock.Mock(return_value={"value": 1})
+
+        self.assertEqual(single_flight("k", work), {"value": 7})
+        work.assert_not_called()
+
+    def test_unshared_results_are_not_published(self):
+        work = mock.Mock(return_value={"success": False})
+        single_flight("k", work, share=lambda result: result["success"])
+        single_flight("k", work, share=lambda result: result["success"])
+
+        self.assertEqual(work.call_count, 2)
+        self.assertIsNone(cache.get(flight_entry("k")))
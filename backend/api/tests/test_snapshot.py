@@ -0,0 +1,74 @@
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase, override_settings
+
+from ..utils import catalog as catalog_module
+from ..utils.catalog import Catalog, get_catalog, set_catalog
+from ..utils.snapshot import read_snapshot, reload_catalog, snapshot_is_fresh, write_snapshot
+
+
+COLUMNS = ["Category", "Brand", "Product", "Weight", "Price"]
+
+
+def small_catalog(rice_price=60.0):
+    return Catalog.from_frames({
+        "osave": pd.DataFrame([
+            ["Rice & Grains", "Local", "Rice", "1kg", rice_price],
+            ["Dairy Products", None, "Egg", None, 8.0],
+        ], columns=COLUMNS),
+        "dali": pd.DataFrame([
+            ["Condiments", "Datu Puti", "Vinegar", "1l", 40.0],
+            ["Condiments", "Datu Puti", "Soy Sauce", "1l", None],
+        ], columns=COLUMNS),
+    })
+
+
+class SnapshotTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / "catalog.snapshot"
+        # Tests swap the process-wide catalog; put the old one back
+        self.addCleanup(set_catalog, catalog_module._catalog)
+
+    def test_round_trip(self):
+        original = small_catalog()
+        write_snapshot(original, self.path, sources={})
+        loaded = read_snapshot(self.path)
+
+        self.assertEqual(loaded.stores, original.stores)
+        for name in ("store_codes", "size", "dimension"):
+            np.testing.assert_array_equal(getattr(loaded, name), getattr(original, name))
+        np.testing.assert_array_equal(loaded.price, original.price)  # NaN prices survive
+        for name in ("category", "brand", "product", "weight"):
+            self.assertEqual(list(getattr(loaded, name)), list(getattr(original, name)))
+        self.assertEqual(loaded.quote("rice", "1 kg"), original.quote("rice", "1 kg"))
+
+    def test_numeric_columns_stay_mapped(self):
+        write_snapshot(small_catalog(), self.path, sources={})
+        loaded = read_snapshot(self.path)
+        for column in (loaded.price, loaded.size, loaded.store_codes):
+            self.assertIsInstance(column.base, np.memmap)
+            self.assertFalse(column.flags.writeable)
+
+    def test_snapshot_of_other_sources_is_stale(self):
+        write_snapshot(small_catalog(), self.path, sources={})
+        self.assertFalse(snapshot_is_fresh(self.path))
+        self.assertFalse(snapshot_is_fresh(self.path.with_name("missing")))
+
+    def test_reload_swaps_the_catalog(self):
+        with override_settings(CATALOG_SNAPSHOT_PATH=str(self.path)):
+            write_snapshot(small_catalog(60.0), self.path, sources={})
+            reload_catalog()
+            before = get_catalog()
+            self.assertEqual(before.quote("rice", "1 kg")["osave"]["price"], 60.0)
+
+            write_snapshot(small_catalog(75.0), self.path, sources={})
+            reload_catalog()
+
+        self.assertEqual(get_catalog().quote("rice", "1 kg")["osave"]["price"], 75.0)
+        # Holders of the old catalog keep reading the old file
+        self.assertEqual(before.quote("rice", "1 kg")["osave"]["price"], 60.0)
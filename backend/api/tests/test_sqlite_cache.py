@@ -0,0 +1,40 @@
+import os
+import tempfile
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from ..utils.sqlite_cache import SQLiteCache
+from ..utils.units import COUNT
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = SQLiteCache(os.path.join(directory.name, "cache.sqlite3"), {
+            "OPTIONS": {"MAX_ENTRIES": 20, "CULL_FREQUENCY": 4, "CULL_EVERY": 5, "TOUCH_BATCH": 3},
+        })
+
+    def rows(self):
+        return self.cache._connection().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def test_basic_operations(self):
+        self.cache.set_many({"a": 1, "b": [2]})
+        self.assertEqual(self.cache.get_many(["a", "b", "c"]), {"a": 1, "b": [2]})
+        self.assertFalse(self.cache.add("a", 5))
+        self.assertTrue(self.cache.add("c", 5))
+        self.assertEqual(self.cache.incr("c", 2), 7)
+        self.cache.set("a", 1, timeout=0)
+        self.assertFalse(self.cache.has_key("a"))
+
+    def test_culls_least_recently_used_every_few_writes(self):
+        self.cache.set_many({f"k{i}": i for i in range(20)})
+        for _ in range(3):
+            self.cache.get_many(["k0", "k1", "k2"])
+        for i in range(20, 30):
+            self.cache.set(f"k{i}", i)
+
+        self.assertLessEqual(self.rows(), 20)
+        self.assertEqual(self.cache.get_many(["k0", "k1", "k2"]), {"k0": 0, "k1": 1, "k2": 2})
+        self.assertIsNone(self.cache.get("k3"))
@@ -0,0 +1,82 @@
+import time
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+
+from ..utils.catalog import Catalog
+from ..utils.recommend import price_entry
+from ..utils.substitute import suggest_substitutions, swap_options
+
+
+COLUMNS = ["Category", "Brand", "Product", "Weight", "Price"]
+
+
+def quoted_entry(catalog, name, quantity):
+    quote = catalog.quote(name, quantity)
+    prices = {store: q["price"] if q else None for store, q in quote.items()}
+    return price_entry(name, quantity, prices, {store: q for store, q in quote.items() if q})
+
+
+class SubstitutionTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.catalog = Catalog.from_frames({
+            "osave": pd.DataFrame([
+                ["Eggs", "Farm Fresh", "Egg", None, 9.0],
+                ["Eggs", "Local", "Native Egg", None, 7.5],
+                ["Vinegar", "Datu Puti", "Vinegar", "1l", 60.0],
+                ["Vinegar", "Silver Swan", "Sukang Puti", "1l", 45.0],
+            ], columns=COLUMNS),
+            "dali": pd.DataFrame([
+                ["Eggs", "Farm Fresh", "Egg", None, 9.5],
+                ["Eggs", "Dali", "Budget Egg", None, 6.0],
+            ], columns=COLUMNS),
+        })
+        cls.sources = [0, 1]
+
+    def test_pieces_swap_to_cheaper_pieces(self):
+        entry = quoted_entry(self.catalog, "egg", "12 pcs")
+        self.assertEqual((entry["cheapest_store"], entry["cheapest_price"]), ("osave", 108.0))
+
+        # Native Egg changes brand too and saves less: not worth considering
+        swaps = [swap["to"] for _, _, swap in swap_options(self.catalog, entry, self.sources)]
+        self.assertEqual([(swap["product"], swap["packs"], swap["price"]) for swap in swaps], [("Budget Egg", 12, 72.0)])
+
+    def test_basket_brought_under_budget(self):
+        entries = [quoted_entry(self.catalog, "egg", "12 pcs"), quoted_entry(self.catalog, "vinegar", "1 l")]
+        with mock.patch("api.utils.substitute.get_catalog", return_value=self.catalog):
+            result = suggest_substitutions(entries, budget=140)
+
+        self.assertTrue(result["fits"])
+        self.assertEqual(result["total_cost"], 132.0)
+        self.assertEqual([swap["to"]["product"] for swap in result["swaps"]], ["Budget Egg"])
+
+    def test_search_takes_milliseconds(self):
+        rng = np.random.default_rng(0)
+        frames = {}
+        for store in ("osave", "dali"):
+            rows = []
+            for c in range(50):
+                for p in range(100):
+                    weight = None if c % 5 == 0 else f"{rng.integers(1, 20) * 50}g"
+                    rows.append([f"Category {c}", f"Brand {p % 7}", f"Product {c} {p}", weight, float(rng.integers(10, 500))])
+            frames[store] = pd.DataFrame(rows, columns=COLUMNS)
+        catalog = Catalog.from_frames(frames)
+
+        entries = [
+            price_entry(f"Product {c} 0", "6 pcs" if c % 5 == 0 else "1 kg", {"osave": 5000.0}, {"osave": {
+                "product": f"Product {c} 0", "brand": "Brand 0", "weight": catalog.weight[c * 100], "packs": 1,
+            }})
+            for c in range(0, 50, 2)
+        ]
+        with mock.patch("api.utils.substitute.get_catalog", return_value=catalog):
+            suggest_substitutions(entries, budget=10000)
+            started = time.perf_counter()
+            result = suggest_substitutions(entries, budget=10000)
+            elapsed = time.perf_counter() - started
+
+        self.assertTrue(result["fits"])
+        self.assertLess(elapsed, 0.05)
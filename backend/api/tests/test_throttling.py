@@ -0,0 +1,82 @@
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from . import LOCMEM
+from ..models import AIUsage
+from ..utils.budget import charge_to, record_usage, take_dirty
+from ..utils.ledger import flush, usage_history
+from ..utils.throttling import CounterRateThrottle, hit, parse_rate
+
+
+@override_settings(CACHES=LOCMEM)
+class ThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate("30/min"), (30, 60))
+        self.assertEqual(parse_rate("5/s"), (5, 1))
+        self.assertEqual(parse_rate("1000/day"), (1000, 86400))
+
+    def test_throttle_without_a_rate_allows_everything(self):
+        # No rate configured for the scope: building the throttle doesn't raise
+        throttle = type("NoRateThrottle", (CounterRateThrottle,), {"scope": "unconfigured"})()
+        request = mock.Mock(user=None)
+        self.assertTrue(throttle.allow_request(request, None))
+        self.assertIsNone(throttle.wait())
+
+    def test_fixed_window_counter(self):
+        self.assertIsNone(hit("test", "2/min", "ip:1", now=120))
+        self.assertIsNone(hit("test", "2/min", "ip:1", now=130))
+        self.assertEqual(hit("test", "2/min", "ip:1", now=135), 45)
+        # Other callers and the next window start over
+        self.assertIsNone(hit("test", "2/min", "ip:2", now=135))
+        self.assertIsNone(hit("test", "2/min", "ip:1", now=180))
+
+    @override_settings(REST_FRAMEWORK={
+        **settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": {"ai_anon": "10/min", "ingredients_anon": "1/min"},
+    })
+    def test_view_answers_429_with_retry_after(self):
+        client = APIClient()
+        self.assertEqual(client.post("/api/generate/ingredients/", {}, format="json").status_code, 400)
+        response = client.post("/api/generate/ingredients/", {}, format="json")
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+
+
+@override_settings(CACHES=LOCMEM)
+class UsageLedgerTests(TransactionTestCase):
+    usage = {"prompt_tokens": 10, "output_tokens": 5, "total_tokens": 15}
+
+    def setUp(self):
+        cache.clear()
+        take_dirty()
+
+    def test_counters_are_flushed_to_the_ledger(self):
+        with charge_to("user:1"):
+            record_usage(self.usage)
+            record_usage(self.usage)
+
+        self.assertEqual(flush(), 2)
+        row = AIUsage.objects.get(requester="user:1")
+        self.assertEqual((row.calls, row.prompt_tokens, row.output_tokens, row.total_tokens), (2, 20, 10, 30))
+        self.assertEqual(AIUsage.objects.get(requester="global").calls, 2)
+        # Nothing new since
+        self.assertEqual(flush(), 0)
+
+        with charge_to("user:1"):
+            record_usage(self.usage)
+        flush()
+        self.assertEqual(AIUsage.objects.get(requester="user:1").calls, 3)
+
+    def test_history_includes_todays_live_counters(self):
+        with charge_to("user:2"):
+            record_usage(self.usage)
+
+        history = usage_history("user:2", 7)
+        self.assertEqual(len(history), 1)
+        self.assertEqual((history[0]["calls"], history[0]["total_tokens"]), (1, 15))
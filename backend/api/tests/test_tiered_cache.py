@@ -0,0 +1,65 @@
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from . import LOCMEM
+from ..utils import tiered_cache
+from ..utils.tiered_cache import ORIGIN, TieredCache, invalidated
+
+
+@override_settings(CACHES=LOCMEM)
+class TieredCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(tiered_cache, "broadcast")
+        self.broadcast = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.tiered = TieredCache("test_tiered", 100, 60)
+
+    def test_l1_hits_skip_the_shared_cache(self):
+        self.tiered.set_many({"a": 1}, timeout=60)
+        with mock.patch.object(tiered_cache, "cache") as shared:
+            self.assertEqual(self.tiered.get_many(["a"]), {"a": 1})
+        shared.get_many.assert_not_called()
+
+    def test_misses_are_filled_from_the_shared_cache(self):
+        cache.set("b", 2)
+        self.assertEqual(self.tiered.get_many(["a", "b"]), {"b": 2})
+        cache.delete("b")
+        # Now held in L1
+        self.assertEqual(self.tiered.get_many(["b"]), {"b": 2})
+
+    def test_writes_tell_the_other_workers(self):
+        self.tiered.set_many({"a": 1}, timeout=60)
+        self.broadcast.assert_called_once_with("test_tiered", ["a"])
+        self.tiered.delete_many(["a"])
+        self.broadcast.assert_called_with("test_tiered", ["a"])
+        self.assertEqual(self.tiered.get_many(["a"]), {})
+
+        self.broadcast.reset_mock()
+        self.tiered.set_many({"b": 2}, timeout=60, notify=False)
+        self.broadcast.assert_not_called()
+
+    def test_invalidation_drops_the_l1_copy(self):
+        self.tiered.set_many({"a": 1}, timeout=60)
+        # Another worker wrote a newer value
+        cache.set("a", 2)
+        self.assertEqual(self.tiered.get_many(["a"]), {"a": 1})
+
+        invalidated({"cache": "test_tiered", "keys": ["a"], "origin": "another worker"})
+        self.assertEqual(self.tiered.get_many(["a"]), {"a": 2})
+
+    def test_own_broadcasts_are_ignored(self):
+        self.tiered.set_many({"a": 1}, timeout=60)
+        cache.set("a", 2)
+        invalidated({"cache": "test_tiered", "keys": ["a"], "origin": ORIGIN})
+        self.assertEqual(self.tiered.get_many(["a"]), {"a": 1})
+
+    def test_l1_entries_expire(self):
+        tiered = TieredCache("test_tiered_ttl", 100, 0.1)
+        tiered.set_many({"a": 1}, timeout=60)
+        cache.set("a", 2)
+        time.sleep(0.15)
+        self.assertEqual(tiered.get_many(["a"]), {"a": 2})
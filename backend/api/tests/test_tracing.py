@@ -0,0 +1,48 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from . import LOCMEM, NO_THROTTLES
+
+
+async def fake_generate(prompt, schema=None, system=None):
+    return {"success": True, "recommendation": {"osave": 10, "dali": 11, "pampanga_market": 12}}
+
+
+@override_settings(
+    CACHES=LOCMEM, REST_FRAMEWORK=NO_THROTTLES, PRICE_HISTORY_ENABLED=False, AI_PRICE_BATCH_SIZE=1,
+    TRACING_SAMPLE_RATE=1.0, TRACING_SERVER_TIMING=True,
+)
+class TracingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def recommend(self):
+        ingredients = [{"name": "durian", "quantity": "1 pc"}, {"name": "vinegar", "quantity": "1 l"}]
+        with mock.patch("api.utils.generate.agenerate", side_effect=fake_generate):
+            return APIClient().post("/api/generate/", {"ingredients": ingredients}, format="json")
+
+    def test_server_timing_breaks_the_request_down(self):
+        response = self.recommend()
+
+        self.assertEqual(response.status_code, 200)
+        timing = dict(entry.split(";", 1) for entry in response["Server-Timing"].split(", "))
+        self.assertIn("catalog", timing)
+        self.assertIn("render", timing)
+        self.assertTrue(timing["total"].startswith("dur="))
+
+    @override_settings(TRACING_SERVER_TIMING=False)
+    def test_no_header_when_off(self):
+        self.assertNotIn("Server-Timing", self.recommend())
+
+    def test_prometheus_metrics(self):
+        self.recommend()
+        text = APIClient().get("/api/metrics/").content.decode()
+
+        self.assertIn("# TYPE tipaid_request_seconds histogram", text)
+        self.assertIn('tipaid_request_seconds_bucket{method="POST",route="api/generate/",le="+Inf"}', text)
+        self.assertIn('tipaid_span_seconds_count{span="catalog"}', text)
+        self.assertIn("# TYPE tipaid_catalog_pricing_total counter", text)
+        self.assertIn('tipaid_catalog_pricing_total{source="ai"}', text)
@@ -0,0 +1,22 @@
+import numpy as np
+from django.test import SimpleTestCase
+
+from ..utils.units import COUNT, MASS, VOLUME, packs_needed, parse_quantity, scale_quantity
+
+
+class UnitsTests(SimpleTestCase):
+    def test_parse_quantity(self):
+        self.assertEqual(parse_quantity("1/2 kg"), (500.0, MASS))
+        self.assertEqual(parse_quantity("1 1/2 cups"), (360.0, VOLUME))
+        self.assertEqual(parse_quantity("3 cloves"), (3.0, COUNT))
+        self.assertIsNone(parse_quantity("to taste"))
+        self.assertIsNone(parse_quantity("1/0 kg"))
+
+    def test_packs_needed(self):
+        self.assertEqual(packs_needed(1000, np.array([400.0, 1000.0, 2000.0])).tolist(), [3, 1, 1])
+        # Float noise doesn't buy an extra pack
+        self.assertEqual(packs_needed(0.3 * 3, np.array([0.9])).tolist(), [1])
+
+    def test_scale_quantity(self):
+        self.assertEqual(scale_quantity("2 cups", 1.5), "3 cups")
+        self.assertEqual(scale_quantity("to taste", 2), "to taste")
@@ -0,0 +1,48 @@
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from . import LOCMEM
+from ..utils import upstream
+from ..utils.generate import generate
+
+
+@override_settings(CACHES=LOCMEM, AI_CIRCUIT_FAILURES=2, AI_CIRCUIT_FAILURE_RATIO=0.5, AI_CIRCUIT_COOLDOWN=30)
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_opens_after_failures_and_fails_fast(self):
+        client = mock.Mock()
+        client.generate_text.side_effect = RuntimeError("upstream down")
+        with mock.patch("api.utils.generate.get_client", return_value=client):
+            for n in range(2):
+                self.assertEqual(generate(f"prompt {n}")["error"], "upstream down")
+            self.assertTrue(upstream.circuit_open())
+
+            result = generate("prompt 3")
+        self.assertTrue(result["upstream_unavailable"])
+        self.assertEqual(client.generate_text.call_count, 2)
+
+    def test_one_probe_after_the_cooldown(self):
+        upstream.open_circuit("test")
+        self.assertIsNone(upstream.begin_call())
+
+        state = cache.get(upstream.CIRCUIT_KEY)
+        cache.set(upstream.CIRCUIT_KEY, {**state, "until": time.time() - 1})
+        ticket = upstream.begin_call()
+        self.assertEqual(ticket, upstream.PROBE)
+        self.assertIsNone(upstream.begin_call())
+
+        upstream.call_succeeded(ticket)
+        self.assertEqual(upstream.begin_call(), upstream.CLOSED)
+        self.assertEqual(upstream.upstream_status()["circuit"], {"state": "closed"})
+
+    def test_failed_probe_reopens(self):
+        upstream.open_circuit("test")
+        state = cache.get(upstream.CIRCUIT_KEY)
+        cache.set(upstream.CIRCUIT_KEY, {**state, "until": time.time() - 1})
+        upstream.call_failed(upstream.begin_call(), "still down")
+        self.assertTrue(upstream.circuit_open())
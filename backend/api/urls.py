@@ -4,7 +4,11 @@ from rest_framework_simplejwt.views import (
     TokenRefreshView,
 )
 from .Views.user_views import registerUser, MyTokenObtainPairView, test
-from .Views.generate_views import generate_recommendation, generate_ingredients
+from .Views.generate_views import generate_recommendation, generate_ingredients, ingredients_cache_stats, ai_token_usage, generate_meal_plan
+from .Views.job_views import submit_recommendation_job, submit_ingredients_job, submit_meal_plan_job, job_status
+from .Views.catalog_views import reload_catalog_view
+from .Views.metrics_views import metrics
+from .Views.health_views import health, ready
 
 
 urlpatterns = [
@@ -13,7 +17,18 @@ urlpatterns = [
     path('register/', registerUser, name='register_user'),
     path('test/', test, name='test'),
     path('generate/', generate_recommendation),
-    path('generate/ingredients/', generate_ingredients)
+    path('generate/ingredients/', generate_ingredients),
+    path('generate/ingredients/cache/', ingredients_cache_stats),
+    path('generate/usage/', ai_token_usage),
+    path('generate/plan/', generate_meal_plan),
+    path('generate/jobs/', submit_recommendation_job),
+    path('generate/ingredients/jobs/', submit_ingredients_job),
+    path('generate/plan/jobs/', submit_meal_plan_job),
+    path('jobs/<str:job_id>/', job_status),
+    path('catalog/reload/', reload_catalog_view),
+    path('metrics/', metrics),
+    path('health/', health),
+    path('ready/', ready)
     
     
 ]
\ No newline at end of file
@@ -0,0 +1,172 @@
+import asyncio
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from tenacity import (
+    AsyncRetrying,
+    Retrying,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_random_exponential,
+)
+from .lazy import get_genai, get_google_exceptions
+from .budget import usage_of
+from .upstream import acquire, aacquire
+
+
+def retryable_errors():
+    """
+    Worth another try: quota, overload, upstream timeouts.
+    """
+    google_exceptions = get_google_exceptions()
+    return (
+        google_exceptions.ResourceExhausted,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.DeadlineExceeded,
+        google_exceptions.InternalServerError,
+        asyncio.TimeoutError,
+        TimeoutError,
+    )
+
+_client = None
+_client_lock = threading.Lock()
+
+
+# -------------------------------------------------
+#  AI CLIENT (one per process)
+# -------------------------------------------------
+class AIClient:
+    """
+    Holds one GenerativeModel per system instruction for the whole process
+    (the instruction is set on the model, not repeated in every prompt) and
+    calls it with a per-call timeout, jittered exponential backoff on
+    transient errors and at most AI_GLOBAL_CONCURRENCY calls in flight.
+    Every attempt takes a slot of the shared rate limit (see upstream.py).
+    """
+
+    def __init__(self, model_name, timeout, attempts, max_concurrency, model=None):
+        self.model_name = model_name
+        # model: anything with generate_content[_async] (e.g. FakeModel),
+        # used for every system instruction
+        self.model = model
+        self._models = {}
+        self._models_lock = threading.Lock()
+        self.timeout = timeout
+        self.attempts = attempts
+        self.max_concurrency = max_concurrency
+
+        self._sync_slots = threading.BoundedSemaphore(max_concurrency)
+        self._async_slots = weakref.WeakKeyDictionary()
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="ai_client")
+        # The SDK's async channel is bound to the loop that first used it
+        self._native_loop = None
+        self._retryable = retryable_errors()
+
+    def model_for(self, system=None):
+        if self.model is not None:
+            return self.model
+        model = self._models.get(system)
+        if model is None:
+            with self._models_lock:
+                model = self._models.get(system)
+                if model is None:
+                    model = self._models[system] = get_genai().GenerativeModel(
+                        self.model_name, system_instruction=system
+                    )
+        return model
+
+    def _retrying(self, retrying_class):
+        return retrying_class(
+            stop=stop_after_attempt(self.attempts),
+            wait=wait_random_exponential(multiplier=0.5, max=8),
+            retry=retry_if_exception_type(self._retryable),
+            reraise=True,
+        )
+
+    def _slots(self, loop):
+        slots = self._async_slots.get(loop)
+        if slots is None:
+            slots = self._async_slots[loop] = asyncio.Semaphore(self.max_concurrency)
+        return slots
+
+    def _options(self, generation_config):
+        options = {"request_options": {"timeout": self.timeout}}
+        if generation_config:
+            options["generation_config"] = generation_config
+        return options
+
+    def _call(self, prompt, generation_config=None, system=None):
+        # Threads (sync callers and the executor) share one set of slots
+        with self._sync_slots:
+            acquire()
+            return self.model_for(system).generate_content(prompt, **self._options(generation_config))
+
+    def generate_text(self, prompt, generation_config=None, system=None):
+        """
+        Blocking call; returns (response text, token usage). generation_config
+        (e.g. JSON mode, see parsing.generation_config) is passed to the
+        model, system picks the model's system instruction.
+        """
+        for attempt in self._retrying(Retrying):
+            with attempt:
+                response = self._call(prompt, generation_config, system)
+        return response.text, usage_of(response)
+
+    async def generate_text_async(self, prompt, generation_config=None, system=None):
+        """
+        Non-blocking call; returns (response text, token usage). Uses the
+        SDK's generate_content_async, or the bounded executor on loops the
+        SDK's async channel isn't bound to.
+        """
+        loop = asyncio.get_running_loop()
+        model = self.model_for(system)
+        if self._native_loop is None and hasattr(model, "generate_content_async"):
+            self._native_loop = loop
+
+        async for attempt in self._retrying(AsyncRetrying):
+            with attempt:
+                if loop is self._native_loop:
+                    async with self._slots(loop):
+                        await aacquire()
+                        response = await asyncio.wait_for(
+                            model.generate_content_async(prompt, **self._options(generation_config)),
+                            self.timeout,
+                        )
+                else:
+                    response = await asyncio.wait_for(
+                        loop.run_in_executor(self._executor, self._call, prompt, generation_config, system),
+                        self.timeout,
+                    )
+        return response.text, usage_of(response)
+
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                model = None
+                if settings.AI_BACKEND == "fake":
+                    from .fake_model import FakeModel
+
+                    model = FakeModel.from_settings()
+                _client = AIClient(
+                    settings.AI_MODEL,
+                    timeout=settings.AI_TIMEOUT,
+                    attempts=settings.AI_ATTEMPTS,
+                    max_concurrency=settings.AI_GLOBAL_CONCURRENCY,
+                    model=model,
+                )
+    return _client
+
+
+def set_client(client):
+    """
+    Replaces the process-wide client (benchmarks swap in a FakeModel) and
+    returns the one it replaced.
+    """
+    global _client
+    with _client_lock:
+        previous, _client = _client, client
+    return previous
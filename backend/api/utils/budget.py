@@ -0,0 +1,193 @@
+import contextlib
+import contextvars
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+from .tracing import increment
+
+
+_requester = contextvars.ContextVar("requester", default=None)
+
+# Counters outlive their day so yesterday's usage can still be read
+WINDOW_TTL = 2 * 24 * 60 * 60
+
+# (requester, day) pairs this process counted usage for since the last
+# ledger flush (see ledger.py)
+_dirty = set()
+_dirty_lock = threading.Lock()
+
+
+# -------------------------------------------------
+#  WHO IS ASKING
+# -------------------------------------------------
+def requester_of(request):
+    """
+    "user:<id>" for signed-in users, "ip:<address>" for everyone else.
+    """
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+    return f"ip:{request.META.get('REMOTE_ADDR') or 'unknown'}"
+
+
+def requester_of_scope(scope):
+    """
+    requester_of() for a websocket scope.
+    """
+    user = scope.get("user")
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+    client = scope.get("client") or ("unknown",)
+    return f"ip:{client[0]}"
+
+
+@contextlib.contextmanager
+def charge_to(requester):
+    """
+    Model calls made inside the block count against requester's budget
+    (and the global one).
+    """
+    token = _requester.set(requester)
+    try:
+        yield
+    finally:
+        _requester.reset(token)
+
+
+def current_requester():
+    return _requester.get()
+
+
+# -------------------------------------------------
+#  TOKEN COUNTERS (shared cache, one window per UTC day)
+# -------------------------------------------------
+def today():
+    return time.strftime('%Y%m%d', time.gmtime())
+
+
+def usage_key(scope, day=None):
+    return f"ai_tokens:{scope}:{day or today()}"
+
+
+def ledger_keys(scope, day=None):
+    """
+    Counter keys of scope's ledger for day: calls, prompt and total tokens
+    (output tokens are total - prompt, one increment less per call).
+    """
+    day = day or today()
+    return {
+        "calls": f"ai_calls:{scope}:{day}",
+        "prompt_tokens": f"ai_prompt_tokens:{scope}:{day}",
+        "total_tokens": usage_key(scope, day),
+    }
+
+
+def add_count(key, amount, timeout=WINDOW_TTL):
+    """
+    Atomic add to a counter in the shared cache, created at 0 if missing.
+    """
+    cache.add(key, 0, timeout=timeout)
+    try:
+        return cache.incr(key, amount)
+    except ValueError:
+        # Evicted between add and incr
+        cache.set(key, max(amount, 0), timeout=timeout)
+        return amount
+
+
+def take_dirty():
+    """
+    The (requester, day) pairs counted since the last call.
+    """
+    global _dirty
+    with _dirty_lock:
+        dirty, _dirty = _dirty, set()
+    return dirty
+
+
+def usage_of(response):
+    """
+    Token counts from a model response's usage_metadata (zeros if absent).
+    """
+    meta = getattr(response, "usage_metadata", None)
+    prompt_tokens = getattr(meta, "prompt_token_count", 0) or 0
+    output_tokens = getattr(meta, "candidates_token_count", 0) or 0
+    total_tokens = getattr(meta, "total_token_count", 0) or prompt_tokens + output_tokens
+    return {"prompt_tokens": prompt_tokens, "output_tokens": output_tokens, "total_tokens": total_tokens}
+
+
+def record_usage(usage, schema=None):
+    """
+    Counts one model call and its tokens in the global and the current
+    requester's daily ledger counters and in the tipaid_ai_tokens_total
+    metric. Cache increments only; ledger.py writes them to the database
+    in the background.
+    """
+    label = schema.__name__ if schema is not None else "text"
+    increment("tipaid_ai_tokens_total", {"schema": label, "type": "prompt"}, usage["prompt_tokens"])
+    increment("tipaid_ai_tokens_total", {"schema": label, "type": "output"}, usage["output_tokens"])
+
+    day = today()
+    scopes = ["global"]
+    requester = current_requester()
+    if requester:
+        scopes.append(requester)
+    for scope in scopes:
+        keys = ledger_keys(scope, day)
+        add_count(keys["calls"], 1)
+        if usage["prompt_tokens"]:
+            add_count(keys["prompt_tokens"], usage["prompt_tokens"])
+        if usage["total_tokens"]:
+            add_count(keys["total_tokens"], usage["total_tokens"])
+    with _dirty_lock:
+        _dirty.update((scope, day) for scope in scopes)
+
+
+def token_usage(requester=None):
+    """
+    Today's token usage and budgets (None = unlimited) for requester and
+    overall.
+    """
+    requester = requester or current_requester()
+    keys = {"global": usage_key("global")}
+    if requester:
+        keys["requester"] = usage_key(requester)
+    used = cache.get_many(list(keys.values()))
+
+    usage = {
+        "global": {
+            "used": used.get(keys["global"], 0),
+            "budget": settings.AI_TOKEN_BUDGET_GLOBAL or None,
+        },
+    }
+    if requester:
+        usage["requester"] = {
+            "id": requester,
+            "used": used.get(keys["requester"], 0),
+            "budget": settings.AI_TOKEN_BUDGET_PER_USER or None,
+        }
+    return usage
+
+
+def ai_allowed(requester=None):
+    """
+    False once today's global budget or requester's budget is spent; the
+    app then answers from the catalog alone.
+    """
+    if not settings.AI_TOKEN_BUDGET_GLOBAL and not settings.AI_TOKEN_BUDGET_PER_USER:
+        return True
+
+    usage = token_usage(requester)
+    for scope in usage.values():
+        if scope["budget"] and scope["used"] >= scope["budget"]:
+            increment("tipaid_ai_budget_exceeded_total", {"scope": "global" if scope is usage["global"] else "user"})
+            return False
+    return True
+
+
+def budget_exceeded():
+    """
+    generate() result when the model wasn't asked because of the budget.
+    """
+    return {"success": False, "error": "AI token budget exceeded", "budget_exceeded": True}
@@ -0,0 +1,295 @@
+import numpy as np
+from django.conf import settings
+from .generate import read_csv_frame, STORES
+from .price_history import get_ai_prices, record_catalog_prices
+from .matcher import Matcher, normalize_key, normalize_name
+from .units import COUNT, UNKNOWN, parse_quantity, parse_weights, packs_needed
+from .tracing import increment, traced
+
+
+CATALOG_FILES = ("osave", "dali", "dti")
+
+_catalog = None
+
+
+def build_index(keys):
+    """
+    Maps every distinct key to the sorted row positions that carry it.
+    """
+    index = {}
+    for position, key in enumerate(keys):
+        if key:
+            index.setdefault(key, []).append(position)
+    return {key: np.array(rows, dtype=np.int32) for key, rows in index.items()}
+
+
+# -------------------------------------------------
+#  PRODUCT CATALOG
+# -------------------------------------------------
+class Catalog:
+    """
+    Columnar view over the store CSVs with hash indexes on the normalized
+    product name, brand and category. Built once per process, from the
+    compiled snapshot (see snapshot.py) or straight from the CSVs.
+    """
+
+    def __init__(self, stores, store_codes, category, brand, product, weight, price, size=None, dimension=None):
+        self.stores = tuple(stores)
+        self.store_codes = store_codes
+        self.category = category
+        self.brand = brand
+        self.product = product
+        self.weight = weight
+        self.price = price
+
+        self.by_product = build_index(normalize_key(p) for p in self.product)
+        self.by_brand = build_index(normalize_key(b) for b in self.brand)
+        self.by_category = build_index(normalize_key(c) for c in self.category)
+        self.matcher = Matcher(self.product, self.brand, self.category)
+
+        # Pack sizes in grams / ml / pieces and the price per unit of size
+        if size is None:
+            size, dimension = parse_weights(self.weight)
+        self.size, self.dimension = size, dimension
+        self.unit_price = self.price / self.size
+
+        # Priced rows of every category, cheapest first, for substitutions
+        self.by_category_price = {}
+        for key, positions in self.by_category.items():
+            positions = positions[~np.isnan(self.price[positions])]
+            order = np.argsort(self.price[positions], kind="stable")
+            self.by_category_price[key] = (positions[order], self.price[positions][order])
+
+    @classmethod
+    def from_frames(cls, frames):
+        columns = {name: [] for name in ("store", "category", "brand", "product", "weight", "price")}
+        for store, frame in frames.items():
+            columns["store"].extend([store] * len(frame))
+            for name in ("category", "brand", "product", "weight", "price"):
+                columns[name].extend(frame[name.capitalize()].tolist())
+
+        stores = tuple(frames)
+        return cls(
+            stores,
+            store_codes=np.array([stores.index(s) for s in columns["store"]], dtype=np.int8),
+            category=np.array(columns["category"], dtype=object),
+            brand=np.array(columns["brand"], dtype=object),
+            product=np.array(columns["product"], dtype=object),
+            weight=np.array(columns["weight"], dtype=object),
+            price=np.array([np.nan if p is None else float(p) for p in columns["price"]], dtype=np.float64),
+        )
+
+    @classmethod
+    def from_csv(cls, stores=CATALOG_FILES):
+        return cls.from_frames({store: read_csv_frame(store) for store in stores})
+
+    def __len__(self):
+        return len(self.price)
+
+    def rows(self, positions):
+        return [
+            {
+                "store": self.stores[self.store_codes[i]],
+                "category": self.category[i],
+                "brand": self.brand[i],
+                "product": self.product[i],
+                "weight": self.weight[i],
+                "price": None if np.isnan(self.price[i]) else float(self.price[i]),
+                "unit_price": None if np.isnan(self.unit_price[i]) else float(self.unit_price[i]),
+            }
+            for i in positions
+        ]
+
+    def find(self, name):
+        """
+        Row positions for an ingredient name: exact product matches first,
+        then every product of a category with that name (also after synonym
+        normalization), then fuzzy trigram matches above MATCH_THRESHOLD.
+        """
+        for key in dict.fromkeys((normalize_key(name), normalize_name(name))):
+            hits = self.by_product.get(key)
+            if hits is None:
+                hits = self.by_category.get(key)
+            if hits is not None:
+                return hits
+
+        matches = self.matcher.top_k(name)
+        return np.array([row for row, _ in matches], dtype=np.int32)
+
+    def find_brand(self, brand):
+        return self.by_brand.get(normalize_key(brand), np.empty(0, dtype=np.int32))
+
+    def cheaper_in_category(self, category, below):
+        """
+        Positions of the category's rows priced under below, cheapest first.
+        """
+        positions, prices = self.by_category_price.get(
+            normalize_key(category), (np.empty(0, dtype=np.int32), np.empty(0))
+        )
+        return positions[:np.searchsorted(prices, below, side="left")]
+
+    def cover(self, rows, amount, dimension):
+        """
+        Packs of every row that cover amount of dimension: by pack size, or
+        by the piece for a count against rows without one. Returns (rows,
+        packs) without the rows it can't be measured against ("1 whole" of
+        something sold by the gram).
+        """
+        sized = self.dimension[rows] == dimension
+        if sized.any():
+            rows = rows[sized]
+            return rows, packs_needed(amount, self.size[rows])
+        if dimension == COUNT:
+            # "12 pcs" against rows sold by the piece (no pack size)
+            rows = rows[self.dimension[rows] == UNKNOWN]
+            return rows, np.full(len(rows), float(np.ceil(amount - 1e-9)))
+        return rows[:0], np.ones(0)
+
+    @traced("catalog")
+    def quote(self, name, quantity=None):
+        """
+        What buying an ingredient costs in each recommendation store.
+        When the quantity parses, picks the product and number of packs that
+        cover it for the least money (see cover); a quantity no row can be
+        measured against is a miss for that store. Without a quantity, the
+        cheapest single pack. Returns {store: {"price", "product", "brand",
+        "weight", "packs"} or None}, or None if nothing matched at all.
+        """
+        positions = self.find(name)
+        if len(positions) == 0:
+            return None
+
+        required = parse_quantity(quantity)
+        codes = self.store_codes[positions]
+        priced = ~np.isnan(self.price[positions])
+
+        quotes = {}
+        for store in STORES:
+            source = settings.CATALOG_STORE_MAP.get(store)
+            rows = positions[priced & (codes == self.stores.index(source))] if source in self.stores else positions[:0]
+            if len(rows) == 0:
+                quotes[store] = None
+                continue
+
+            packs = np.ones(len(rows))
+            if required is not None:
+                rows, packs = self.cover(rows, *required)
+                if len(rows) == 0:
+                    # Grams of something sold by the ml, pieces of something
+                    # sold by the gram: a different product, leave it to the AI
+                    quotes[store] = None
+                    continue
+
+                # Dozens of packs means the match is a different product
+                # (bouillon cubes for "pork"); leave those to the AI
+                sensible = packs <= settings.CATALOG_MAX_PACKS
+                if not sensible.any():
+                    quotes[store] = None
+                    continue
+                rows, packs = rows[sensible], packs[sensible]
+
+            cost = packs * self.price[rows]
+            # Cheapest total first, then the most product per peso
+            best = np.lexsort((np.nan_to_num(self.unit_price[rows], nan=np.inf), cost))[0]
+            row = rows[best]
+            quotes[store] = {
+                "price": round(float(cost[best]), 2),
+                "product": self.product[row],
+                "brand": self.brand[row],
+                "weight": self.weight[row],
+                "packs": int(packs[best]),
+            }
+
+        if all(q is None for q in quotes.values()):
+            return None
+        return quotes
+
+    def lookup_prices(self, name, quantity=None):
+        """
+        Catalog cost per recommendation store for an ingredient.
+        Returns {"osave": ..., "dali": ..., "pampanga_market": ...} with None
+        for stores without a match, or None if nothing matched at all.
+        """
+        quotes = self.quote(name, quantity)
+        if quotes is None:
+            return None
+        return {store: q["price"] if q else None for store, q in quotes.items()}
+
+
+def get_catalog():
+    """
+    The process-wide catalog, built on first use outside a server process
+    (see api.apps.start_services).
+    """
+    global _catalog
+    if _catalog is None:
+        _catalog = Catalog.from_csv()
+    return _catalog
+
+
+def set_catalog(catalog):
+    global _catalog
+    _catalog = catalog
+
+
+# -------------------------------------------------
+#  CATALOG-FIRST PRICING
+# -------------------------------------------------
+def catalog_quote(name, quantity):
+    """
+    (catalog prices or None, purchase) for one ingredient, where purchase
+    holds the catalog product and pack count per store.
+    """
+    quote = get_catalog().quote(name, quantity)
+    if quote is None:
+        return None, {}
+    prices = {store: q["price"] if q else None for store, q in quote.items()}
+    return prices, {store: q for store, q in quote.items() if q}
+
+
+def needs_ai(prices):
+    return prices is None or any(v is None for v in prices.values())
+
+
+def merge_prices(known, ai_prices):
+    """
+    Fills the stores the catalog couldn't price with AI estimates.
+    """
+    if ai_prices is None:
+        return known
+    known = known or {}
+    return {store: known.get(store) if known.get(store) is not None else ai_prices.get(store) for store in STORES}
+
+
+def quote_prices(items, on_catalog=None, use_ai=True):
+    """
+    Prices (name, quantity) pairs from the catalog, asking the AI only for
+    ingredients the catalog can't price in every store. Catalog prices win
+    over AI estimates for the stores the catalog covers.
+    on_catalog, if given, gets the (index, prices, purchase) of every full
+    catalog hit before the AI is called. use_ai=False prices from the
+    catalog and the cached price history alone, without asking the AI.
+    AI prices go through the price history (see
+    price_history.get_ai_prices), catalog prices are recorded in it.
+    Returns a list of (prices or None, purchase) in input order.
+    """
+    items = list(items)
+    quotes = [catalog_quote(name, quantity) for name, quantity in items]
+
+    misses = [i for i, (prices, _) in enumerate(quotes) if needs_ai(prices)]
+    if on_catalog is not None:
+        missed = set(misses)
+        on_catalog([(i, prices, purchase) for i, (prices, purchase) in enumerate(quotes) if i not in missed])
+    record_catalog_prices(
+        [item for item, (prices, _) in zip(items, quotes) if prices is not None],
+        [prices for prices, _ in quotes if prices is not None],
+    )
+    ai_prices = get_ai_prices([items[i] for i in misses], use_ai=use_ai) if misses else []
+
+    results = [prices for prices, _ in quotes]
+    for i, prices in zip(misses, ai_prices):
+        results[i] = merge_prices(results[i], prices)
+
+    increment("tipaid_catalog_pricing_total", {"source": "catalog"}, len(items) - len(misses))
+    increment("tipaid_catalog_pricing_total", {"source": "ai"}, len(misses))
+    return [(prices, purchase) for prices, (_, purchase) in zip(results, quotes)]
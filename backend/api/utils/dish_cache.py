@@ -0,0 +1,122 @@
+import logging
+from django.conf import settings
+from django.core.cache import cache
+from .generate import generate
+from .prompts import render
+from .fanout import fan_out
+from .matcher import normalize_key
+from .singleflight import prompt_key
+from .budget import add_count
+from .units import scale_quantity
+from .tracing import span
+
+
+logger = logging.getLogger(__name__)
+
+HITS_KEY = "dish_cache:hits"
+MISSES_KEY = "dish_cache:misses"
+
+
+def dish_key(dish):
+    # Hashed: dish names have spaces and any length, cache keys shouldn't
+    return f"dish_ingredients:{prompt_key(normalize_key(dish))}"
+
+
+def dish_cache_stats():
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / total, 4) if total else None,
+    }
+
+
+# -------------------------------------------------
+#  DISH INGREDIENTS (cached per dish)
+# -------------------------------------------------
+def generate_dish_ingredients(dish):
+    """
+    Asks the AI for the ingredients of a dish for DISH_CACHE_BASE_PEOPLE people.
+    """
+    ai_response = generate(**render("dish_ingredients", dish=dish, people=settings.DISH_CACHE_BASE_PEOPLE))
+    logger.debug("dish ingredients of %s: %s", dish, ai_response)
+
+    # Budget spent, breaker open or rate limited: pass the reason on
+    for reason in ("budget_exceeded", "upstream_unavailable", "rate_limited"):
+        if ai_response.get(reason):
+            return {"success": False, "error": ai_response["error"], reason: True}
+    if not ai_response.get("success"):
+        return {"success": False, "error": "AI generation failed", "details": ai_response}
+
+    ingredients_list = ai_response.get("recommendation", [])
+
+    # Ensure list
+    if not isinstance(ingredients_list, list):
+        return {"success": False, "error": "AI response is not a list"}
+
+    ingredients = []
+    for ingredient in ingredients_list:
+        if not isinstance(ingredient, dict):
+            continue
+        name = ingredient.get("name")
+        quantity = ingredient.get("quantity", "")
+        if not name:
+            continue
+        ingredients.append({"name": name, "quantity": quantity})
+
+    return {"success": True, "ingredients": ingredients}
+
+
+def get_dish_ingredients(dish, people):
+    """
+    Ingredients of a dish scaled to people. The AI is only asked once per
+    normalized dish name; the cached list is for DISH_CACHE_BASE_PEOPLE people
+    and gets scaled locally, so "Sinigang" for 4 and "sinigang " for 6 share it.
+    """
+    key = dish_key(dish)
+    with span("cache"):
+        ingredients = cache.get(key)
+        cached = ingredients is not None
+        add_count(HITS_KEY if cached else MISSES_KEY, 1, timeout=None)
+
+    if not cached:
+        generated = generate_dish_ingredients(dish)
+        if not generated["success"]:
+            return generated
+        ingredients = generated["ingredients"]
+        if ingredients:
+            with span("cache"):
+                cache.set(key, ingredients, timeout=settings.DISH_CACHE_TTL)
+
+    factor = people / settings.DISH_CACHE_BASE_PEOPLE
+    return {
+        "success": True,
+        "cached": cached,
+        "ingredients": [
+            {"name": i["name"], "quantity": scale_quantity(i["quantity"], factor)}
+            for i in ingredients
+        ],
+    }
+
+
+def warm_dish_cache(dishes=None):
+    """
+    Fills the cache for dishes (POPULAR_DISHES by default) that aren't cached yet.
+    Returns how many dishes were generated.
+    """
+    if dishes is None:
+        dishes = settings.POPULAR_DISHES
+
+    cached = cache.get_many([dish_key(d) for d in dishes])
+    missing = [d for d in dishes if dish_key(d) not in cached]
+
+    warmed = 0
+    for dish, generated in zip(missing, fan_out(generate_dish_ingredients, missing)):
+        if generated and generated["success"] and generated["ingredients"]:
+            cache.set(dish_key(dish), generated["ingredients"], timeout=settings.DISH_CACHE_TTL)
+            warmed += 1
+
+    logger.info("dish cache warmed: %d/%d dishes (%d already cached)", warmed, len(missing), len(dishes) - len(missing))
+    return warmed
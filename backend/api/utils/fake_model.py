@@ -0,0 +1,131 @@
+import asyncio
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+from django.conf import settings
+from .lazy import get_google_exceptions
+
+
+BATCH_LINE = re.compile(r'^\s*-\s*"(?P<name>[^"]+)":\s*"(?P<quantity>[^"]*)"\s*$', re.MULTILINE)
+SINGLE_INGREDIENT = re.compile(r'Prices for "(?P<name>[^"]+)"')
+DISH = re.compile(r'Ingredients for "(?P<dish>[^"]+)"')
+
+
+def fake_price(name, store):
+    """
+    Stable pseudo price (PHP) for an ingredient at a store.
+    """
+    digest = hashlib.sha256(f"{name}|{store}".lower().encode("utf-8")).digest()
+    return round(20 + int.from_bytes(digest[:4], "big") % 48000 / 100, 2)
+
+
+def fake_prices(name):
+    return {store: fake_price(name, store) for store in ("osave", "dali", "pampanga_market")}
+
+
+def count_tokens(text):
+    """
+    Rough Gemini token count (about four characters per token).
+    """
+    return max(1, len(text) // 4) if text else 0
+
+
+def canned_response(prompt, ingredient_count=8):
+    """
+    A well-formed JSON reply for each prompt the app sends: dish
+    ingredients, batch prices or single-item prices ({"price": n} for any
+    other prompt).
+    """
+    dish = DISH.search(prompt)
+    if dish:
+        return json.dumps([
+            {"name": f"{dish.group('dish')} ingredient {n + 1}", "quantity": f"{(n % 4 + 1) * 250} g"}
+            for n in range(ingredient_count)
+        ])
+
+    batch = BATCH_LINE.findall(prompt)
+    if batch:
+        return json.dumps({name: fake_prices(name) for name, _ in batch})
+
+    single = SINGLE_INGREDIENT.search(prompt)
+    if single:
+        return json.dumps(fake_prices(single.group("name")))
+
+    return json.dumps({"price": fake_price(prompt, "web")})
+
+
+# -------------------------------------------------
+#  FAKE GEMINI MODEL (offline benchmarks / load tests)
+# -------------------------------------------------
+class FakeModel:
+    """
+    Stands in for genai.GenerativeModel: answers after latency (+/- jitter)
+    seconds, fails with ServiceUnavailable at failure_rate, and counts every
+    call. responder(prompt) returns the reply text (canned_response by
+    default). Replies carry estimated usage_metadata. Seeded, so runs are
+    repeatable.
+    """
+
+    def __init__(self, latency=0.3, jitter=0.1, failure_rate=0.0, ingredient_count=8, responder=None, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.responder = responder or (lambda prompt: canned_response(prompt, ingredient_count))
+        self.calls = 0
+        self.failures = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        return cls(latency=settings.AI_FAKE_LATENCY, failure_rate=settings.AI_FAKE_FAILURE_RATE)
+
+    def _next(self):
+        with self._lock:
+            self.calls += 1
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            failed = self._random.random() < self.failure_rate
+            if failed:
+                self.failures += 1
+        return delay, failed
+
+    def _reply(self, prompt, failed):
+        if failed:
+            raise get_google_exceptions().ServiceUnavailable("fake model outage")
+        text = self.responder(str(prompt))
+        prompt_tokens = count_tokens(str(prompt))
+        output_tokens = count_tokens(text)
+        with self._lock:
+            self.prompt_tokens += prompt_tokens
+            self.output_tokens += output_tokens
+        usage = SimpleNamespace(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=output_tokens,
+            total_token_count=prompt_tokens + output_tokens,
+        )
+        return SimpleNamespace(text=text, usage_metadata=usage)
+
+    def generate_content(self, prompt, generation_config=None, request_options=None):
+        delay, failed = self._next()
+        time.sleep(delay)
+        return self._reply(prompt, failed)
+
+    async def generate_content_async(self, prompt, generation_config=None, request_options=None):
+        delay, failed = self._next()
+        await asyncio.sleep(delay)
+        return self._reply(prompt, failed)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "failures": self.failures,
+                "prompt_tokens": self.prompt_tokens,
+                "output_tokens": self.output_tokens,
+            }
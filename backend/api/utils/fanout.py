@@ -0,0 +1,99 @@
+import asyncio
+import contextvars
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+import time
+from django.conf import settings
+from .tracing import increment
+
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------
+#  CONCURRENT FAN-OUT
+# -------------------------------------------------
+def fan_out(func, items, max_workers=None, deadline=None):
+    """
+    Calls func(item) for every item on a thread pool.
+    Returns results in input order. A call that raises or that is still
+    running when the deadline (seconds) passes yields None instead.
+    Each call runs in a copy of the caller's context (charge_to, spans).
+    """
+    items = list(items)
+    if not items:
+        return []
+
+    if max_workers is None:
+        max_workers = settings.AI_MAX_CONCURRENCY
+    if deadline is None:
+        deadline = settings.AI_REQUEST_DEADLINE
+
+    max_workers = max(1, min(int(max_workers), len(items)))
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fan_out")
+    started = time.monotonic()
+
+    try:
+        futures = [executor.submit(contextvars.copy_context().run, func, item) for item in items]
+        wait(futures, timeout=deadline)
+
+        results = []
+        for future in futures:
+            if not future.done() or future.cancelled() or future.exception() is not None:
+                results.append(None)
+            else:
+                results.append(future.result())
+
+        elapsed = time.monotonic() - started
+        missed = sum(1 for r in results if r is None)
+        if missed:
+            increment("tipaid_fanout_missed_total", {"mode": "threads"}, missed)
+            logger.debug("fan_out: %d/%d calls failed or missed the %ss deadline (%.2fs)", missed, len(items), deadline, elapsed)
+
+        return results
+    finally:
+        # Don't hold the request open for stragglers past the deadline
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def afan_out(func, items, max_workers=None, deadline=None):
+    """
+    fan_out() for coroutine functions: awaits func(item) for every item on
+    the running event loop, at most max_workers at a time. Same ordering,
+    failure and deadline rules.
+    """
+    items = list(items)
+    if not items:
+        return []
+
+    if max_workers is None:
+        max_workers = settings.AI_MAX_CONCURRENCY
+    if deadline is None:
+        deadline = settings.AI_REQUEST_DEADLINE
+
+    slots = asyncio.Semaphore(max(1, int(max_workers)))
+    started = time.monotonic()
+
+    async def run(item):
+        async with slots:
+            return await func(item)
+
+    tasks = [asyncio.ensure_future(run(item)) for item in items]
+    await asyncio.wait(tasks, timeout=deadline)
+
+    results = []
+    for task in tasks:
+        if not task.done():
+            task.cancel()
+            results.append(None)
+        elif task.cancelled() or task.exception() is not None:
+            results.append(None)
+        else:
+            results.append(task.result())
+
+    elapsed = time.monotonic() - started
+    missed = sum(1 for r in results if r is None)
+    if missed:
+        increment("tipaid_fanout_missed_total", {"mode": "async"}, missed)
+        logger.debug("afan_out: %d/%d calls failed or missed the %ss deadline (%.2fs)", missed, len(items), deadline, elapsed)
+
+    return results
@@ -1,62 +1,139 @@
-
-import google.generativeai as genai
-import json
+import logging
+import time
 from pathlib import Path
-import environ
-import os
 from django.conf import settings
-import pandas as pd
-from rest_framework.response import Response
-from django.core.cache import cache
-
+from asgiref.sync import async_to_sync, sync_to_async
+from .fanout import afan_out
+from .singleflight import single_flight, single_flight_async, prompt_key
+from .ai_client import get_client
+from .lazy import get_pandas
+from .tracing import increment, span, traced
+from .parsing import parse_response, generation_config
+from .prompts import render, batch_lines
+from .budget import ai_allowed, budget_exceeded, record_usage
+from .upstream import (
+    RateLimited, begin_call, call_succeeded, call_skipped, call_failed, upstream_unavailable,
+)
 
-BASE_DIR = Path(__file__).resolve().parent.parent
 
-env = environ.Env()
-environ.Env.read_env(os.path.join(BASE_DIR, ".env"))
+logger = logging.getLogger(__name__)
 
-
-genai.configure(api_key=env('AI_KEY'))
+STORES = ("osave", "dali", "pampanga_market")
 
 # -------------------------------------------------
 #  AI GENERATOR (SAFE JSON)
 # -------------------------------------------------
-def generate(prompt):
+def generate(prompt, schema=None, system=None):
     """
-    Sends prompt to Gemini and returns strict JSON.
-    Safely handles markdown, code fences, etc.
+    Sends prompt to Gemini and returns strict JSON, validated against the
+    pydantic schema if given (see parsing.py). system is the model's system
+    instruction (see prompts.py).
+    Concurrent identical prompts share a single upstream call. Once the
+    caller's token budget is spent, or while the circuit breaker is open
+    (see upstream.py), the model isn't asked at all.
     """
-    try:
-        model = genai.GenerativeModel('models/gemini-2.5-flash')
-        response = model.generate_content(prompt)
+    with span("generate"):
+        if not ai_allowed():
+            return budget_exceeded()
+        return single_flight(
+            flight_key(prompt, schema, system), lambda: call_model(prompt, schema, system), share=succeeded
+        )
 
-        text = response.text.strip()
 
-        # Remove fences like ```json ... ```
-        if text.startswith("```"):
-            text = text.replace("```json", "").replace("```", "").strip()
+async def agenerate(prompt, schema=None, system=None):
+    """
+    Async generate(): doesn't block the event loop while the model works.
+    """
+    with span("generate"):
+        if not await sync_to_async(ai_allowed, thread_sensitive=False)():
+            return budget_exceeded()
+        return await single_flight_async(
+            flight_key(prompt, schema, system), lambda: call_model_async(prompt, schema, system), share=succeeded
+        )
 
-        # Force valid JSON only
-        parsed = json.loads(text)
 
-        return {
-            "success": True,
-            "recommendation": parsed
-        }
+def succeeded(result):
+    # Failures (rate limited, circuit open, bad reply) aren't handed to
+    # other processes; they make their own call
+    return result.get("success")
+
+
+def flight_key(prompt, schema, system=None):
+    key = prompt_key(prompt if system is None else f"{system}\n{prompt}")
+    return f"{key}:{schema.__name__}" if schema is not None else key
 
-    except json.JSONDecodeError:
+
+def parse_model_text(raw_text, schema=None):
+    """
+    Turns model output into the generate() result.
+    Finds the JSON in any prose or code fences around it.
+    """
+    return parse_response(raw_text, schema)
+
+
+def model_config(schema):
+    return generation_config(schema) if settings.AI_JSON_MODE else None
+
+
+def rate_limited(error):
+    return {"success": False, "error": str(error), "rate_limited": True}
+
+
+def call_model(prompt, schema=None, system=None):
+    ticket = begin_call()
+    if ticket is None:
+        return upstream_unavailable()
+    usage = None
+    try:
+        with span("ai.model"):
+            text, usage = get_client().generate_text(prompt, model_config(schema), system)
+        with span("ai.parse"):
+            result = parse_model_text(text, schema)
+    except RateLimited as e:
+        call_skipped(ticket)
+        return rate_limited(e)
+    except Exception as e:
+        call_failed(ticket, e)
         return {
             "success": False,
-            "error": "JSON parse failed",
-            "raw_text": response.text
+            "error": str(e)
         }
+    finally:
+        # Tokens of a reply that didn't parse are spent all the same
+        if usage is not None:
+            record_usage(usage, schema)
+    call_succeeded(ticket)
+    return result
+
+
+async def call_model_async(prompt, schema=None, system=None):
+    ticket = await sync_to_async(begin_call, thread_sensitive=False)()
+    if ticket is None:
+        return upstream_unavailable()
+    usage = None
+    try:
+        with span("ai.model"):
+            text, usage = await get_client().generate_text_async(prompt, model_config(schema), system)
+        with span("ai.parse"):
+            result = parse_model_text(text, schema)
+    except RateLimited as e:
+        await sync_to_async(call_skipped, thread_sensitive=False)(ticket)
+        return rate_limited(e)
     except Exception as e:
+        await sync_to_async(call_failed, thread_sensitive=False)(ticket, e)
         return {
             "success": False,
             "error": str(e)
         }
-
-def read_csv(store):
+    finally:
+        if usage is not None:
+            await sync_to_async(record_usage, thread_sensitive=False)(usage, schema)
+    await sync_to_async(call_succeeded, thread_sensitive=False)(ticket)
+    return result
+
+@traced("csv")
+def read_csv_frame(store):
+    pd = get_pandas()
     dataset_path = Path(settings.BASE_DIR) / "csv" / f"{store}.csv"
 
     if not dataset_path.exists():
@@ -70,125 +147,128 @@ def read_csv(store):
 
         data = data.where(pd.notnull(data), None)
 
-        return data.to_dict(orient='records')
+        return data
 
     except pd.errors.ParserError as e:
         raise pd.errors.ParserError(f"Error parsing CSV file {dataset_path}: {str(e)}")
     except Exception as e:
         raise Exception(f"Unexpected error reading {dataset_path}: {str(e)}")
-    
-def check_loaded(csv):
-    if csv is None or len(csv) == 0:
-        return Response({"error": f"{csv} CSV not loaded or empty."}, status=500)
-    else:
-        print(f"csv is loaded")
-        
-# -------------------------------------------------
-#  AI WEB-SCRAPER (Google-based)
-# -------------------------------------------------
-def ai_webscrape_price(store_name, ingredient):
-    """
-    AI fetches price by simulating a Google search.
-    Extracts a single price or returns None.
-    """
 
-    # Construct Google search URL for each store
-    url = f"https://www.google.com/search?q={store_name}+{ingredient}+price"
 
-    prompt = f"""
-    You are an AI web scraping engine.
+# -----------------------------------------------
+#   BATCH PRICING (1 AI call per chunk)
+# -----------------------------------------------
+def price_prompt(name, quantity):
+    return render("prices", name=name, quantity=quantity)
 
-    REQUIRED:
-    - Fetch the webpage: {url}
-    - Search for product related to "{ingredient}" at "{store_name}"
-    - Extract the exact numeric price shown.
-    - If multiple matches exist, choose the most relevant.
-    - If price not available, return null.
 
-    Return STRICT JSON only:
-    {{
-        "price": <number or null>
-    }}
+def parse_prices(ai_response):
+    """
+    {"osave": ..., "dali": ..., "pampanga_market": ...} from a single-item
+    reply, or None if the AI failed.
     """
+    if not ai_response.get("success"):
+        return None
 
-    response = generate(prompt)
-    print(response)
-    if response.get("success"):
-        price = response["recommendation"].get("price")
-        try:
-            return float(price) if price is not None else None
-        except:
-            return None
+    ai_prices = ai_response.get("recommendation")
+    if not isinstance(ai_prices, dict):
+        return None
 
-    return None
+    return {store: ai_prices.get(store) for store in STORES}
 
 
-# -----------------------------------------------
-#   PRICE NORMALIZER
-# -----------------------------------------------
-def normalize_price(value):
+async def agenerate_prices(name, quantity):
     """
-    Converts any AI output to a clean float.
-    Avoids None/null and keeps consistency.
+    Asks the AI for the prices of a single ingredient.
+    Returns {"osave": ..., "dali": ..., "pampanga_market": ...} or None if the AI failed.
     """
-    try:
-        if value is None:
-            return 0.0
-        if isinstance(value, str):
-            value = value.replace("₱", "").replace(",", "").strip()
-        value = float(value)
-        return round(value, 2)
-    except:
-        return 0.0
+    ai_response = await agenerate(**price_prompt(name, quantity))
+    logger.debug("prices of %s: %s", name, ai_response)
+    return parse_prices(ai_response)
 
 
-# -----------------------------------------------
-#   SCRAPE ALL STORES (Google URLs)
-# -----------------------------------------------
-def get_prices_from_ai(name, quantity):
-    """
-    Get prices for an ingredient using AI, with Django cache.
-    Limits AI calls to 1 per ingredient.
-    """
-
-    # Use lowercase key to be consistent
-    cache_key = f"ingredient_prices:{name.lower()}"
-    cached_prices = cache.get(cache_key)
-    if cached_prices:
-        return cached_prices
+def batch_price_key(name):
+    return " ".join(str(name).lower().split())
 
-    # ------------- AI Call (1 per ingredient) -------------
-    prompt = f"""
-    You are an AI web scraping engine.
 
-    Search the web for the ingredient "{name}"  with quantity of {quantity} in pampanga
-    and find prices in these stores:
-    1. OSAVE
-    2. Dali Supermarket
-    3. Pampanga Market
+def batch_price_prompt(chunk):
+    return render("batch_prices", lines=batch_lines(chunk))
 
-    Return STRICT JSON only with these keys:
 
-    {{
-        "osave": <number>,
-        "dali": <number>,
-        "pampanga_market": <number>
-    }}
+def parse_batch_prices(ai_response):
+    """
+    Batch reply as a dict keyed by batch_price_key(name); ingredients the AI
+    left out are simply missing from it.
     """
+    if not ai_response.get("success"):
+        return {}
 
-    ai_result = generate(prompt)
+    reply = ai_response.get("recommendation")
+    if not isinstance(reply, dict):
+        return {}
+
+    prices = {}
+    for key, value in reply.items():
+        if isinstance(value, dict):
+            prices[batch_price_key(key)] = {store: value.get(store) for store in STORES}
+    return prices
 
-    if ai_result.get("success"):
-        prices = ai_result["recommendation"]
-    else:
-        # fallback zeros if AI fails
-        prices = {"osave": 0.0, "dali": 0.0, "pampanga_market": 0.0}
 
-    # Normalize all prices
-    for key in prices:
-        prices[key] = normalize_price(prices.get(key))
+async def agenerate_prices_chunk(chunk):
+    """
+    Prices a chunk of (name, quantity) pairs with a single AI call.
+    """
+    ai_response = await agenerate(**batch_price_prompt(chunk))
+    logger.debug("prices of %d ingredients: %s", len(chunk), ai_response)
+    return parse_batch_prices(ai_response)
 
-    # ------------- Store in cache -------------
-    cache.set(cache_key, prices, timeout=60*60*24)  # cache for 24 hours
 
-    return prices
+async def agenerate_prices_batch(items, fallback=None, chunk_size=None):
+    """
+    Prices many (name, quantity) pairs, chunk_size ingredients per AI call.
+    All chunks are in flight at once on the event loop. Only ingredients
+    missing from a batch reply are priced one by one with the coroutine
+    function fallback(name, quantity) (agenerate_prices by default), in
+    what's left of the one AI_REQUEST_DEADLINE for the whole call.
+    Returns a list of price dicts (or None) in input order.
+    """
+    deadline = time.monotonic() + settings.AI_REQUEST_DEADLINE
+    items = list(items)
+    if fallback is None:
+        fallback = agenerate_prices
+    if chunk_size is None:
+        chunk_size = settings.AI_PRICE_BATCH_SIZE
+
+    if chunk_size <= 1:
+        return await afan_out(lambda item: fallback(*item), items)
+
+    # Same ingredient twice only needs pricing once
+    unique = {}
+    for name, quantity in items:
+        unique.setdefault(batch_price_key(name), (name, quantity))
+    unique_items = list(unique.values())
+
+    chunks = [unique_items[i:i + chunk_size] for i in range(0, len(unique_items), chunk_size)]
+    found = {}
+    for chunk_prices in await afan_out(agenerate_prices_chunk, chunks, deadline=deadline - time.monotonic()):
+        if chunk_prices:
+            found.update(chunk_prices)
+
+    missing = [item for key, item in unique.items() if key not in found]
+    remaining = deadline - time.monotonic()
+    if missing and remaining > 0:
+        increment("tipaid_batch_price_missing_total", {}, len(missing))
+        logger.debug("batch pricing: %d/%d ingredients missing, retrying one by one", len(missing), len(unique_items))
+        fallbacks = await afan_out(lambda item: fallback(*item), missing, deadline=remaining)
+        for (name, _), prices in zip(missing, fallbacks):
+            found[batch_price_key(name)] = prices
+
+    return [found.get(batch_price_key(name)) for name, _ in items]
+
+
+def generate_prices_batch(items, fallback=None, chunk_size=None):
+    """
+    Blocking agenerate_prices_batch() for sync code. The calling thread
+    waits once while every AI call runs concurrently on an event loop.
+    """
+    return async_to_sync(agenerate_prices_batch)(items, fallback, chunk_size)
@@ -0,0 +1,108 @@
+import logging
+import os
+import threading
+import time
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from .catalog import get_catalog
+from .upstream import upstream_status
+
+
+logger = logging.getLogger(__name__)
+
+_warm = threading.Event()
+_warm_started = False
+_warm_lock = threading.Lock()
+
+
+# -------------------------------------------------
+#  DEPENDENCY CHECKS
+# -------------------------------------------------
+def check_database():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+
+
+def check_cache():
+    key = f"health:{os.getpid()}"
+    cache.set(key, 1, timeout=30)
+    if cache.get(key) != 1:
+        raise RuntimeError("cache round-trip failed")
+
+
+CHECKS = {
+    "database": check_database,
+    "cache": check_cache,
+}
+
+
+# -------------------------------------------------
+#  WARM-UP (once per process)
+# -------------------------------------------------
+def warm_up():
+    """
+    Does the first-request work up front: prices a sample through the
+    mapped catalog, opens the database, round-trips the cache, creates the
+    AI client and imports and configures the Gemini SDK (the slow part of a
+    cold start).
+    Readiness flips once it's done, even if a step failed; the checks in
+    readiness() report what's still broken.
+    """
+    # Let the app registry finish first
+    while not apps.ready:
+        time.sleep(0.05)
+
+    started = time.perf_counter()
+    try:
+        get_catalog().quote("rice", "1 kg")
+        for check in CHECKS.values():
+            check()
+        if settings.AI_KEY or settings.AI_BACKEND == "fake":
+            from .ai_client import get_client
+
+            get_client()
+        if settings.AI_KEY and settings.AI_BACKEND != "fake":
+            from .lazy import get_genai
+
+            # get_client() doesn't import the SDK; the first AI call would
+            get_genai()
+    except Exception:
+        logger.exception("warm-up failed")
+    finally:
+        connection.close()
+        _warm.set()
+        logger.info("warm-up done in %.2fs", time.perf_counter() - started)
+
+
+def start_warm_up():
+    global _warm_started
+    with _warm_lock:
+        if _warm_started:
+            return
+        _warm_started = True
+    threading.Thread(target=warm_up, name="warm_up", daemon=True).start()
+
+
+def readiness(wait=0):
+    """
+    (ready, details): ready once warm-up is done and the database and cache
+    answer. Waits up to wait seconds for the warm-up.
+    """
+    warmed = _warm.wait(wait) if wait else _warm.is_set()
+    details = {"warmed": warmed, "pid": os.getpid(), "catalog_products": len(get_catalog())}
+    ready = warmed
+    for name, check in CHECKS.items():
+        try:
+            check()
+            details[name] = "ok"
+        except Exception as e:
+            details[name] = str(e)
+            ready = False
+    # Informational: with the AI down the app still answers from the catalog
+    try:
+        details["ai_upstream"] = upstream_status()
+    except Exception as e:
+        details["ai_upstream"] = str(e)
+    return ready, details
@@ -0,0 +1,302 @@
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from .tracing import start_trace, finish_trace, observe
+from .recommend import recommendation_params, ingredients_params, recommend, dish_ingredients
+from .meal_plan import meal_plan_params, meal_plan
+from .budget import charge_to
+
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+_queue = None
+_workers = []
+_workers_lock = threading.Lock()
+
+
+def job_key(job_id):
+    return f"job:{job_id}"
+
+
+# -------------------------------------------------
+#  QUEUE BACKENDS
+# -------------------------------------------------
+class SQLiteJobQueue:
+    """
+    FIFO of job ids in a SQLite file, shared by every process on the host.
+    A popped job stays in the queue, leased to its worker for JOB_LEASE
+    seconds at a time; if the worker dies without ack(), the lease runs out
+    and the job is popped again.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_queue (seq INTEGER PRIMARY KEY AUTOINCREMENT, job_id TEXT NOT NULL, "
+                "leased_until REAL NOT NULL DEFAULT 0)"
+            )
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(job_queue)")]
+            if "leased_until" not in columns:
+                # Queue file of an older version
+                conn.execute("ALTER TABLE job_queue ADD COLUMN leased_until REAL NOT NULL DEFAULT 0")
+            conn.execute("CREATE INDEX IF NOT EXISTS job_queue_job_id ON job_queue (job_id)")
+            self._local.conn = conn
+        return conn
+
+    def push(self, job_id):
+        self._connection().execute("INSERT INTO job_queue (job_id) VALUES (?)", (job_id,))
+
+    def pop(self, timeout):
+        deadline = time.monotonic() + timeout
+        conn = self._connection()
+        while True:
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT seq, job_id FROM job_queue WHERE leased_until <= ? ORDER BY seq LIMIT 1", (now,)
+                ).fetchone()
+                if row:
+                    conn.execute(
+                        "UPDATE job_queue SET leased_until = ? WHERE seq = ?", (now + settings.JOB_LEASE, row[0])
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            if row:
+                return row[1]
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(settings.JOB_POLL_INTERVAL)
+
+    def extend(self, job_id):
+        self._connection().execute(
+            "UPDATE job_queue SET leased_until = ? WHERE job_id = ?", (time.time() + settings.JOB_LEASE, job_id)
+        )
+
+    def ack(self, job_id):
+        self._connection().execute("DELETE FROM job_queue WHERE job_id = ?", (job_id,))
+
+
+class RedisJobQueue:
+    """
+    FIFO of job ids in a Redis list, shared by every process and host.
+    Popped jobs are leased in a sorted set (job id -> lease expiry); jobs
+    whose lease ran out go back on the list at the next pop.
+    """
+
+    def __init__(self, url, name="tipaid:job_queue"):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.name = name
+        self.leases = f"{name}:leases"
+
+    def push(self, job_id):
+        self.client.lpush(self.name, job_id)
+
+    def requeue_expired(self):
+        for job_id in self.client.zrangebyscore(self.leases, "-inf", time.time()):
+            # Only the worker that removes the lease requeues the job
+            if self.client.zrem(self.leases, job_id):
+                self.client.rpush(self.name, job_id)
+
+    def pop(self, timeout):
+        self.requeue_expired()
+        item = self.client.brpop(self.name, timeout=max(1, int(timeout)))
+        if not item:
+            return None
+        job_id = item[1].decode()
+        self.extend(job_id)
+        return job_id
+
+    def extend(self, job_id):
+        self.client.zadd(self.leases, {job_id: time.time() + settings.JOB_LEASE})
+
+    def ack(self, job_id):
+        self.client.zrem(self.leases, job_id)
+
+
+def get_queue():
+    global _queue
+    if _queue is None:
+        if settings.JOB_QUEUE_REDIS_URL:
+            _queue = RedisJobQueue(settings.JOB_QUEUE_REDIS_URL)
+        else:
+            _queue = SQLiteJobQueue(settings.JOB_QUEUE_PATH)
+    return _queue
+
+
+# -------------------------------------------------
+#  JOBS
+# -------------------------------------------------
+def run_recommendation(payload, progress):
+    params, error = recommendation_params(payload)
+    if error:
+        raise ValueError(error)
+    # Catalog hits are available as partial results before the AI answers
+    return recommend(
+        params["items"], params["budget"],
+        on_catalog=lambda entries: progress({"ingredients": entries}),
+    )
+
+
+def run_ingredients(payload, progress):
+    params, error = ingredients_params(payload)
+    if error:
+        raise ValueError(error)
+    result, status = dish_ingredients(params["dish"], params["people"])
+    if status != 200:
+        raise RuntimeError(result.get("error", "Ingredient generation failed"))
+    return result
+
+
+def run_meal_plan(payload, progress):
+    params, error = meal_plan_params(payload)
+    if error:
+        raise ValueError(error)
+    result, status = meal_plan(params["dishes"], params["budget"])
+    if status != 200:
+        raise RuntimeError(result.get("error", "Meal plan failed"))
+    return result
+
+
+# job kind -> runner(payload, progress); progress(partial) publishes
+# partial results while the runner works
+RUNNERS = {
+    "recommendation": run_recommendation,
+    "ingredients": run_ingredients,
+    "meal_plan": run_meal_plan,
+}
+
+
+def get_job(job_id):
+    return cache.get(job_key(job_id))
+
+
+def update_job(job_id, **fields):
+    job = get_job(job_id)
+    if job is None:
+        return None
+    job.update(fields, updated=time.time())
+    cache.set(job_key(job_id), job, timeout=settings.JOB_RESULT_TTL)
+    return job
+
+
+def submit_job(kind, payload, requester=None):
+    """
+    Stores a queued job and returns it right away; a worker runs it later.
+    Its AI calls count against requester's token budget.
+    """
+    if kind not in RUNNERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+
+    now = time.time()
+    job = {
+        "id": uuid.uuid4().hex,
+        "kind": kind,
+        "status": QUEUED,
+        "payload": payload,
+        "requester": requester,
+        "partial": None,
+        "result": None,
+        "error": None,
+        "attempts": 0,
+        "created": now,
+        "updated": now,
+    }
+    cache.set(job_key(job["id"]), job, timeout=settings.JOB_RESULT_TTL)
+    get_queue().push(job["id"])
+    start_workers()
+    return job
+
+
+def keep_leased(queue, job_id, stop):
+    while not stop.wait(settings.JOB_LEASE / 3):
+        try:
+            queue.extend(job_id)
+        except Exception:
+            logger.exception("job %s: lease not extended", job_id)
+
+
+def run_job(job_id, queue):
+    """
+    Runs a popped job, extending its lease while it works, then acks it.
+    A job popped while "running" lost its worker and runs again, up to
+    JOB_MAX_ATTEMPTS times in all.
+    """
+    close_old_connections()
+    job = get_job(job_id)
+    if job is None or job["status"] in (DONE, FAILED):
+        # Expired before anyone picked it up, or its worker died between
+        # finishing and the ack
+        queue.ack(job_id)
+        return
+
+    attempts = job.get("attempts", 0) + 1
+    if attempts > settings.JOB_MAX_ATTEMPTS:
+        update_job(job_id, status=FAILED, error="The job's workers stopped before finishing it.")
+        queue.ack(job_id)
+        return
+    job = update_job(job_id, status=RUNNING, attempts=attempts)
+
+    stop = threading.Event()
+    threading.Thread(target=keep_leased, args=(queue, job_id, stop), name=f"job_lease_{job_id}", daemon=True).start()
+    traced = start_trace()
+    try:
+        runner = RUNNERS[job["kind"]]
+        with charge_to(job.get("requester")):
+            result = runner(job["payload"], lambda partial: update_job(job_id, partial=partial))
+        update_job(job_id, status=DONE, result=result)
+    except Exception as e:
+        logger.exception("job %s failed", job_id)
+        update_job(job_id, status=FAILED, error=str(e))
+    finally:
+        stop.set()
+        queue.ack(job_id)
+        close_old_connections()
+        if traced is not None:
+            trace = finish_trace(traced)
+            observe("tipaid_job_seconds", {"kind": job["kind"]}, time.perf_counter() - trace.started)
+
+
+def work():
+    queue = get_queue()
+    while True:
+        try:
+            job_id = queue.pop(timeout=5)
+        except Exception:
+            logger.exception("job queue unavailable")
+            time.sleep(1)
+            continue
+        if job_id:
+            run_job(job_id, queue)
+
+
+def start_workers():
+    """
+    Starts this process' JOB_WORKERS worker threads, once. Each worker runs
+    one job at a time, so the workers cap how many pipelines run at once.
+    """
+    with _workers_lock:
+        if _workers:
+            return
+        for n in range(settings.JOB_WORKERS):
+            worker = threading.Thread(target=work, name=f"job_worker_{n}", daemon=True)
+            worker.start()
+            _workers.append(worker)
@@ -0,0 +1,46 @@
+import threading
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+
+_genai = None
+_genai_lock = threading.Lock()
+
+
+# -------------------------------------------------
+#  LAZY IMPORTS (heavy, only needed by some paths)
+# -------------------------------------------------
+def get_pandas():
+    """
+    pandas, imported on first use (CSV parsing only; the catalog snapshot
+    loads without it).
+    """
+    import pandas
+
+    return pandas
+
+
+def get_genai():
+    """
+    google.generativeai, imported and configured with AI_KEY on the first
+    AI call. Raises ImproperlyConfigured when AI_KEY isn't set, so the rest
+    of the app runs without one.
+    """
+    global _genai
+    if _genai is None:
+        with _genai_lock:
+            if _genai is None:
+                if not settings.AI_KEY:
+                    raise ImproperlyConfigured("AI_KEY is not set; AI features are unavailable.")
+
+                import google.generativeai as genai
+
+                genai.configure(api_key=settings.AI_KEY)
+                _genai = genai
+    return _genai
+
+
+def get_google_exceptions():
+    from google.api_core import exceptions
+
+    return exceptions
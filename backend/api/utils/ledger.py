@@ -0,0 +1,117 @@
+import atexit
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, close_old_connections
+from ..models import AIUsage
+from .budget import ledger_keys, take_dirty, today
+
+
+logger = logging.getLogger(__name__)
+
+_flusher_started = False
+_flusher_lock = threading.Lock()
+
+
+# -------------------------------------------------
+#  CACHE COUNTERS -> DATABASE (in the background)
+# -------------------------------------------------
+def counters(scope, day=None):
+    """
+    {"calls", "prompt_tokens", "output_tokens", "total_tokens"} of scope's
+    day from the cache counters (today by default).
+    """
+    keys = ledger_keys(scope, day)
+    found = cache.get_many(list(keys.values()))
+    values = {field: found.get(key, 0) for field, key in keys.items()}
+    values["output_tokens"] = max(0, values["total_tokens"] - values["prompt_tokens"])
+    return values
+
+
+def flush():
+    """
+    Writes the counters of every (requester, day) this process counted
+    usage for since the last flush, in one upsert. The counters are shared,
+    so workers flushing the same row write the same (or newer) totals.
+    Returns how many rows were written.
+    """
+    dirty = take_dirty()
+    if not dirty:
+        return 0
+
+    rows = []
+    for scope, day in dirty:
+        values = counters(scope, day)
+        if not values["calls"]:
+            # Counters already expired from the cache; keep the recorded row
+            continue
+        rows.append(AIUsage(requester=scope, day=datetime.strptime(day, "%Y%m%d").date(), **values))
+    if not rows:
+        return 0
+
+    close_old_connections()
+    try:
+        AIUsage.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["requester", "day"],
+            update_fields=["calls", "prompt_tokens", "output_tokens", "total_tokens", "updated_at"],
+        )
+    except DatabaseError:
+        logger.exception("usage ledger: flush failed")
+        return 0
+    return len(rows)
+
+
+def flush_loop():
+    while True:
+        time.sleep(settings.AI_USAGE_FLUSH_INTERVAL)
+        try:
+            flush()
+        except Exception:
+            logger.exception("usage ledger: flush failed")
+
+
+def start_flusher():
+    """
+    Starts this process' ledger flusher once, and flushes on exit too
+    (off when AI_USAGE_FLUSH_INTERVAL is 0).
+    """
+    global _flusher_started
+    if not settings.AI_USAGE_FLUSH_INTERVAL:
+        return
+    with _flusher_lock:
+        if _flusher_started:
+            return
+        _flusher_started = True
+    threading.Thread(target=flush_loop, name="usage_ledger", daemon=True).start()
+    atexit.register(flush)
+
+
+# -------------------------------------------------
+#  READING THE LEDGER
+# -------------------------------------------------
+def usage_history(requester, days):
+    """
+    requester's daily AI calls and tokens for the last days days, newest
+    first. Today comes from the live counters, earlier days from the ledger.
+    """
+    # Days are UTC, like the counters
+    current = datetime.strptime(today(), "%Y%m%d").date()
+    since = current - timedelta(days=max(0, days - 1))
+    rows = (
+        AIUsage.objects
+        .filter(requester=requester, day__gte=since)
+        .order_by("-day")
+        .values("day", "calls", "prompt_tokens", "output_tokens", "total_tokens")
+    )
+    history = {row["day"].isoformat(): row for row in rows}
+
+    live = counters(requester)
+    if live["calls"]:
+        history[current.isoformat()] = live
+
+    return [{**row, "day": key} for key, row in sorted(history.items(), reverse=True)]
@@ -0,0 +1,196 @@
+import re
+import numpy as np
+from django.conf import settings
+
+
+# Filipino (and common alternative English) names -> catalog wording
+SYNONYMS = {
+    "toyo": "soy sauce",
+    "suka": "vinegar",
+    "patis": "fish sauce",
+    "bawang": "garlic",
+    "sibuyas": "onion",
+    "kamatis": "tomato",
+    "luya": "ginger",
+    "paminta": "pepper",
+    "dahon ng laurel": "bay leaf",
+    "laurel": "bay leaf",
+    "asin": "salt",
+    "asukal": "sugar",
+    "itlog": "egg",
+    "gatas": "milk",
+    "mantika": "cooking oil",
+    "mantikilya": "butter",
+    "bigas": "rice",
+    "kanin": "rice",
+    "harina": "flour",
+    "keso": "cheese",
+    "kape": "coffee",
+    "tubig": "water",
+    "sardinas": "sardines",
+    "baboy": "pork",
+    "manok": "chicken",
+    "baka": "beef",
+    "isda": "fish",
+    "hipon": "shrimp",
+    "noodles": "noodle",
+    "pancit": "noodle",
+    "catsup": "ketchup",
+    "ketsup": "ketchup",
+    "monggo": "mung beans",
+    "mongo": "mung beans",
+    "evap": "evaporated milk",
+    "condensada": "condensed milk",
+}
+
+# Quantity and preparation words that say nothing about the product
+NOISE_WORDS = {
+    "cup", "cups", "tbsp", "tsp", "tablespoon", "tablespoons", "teaspoon", "teaspoons",
+    "g", "gram", "grams", "kg", "kilo", "kilos", "ml", "l", "liter", "liters", "litre",
+    "oz", "lb", "lbs", "pc", "pcs", "piece", "pieces", "clove", "cloves", "head", "heads",
+    "pack", "packs", "can", "cans", "bottle", "bottles", "sachet", "sachets", "bunch",
+    "pinch", "dash", "to", "taste", "of", "and", "or", "a", "an", "the", "per", "for",
+    "fresh", "chopped", "minced", "sliced", "diced", "crushed", "ground", "large",
+    "medium", "small", "whole", "optional",
+}
+
+# Categories whose product names carry a raw ingredient as a flavour or
+# filling ("Knorr Beef", "Onion Rings", "Beef Loaf"): a bare ingredient
+# name never fuzzy-matches them, nor products named like one of them
+# (normalized category names)
+PROCESSED_CATEGORIES = {
+    "seasonings sauces", "snacks condiments", "instant noodles", "candy sweets", "beverages",
+    "cigarettes tobacco", "canned goods", "meat products", "beef loaf", "meat loaf", "corned beef",
+    "luncheon meat", "ham", "sandwich spread", "tomato sauce", "spaghetti sauce", "fruit cocktail",
+    "sweet preserves",
+}
+
+_SYNONYM_PATTERN = re.compile(
+    r"\b(" + "|".join(sorted((re.escape(k) for k in SYNONYMS), key=len, reverse=True)) + r")\b"
+)
+
+
+def normalize_key(text):
+    """
+    Lowercases and strips punctuation so "Patis (Fish Sauce)" and
+    "patis fish sauce" share an index key.
+    """
+    if text is None:
+        return ""
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", str(text).lower()).split())
+
+
+def normalize_name(text, drop=()):
+    """
+    Normalizes an ingredient or product name for matching:
+    "Toyo, 1 cup" -> "soy sauce". Words in drop (e.g. the brand) are removed too.
+    """
+    text = _SYNONYM_PATTERN.sub(lambda m: SYNONYMS[m.group(1)], normalize_key(text))
+    words = [
+        w for w in text.split()
+        if w not in NOISE_WORDS and w not in drop and not re.fullmatch(r"\d+[a-z]*", w)
+    ]
+    return " ".join(words)
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# -------------------------------------------------
+#  TRIGRAM MATCHER
+# -------------------------------------------------
+class Matcher:
+    """
+    Character-trigram inverted index over catalog rows. Every row is indexed
+    twice: by its product name (brand and sizes removed) and by its category,
+    and a row scores the better of the two Dice similarities.
+    One-word queries ("beef", "onion") are held to more: they skip rows of
+    PROCESSED_CATEGORIES, and need MATCH_SHORT_THRESHOLD unless the word
+    appears whole in the row's name or category.
+    """
+
+    def __init__(self, products, brands, categories):
+        self.size = len(products)
+        self.vocabulary = {}
+
+        product_docs = [
+            normalize_name(product, drop=set(normalize_key(brand).split()))
+            for product, brand in zip(products, brands)
+        ]
+        category_docs = [normalize_name(category) for category in categories]
+        self.words = [set(p.split()) | set(c.split()) for p, c in zip(product_docs, category_docs)]
+        # Also products named like a processed category, whatever theirs is
+        self.processed = np.array([
+            normalize_key(category) in PROCESSED_CATEGORIES
+            or any(f" {name} " in f" {doc} " for name in PROCESSED_CATEGORIES)
+            for category, doc in zip(categories, product_docs)
+        ], dtype=bool)
+
+        self.product_postings, self.product_lengths = self.build(product_docs)
+        self.category_postings, self.category_lengths = self.build(category_docs)
+
+    def build(self, docs):
+        postings = {}
+        lengths = np.zeros(self.size, dtype=np.float32)
+        for row, doc in enumerate(docs):
+            grams = trigrams(doc) if doc else set()
+            lengths[row] = len(grams)
+            for gram in grams:
+                gram_id = self.vocabulary.setdefault(gram, len(self.vocabulary))
+                postings.setdefault(gram_id, []).append(row)
+        return {g: np.array(rows, dtype=np.int32) for g, rows in postings.items()}, lengths
+
+    def scores(self, name):
+        """
+        Dice similarity of name against every row, as one float array.
+        """
+        query = normalize_name(name)
+        grams = trigrams(query) if query else set()
+        gram_ids = [self.vocabulary[g] for g in grams if g in self.vocabulary]
+        best = np.zeros(self.size, dtype=np.float32)
+        if not gram_ids:
+            return best
+
+        query_length = len(grams)
+        for postings, lengths in (
+            (self.product_postings, self.product_lengths),
+            (self.category_postings, self.category_lengths),
+        ):
+            hits = [postings[g] for g in gram_ids if g in postings]
+            if not hits:
+                continue
+            shared = np.bincount(np.concatenate(hits), minlength=self.size)
+            np.maximum(best, 2.0 * shared / (lengths + query_length), out=best)
+
+        if len(query.split()) == 1:
+            best[self.processed] = 0
+        return best
+
+    def top_k(self, name, k=None, threshold=None):
+        """
+        Up to k (row position, score) pairs scoring at least threshold, best first.
+        """
+        if k is None:
+            k = settings.MATCH_TOP_K
+        short = None
+        if threshold is None:
+            threshold = settings.MATCH_THRESHOLD
+            words = normalize_name(name).split()
+            if len(words) == 1:
+                short = words[0]
+
+        scores = self.scores(name)
+        k = min(k, self.size)
+        if k <= 0:
+            return []
+
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [
+            (int(row), float(scores[row])) for row in candidates
+            if scores[row] >= threshold and (
+                short is None or scores[row] >= settings.MATCH_SHORT_THRESHOLD or short in self.words[row]
+            )
+        ]
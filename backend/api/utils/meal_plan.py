@@ -0,0 +1,232 @@
+from django.conf import settings
+from .catalog import quote_prices
+from .dish_cache import get_dish_ingredients
+from .fanout import fan_out
+from .matcher import normalize_key
+from .units import measure, format_measure
+from .recommend import parse_ingredients, price_entry, summarize_recommendation, failure_status
+from .upstream import ai_available
+
+
+# -------------------------------------------------
+#  REQUEST PARAMS
+# -------------------------------------------------
+def meal_plan_params(data):
+    """
+    Validated {"dishes", "budget"} from a meal plan request, or (None, error
+    message). Every dish is {"dish": "Adobo", "people": 4} (ingredients
+    generated) or {"name": "Breakfast", "ingredients": [...]} (given);
+    people defaults to the request's.
+    """
+    dishes = data.get("dishes")
+    people = data.get("people", 1)
+    budget = data.get("budget")
+
+    try:
+        people = int(people)
+    except (TypeError, ValueError):
+        return None, "People must be a number."
+    if people < 1:
+        return None, "People must be at least 1."
+
+    try:
+        budget = float(budget) if budget else None
+    except (TypeError, ValueError):
+        return None, "Budget must be a number."
+
+    if not isinstance(dishes, list) or not dishes:
+        return None, "Dishes must be a non-empty list."
+    if len(dishes) > settings.MEAL_PLAN_MAX_DISHES:
+        return None, f"At most {settings.MEAL_PLAN_MAX_DISHES} dishes per plan."
+
+    parsed = []
+    for n, entry in enumerate(dishes, start=1):
+        if not isinstance(entry, dict):
+            return None, f"Dish {n} must be an object."
+
+        if entry.get("ingredients") is not None:
+            if not isinstance(entry["ingredients"], list):
+                return None, f"Ingredients of dish {n} must be a list."
+            parsed.append({
+                "name": entry.get("name") or entry.get("dish") or f"List {n}",
+                "items": parse_ingredients(entry["ingredients"]),
+            })
+            continue
+
+        dish = entry.get("dish")
+        if not dish:
+            return None, f"Dish {n} needs a dish or an ingredients list."
+        try:
+            dish_people = int(entry.get("people", people))
+        except (TypeError, ValueError):
+            return None, f"People of dish {n} must be a number."
+        if dish_people < 1:
+            return None, f"People of dish {n} must be at least 1."
+        parsed.append({"name": entry.get("name") or dish, "dish": dish, "people": dish_people})
+
+    return {"dishes": parsed, "budget": budget}, None
+
+
+# -------------------------------------------------
+#  DISHES -> BASKETS
+# -------------------------------------------------
+def dish_baskets(dishes):
+    """
+    (name, quantity) items for every dish: given lists as they are,
+    generated ones fetched concurrently, once per normalized dish and
+    people. A dish whose ingredients couldn't be generated gets its
+    failure instead.
+    """
+    pending = {}
+    for dish in dishes:
+        if "items" not in dish:
+            pending.setdefault((normalize_key(dish["dish"]), dish["people"]), dish["dish"])
+
+    keys = list(pending)
+    generated = dict(zip(keys, fan_out(lambda key: get_dish_ingredients(pending[key], key[1]), keys)))
+
+    baskets = []
+    for dish in dishes:
+        if "items" in dish:
+            baskets.append((dish["items"], None))
+            continue
+        result = generated[(normalize_key(dish["dish"]), dish["people"])]
+        if result is None:
+            result = {"success": False, "error": "Ingredient generation failed or timed out."}
+        if not result["success"]:
+            baskets.append(([], result))
+            continue
+        baskets.append(([(i["name"], i["quantity"]) for i in result["ingredients"]], None))
+    return baskets
+
+
+def combine(baskets):
+    """
+    Merges the items of every basket into unique lines: same normalized
+    name and unit group (see units.measure), quantities added up. Every
+    item links to its line with its share of the total amount; quantities
+    without a number ("to taste") share their line equally.
+    Returns (lines, links), links[basket][item] = (line index, share).
+    """
+    lines = []
+    index = {}
+    for b, items in enumerate(baskets):
+        for i, (name, quantity) in enumerate(items):
+            measured = measure(quantity)
+            group = measured[0] if measured else None
+            key = (normalize_key(name), group)
+            if key not in index:
+                index[key] = len(lines)
+                lines.append({"name": name, "quantity": quantity, "group": group, "parts": []})
+            lines[index[key]]["parts"].append((b, i, measured[1] if measured else None))
+
+    links = [[None] * len(items) for items in baskets]
+    names = set()
+    for n, line in enumerate(lines):
+        parts = line.pop("parts")
+        group = line.pop("group")
+        if group is not None:
+            total = sum(amount for _, _, amount in parts)
+            line["quantity"] = format_measure(group, total)
+            shares = [amount / total for _, _, amount in parts]
+        else:
+            shares = [1 / len(parts)] * len(parts)
+        for (b, i, _), share in zip(parts, shares):
+            links[b][i] = (n, share)
+
+        # Dish entries link to their line by name: keep "garlic" in heads and in cloves apart
+        if line["name"] in names:
+            line["name"] = f"{line['name']} ({line['quantity']})"
+        names.add(line["name"])
+
+    return lines, links
+
+
+def share_of(price, share):
+    return round(price * share, 2) if price is not None else None
+
+
+def dish_summary(entries):
+    """
+    Totals of one dish's share of the combined basket: per store, every
+    ingredient at its cheapest store, and as bought in the combined plan.
+    """
+    store_totals = {}
+    for entry in entries:
+        for store, price in entry["prices"].items():
+            if price is None:
+                continue
+            total = store_totals.setdefault(store, {"total": 0.0, "covered": 0})
+            total["total"] = round(total["total"] + price, 2)
+            total["covered"] += 1
+
+    return {
+        "store_totals": store_totals,
+        "cheapest_cost": round(sum(e["cheapest_price"] or 0 for e in entries), 2),
+        "plan_cost": round(sum(e["plan_price"] or 0 for e in entries), 2),
+    }
+
+
+# -------------------------------------------------
+#  MEAL PLAN
+# -------------------------------------------------
+def meal_plan(dishes, budget=None):
+    """
+    Prices several dishes as one shopping trip, as (response, status).
+    Ingredients shared between dishes are merged and priced once, so AI
+    calls grow with the unique ingredients, not the line items; the store
+    optimizer runs once over the combined basket. Every dish gets its
+    share of the combined prices (by amount), and what it costs under the
+    combined plan.
+    """
+    use_ai = ai_available()
+    baskets = dish_baskets(dishes)
+    lines, links = combine([items for items, _ in baskets])
+
+    priced = quote_prices([(line["name"], line["quantity"]) for line in lines], use_ai=use_ai)
+    combined = [
+        {**price_entry(line["name"], line["quantity"], prices or {}, purchase), "used_by": []}
+        for line, (prices, purchase) in zip(lines, priced)
+    ]
+    priced_lines = [n for n, entry in enumerate(combined) if entry["prices"]]
+    summary = summarize_recommendation([combined[n] for n in priced_lines], budget)
+    # Combined line -> its store in the budget plan
+    plan_stores = dict(zip(priced_lines, (summary["budget_plan"] or {}).get("assignment", [])))
+
+    results = []
+    for dish, (items, failure), dish_links in zip(dishes, baskets, links):
+        result = {"name": dish["name"]}
+        if "dish" in dish:
+            result.update(dish=dish["dish"], people=dish["people"])
+        if failure is not None:
+            results.append({**result, **failure, "ingredients": []})
+            continue
+
+        entries = []
+        for (name, quantity), (n, share) in zip(items, dish_links):
+            line = combined[n]
+            if dish["name"] not in line["used_by"]:
+                line["used_by"].append(dish["name"])
+            prices = {store: share_of(price, share) for store, price in line["prices"].items()}
+            plan_store = plan_stores.get(n)
+            entries.append({
+                **price_entry(name, quantity, prices),
+                "line": line["name"],
+                "share": round(share, 4),
+                "plan_store": plan_store,
+                "plan_price": prices.get(plan_store) if plan_store else None,
+            })
+        results.append({**result, "success": True, "ingredients": entries, **dish_summary(entries)})
+
+    failed = [r for r in results if not r["success"]]
+    response = {
+        "dishes": results,
+        "combined": {"ingredients": combined, **summary},
+        "line_items": sum(len(items) for items, _ in baskets),
+        "unique_ingredients": len(lines),
+        "catalog_only": not use_ai,
+    }
+    if failed and len(failed) == len(results):
+        # Nothing to price: same status as dish_ingredients()
+        return {"error": failed[0]["error"], **response}, failure_status(failed[0])
+    return response, 200
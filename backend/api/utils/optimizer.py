@@ -0,0 +1,142 @@
+from itertools import combinations
+import numpy as np
+from django.conf import settings
+from .generate import STORES
+
+
+def to_price(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return np.nan
+    return value if value >= 0 else np.nan
+
+
+def price_matrix(entries, stores=None):
+    """
+    ingredients x stores price matrix (NaN where a store has no price) and
+    the store names of its columns. Stores default to every store seen in
+    the entries, known stores first.
+    """
+    if stores is None:
+        seen = dict.fromkeys(STORES)
+        for entry in entries:
+            seen.update(dict.fromkeys(entry["prices"]))
+        stores = list(seen)
+
+    matrix = np.array(
+        [[to_price(entry["prices"].get(store)) for store in stores] for entry in entries],
+        dtype=np.float64,
+    ).reshape(len(entries), len(stores))
+    return matrix, list(stores)
+
+
+def store_subsets(store_count, max_stores):
+    """
+    Every non-empty set of at most max_stores stores, as a bool mask array.
+    """
+    masks = []
+    for size in range(1, min(max_stores, store_count) + 1):
+        for subset in combinations(range(store_count), size):
+            mask = np.zeros(store_count, dtype=bool)
+            mask[list(subset)] = True
+            masks.append(mask)
+    return np.array(masks, dtype=bool).reshape(-1, store_count)
+
+
+def subset_costs(matrix, masks):
+    """
+    For every store subset: how many ingredients it covers, what they cost
+    when each is bought at the cheapest store of the subset, and which
+    column that is (-1 if none). One broadcast over ingredients x subsets x stores.
+    """
+    priced = np.where(np.isnan(matrix), np.inf, matrix)
+    per_subset = np.where(masks[None, :, :], priced[:, None, :], np.inf)
+    best = per_subset.min(axis=2)
+    choice = np.where(np.isfinite(best), per_subset.argmin(axis=2), -1)
+
+    covered = np.isfinite(best)
+    coverage = covered.sum(axis=0)
+    cost = np.where(covered, best, 0.0).sum(axis=0)
+    return coverage, cost, choice
+
+
+def plan(masks, index, coverage, cost, choice, stores):
+    """
+    One store subset as a plan. assignment[i] is the store entries[i] is
+    bought at (None if no store of the plan sells it), so entries with the
+    same name keep their own stores.
+    """
+    return {
+        "stores": [stores[j] for j in np.flatnonzero(masks[index])],
+        "cost": round(float(cost[index]), 2),
+        "covered": int(coverage[index]),
+        "assignment": [stores[j] if j >= 0 else None for j in choice[:, index]],
+    }
+
+
+# -------------------------------------------------
+#  STORE / BUDGET OPTIMIZER
+# -------------------------------------------------
+def optimize(entries, budget=None, max_stores=None):
+    """
+    Store plans for priced ingredient entries:
+    - single_store: the store covering the most ingredients, cheapest first
+    - store_totals: full basket cost and coverage per store
+    - best_split: cheapest way to buy everything from at most max_stores stores
+    - budget_plan: the fewest-store, then cheapest, plan within budget
+      (the cheapest plan, marked fits=False, when nothing fits)
+    - cheapest: every ingredient at its cheapest store, with the spend per store
+    """
+    if max_stores is None:
+        max_stores = settings.OPTIMIZER_MAX_STORES
+
+    matrix, stores = price_matrix(entries)
+    masks = store_subsets(len(stores), max(1, max_stores))
+    coverage, cost, choice = subset_costs(matrix, masks)
+    sizes = masks.sum(axis=1)
+
+    # Every ingredient at its cheapest store: the cheapest possible basket
+    priced = ~np.isnan(matrix)
+    covered = priced.any(axis=1)
+    cheapest_column = np.where(covered, np.where(priced, matrix, np.inf).argmin(axis=1), -1)
+    spend = np.zeros(len(stores))
+    rows = np.flatnonzero(covered)
+    np.add.at(spend, cheapest_column[rows], matrix[rows, cheapest_column[rows]])
+
+    singles = np.flatnonzero(sizes == 1)
+    store_totals = {
+        stores[masks[i].argmax()]: {"total": round(float(cost[i]), 2), "covered": int(coverage[i])}
+        for i in singles
+    }
+
+    # Most coverage first, then cost, then fewest stores
+    order = np.lexsort((sizes, cost, -coverage))
+    best_single = next((i for i in order if sizes[i] == 1), None)
+    best_split = order[0] if len(order) else None
+
+    budget_plan = None
+    if best_split is not None:
+        # Plans that still buy everything any store sells
+        fitting = np.flatnonzero(coverage == covered.sum())
+        if budget is not None:
+            fitting = fitting[cost[fitting] <= budget + 1e-9]
+        if len(fitting):
+            index = fitting[np.lexsort((cost[fitting], sizes[fitting]))[0]]
+            budget_plan = {**plan(masks, index, coverage, cost, choice, stores), "fits": True}
+        else:
+            budget_plan = {**plan(masks, best_split, coverage, cost, choice, stores), "fits": False}
+        if budget is not None:
+            budget_plan["shortfall"] = round(max(0.0, budget_plan["cost"] - budget), 2)
+
+    return {
+        "stores": stores,
+        "single_store": stores[masks[best_single].argmax()] if best_single is not None else None,
+        "store_totals": store_totals,
+        "best_split": plan(masks, best_split, coverage, cost, choice, stores) if best_split is not None else None,
+        "budget_plan": budget_plan,
+        "cheapest": {
+            "cost": float(spend.sum()),
+            "per_store": {store: float(total) for store, total in zip(stores, spend)},
+        },
+    }
@@ -0,0 +1,215 @@
+import json
+import re
+from typing import Annotated, Dict, List, Optional
+import ujson
+from pydantic import BaseModel, BeforeValidator, RootModel, ValidationError, model_validator
+
+
+OPENERS = {"{": "}", "[": "]"}
+TOKENS = re.compile(r'[\[\]{}"\\]')
+FIRST_OPENER = re.compile(r"[\[{]")
+
+
+# -------------------------------------------------
+#  JSON EXTRACTION
+# -------------------------------------------------
+def extract_json(text):
+    """
+    The first balanced JSON object or array in text, skipping any prose or
+    code fences around it, in one pass that only stops at brackets, quotes
+    and backslashes. Brackets inside strings don't count. Returns None if
+    there's no complete value.
+    """
+    start = -1
+    stack = []
+    in_string = False
+    skip_to = -1
+    # Earliest-starting value that closed inside the current candidate:
+    # what a rescan from the next opener would find if the candidate breaks
+    closed = None
+
+    for match in TOKENS.finditer(text):
+        i = match.start()
+        if i < skip_to:
+            continue
+        char = match.group()
+
+        if start < 0:
+            if char in OPENERS:
+                start = i
+                stack.append((OPENERS[char], i))
+            continue
+
+        if in_string:
+            if char == "\\":
+                # Skip the escaped character
+                skip_to = i + 2
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in OPENERS:
+            stack.append((OPENERS[char], i))
+        elif char in "]}":
+            closer, opened = stack.pop()
+            if char != closer:
+                # Not JSON after all (e.g. "[note}"). Every opener still on
+                # the stack breaks at this same closer, so resume after it
+                if closed is not None:
+                    return text[closed[0]:closed[1] + 1]
+                start, stack = -1, []
+                continue
+            if not stack:
+                return text[start:i + 1]
+            if closed is None or opened < closed[0]:
+                closed = (opened, i)
+    return None
+
+
+def decode_json(text):
+    """
+    ujson first (fast), json as the fallback for what ujson rejects.
+    """
+    try:
+        return ujson.loads(text)
+    except ValueError:
+        return json.loads(text)
+
+
+def find_json(text):
+    """
+    Decodes the first JSON value in text. Tries, cheapest first: the whole
+    text (JSON mode), the span from the first opener to the last matching
+    closer (one value wrapped in prose or fences), then extract_json.
+    Raises ValueError if there's none.
+    """
+    try:
+        return decode_json(text)
+    except ValueError:
+        pass
+
+    opener = FIRST_OPENER.search(text)
+    if opener is None:
+        raise ValueError("No JSON value found")
+    start = opener.start()
+    end = text.rfind(OPENERS[text[start]])
+    if end > start:
+        try:
+            return decode_json(text[start:end + 1])
+        except ValueError:
+            pass
+
+    candidate = extract_json(text[start:])
+    if candidate is None:
+        raise ValueError("No complete JSON value found")
+    return decode_json(candidate)
+
+
+# -------------------------------------------------
+#  RESPONSE SCHEMAS (one per prompt kind)
+# -------------------------------------------------
+def to_price(value):
+    """
+    "₱1,250.50", 1250.5 or "1250" -> 1250.5; anything else -> None.
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, str):
+        value = value.replace("₱", "").replace("PHP", "").replace(",", "").strip()
+    try:
+        value = round(float(value), 2)
+    except (TypeError, ValueError):
+        return None
+    return value if value >= 0 else None
+
+
+def to_text(value):
+    return "" if value is None else str(value).strip()
+
+
+Price = Annotated[Optional[float], BeforeValidator(to_price)]
+Text = Annotated[str, BeforeValidator(to_text)]
+
+
+class StorePrices(BaseModel):
+    osave: Price = None
+    dali: Price = None
+    pampanga_market: Price = None
+
+
+class BatchPrices(RootModel[Dict[str, StorePrices]]):
+    @model_validator(mode="before")
+    @classmethod
+    def drop_malformed(cls, value):
+        # One bad entry shouldn't cost the rest of the batch
+        if isinstance(value, dict):
+            return {k: v for k, v in value.items() if isinstance(v, dict)}
+        return value
+
+
+class Ingredient(BaseModel):
+    name: Text
+    quantity: Text = ""
+
+
+class DishIngredients(RootModel[List[Ingredient]]):
+    @model_validator(mode="before")
+    @classmethod
+    def drop_malformed(cls, value):
+        if isinstance(value, list):
+            return [v for v in value if isinstance(v, dict) and v.get("name")]
+        return value
+
+
+# Gemini response schemas (OpenAPI subset) for JSON mode. Batch prices are
+# keyed by ingredient name, which the subset can't express: JSON mode only.
+PRICE_PROPERTIES = {store: {"type": "number", "nullable": True} for store in ("osave", "dali", "pampanga_market")}
+RESPONSE_SCHEMAS = {
+    StorePrices: {"type": "object", "properties": PRICE_PROPERTIES},
+    DishIngredients: {
+        "type": "array",
+        "items": {
+            "type": "object",
+            "properties": {"name": {"type": "string"}, "quantity": {"type": "string"}},
+            "required": ["name", "quantity"],
+        },
+    },
+}
+
+
+def generation_config(schema):
+    """
+    Asks the model for bare JSON (matching schema where Gemini can express it).
+    """
+    config = {"response_mime_type": "application/json"}
+    if schema in RESPONSE_SCHEMAS:
+        config["response_schema"] = RESPONSE_SCHEMAS[schema]
+    return config
+
+
+# -------------------------------------------------
+#  MODEL OUTPUT -> generate() RESULT
+# -------------------------------------------------
+def parse_response(raw_text, schema=None):
+    """
+    {"success": True, "recommendation": value} for the first JSON value in
+    raw_text, validated and normalized by schema if given;
+    {"success": False, "error", "raw_text"} otherwise.
+    """
+    try:
+        value = find_json(raw_text or "")
+    except ValueError:
+        return {"success": False, "error": "JSON parse failed", "raw_text": raw_text}
+
+    if schema is not None:
+        try:
+            value = schema.model_validate(value).model_dump()
+        except ValidationError as e:
+            return {
+                "success": False,
+                "error": "Schema validation failed",
+                "details": e.errors(include_url=False, include_context=False),
+                "raw_text": raw_text,
+            }
+
+    return {"success": True, "recommendation": value}
@@ -0,0 +1,398 @@
+import collections
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone as dt_timezone
+from asgiref.sync import sync_to_async
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, close_old_connections
+from django.utils import timezone
+from ..models import PriceObservation
+from .generate import STORES, generate_prices_batch, agenerate_prices_batch
+from .matcher import normalize_key
+from .singleflight import prompt_key
+from .tiered_cache import TieredCache
+from .tracing import span
+from .upstream import circuit_open, upstream_degraded
+
+
+logger = logging.getLogger(__name__)
+
+FRESH, STALE, FAILED, MISSING = "fresh", "stale", "failed", "missing"
+
+# Observations are written on one thread, refreshes run on two, both off
+# the request path
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="price_history_writer")
+_refreshers = ThreadPoolExecutor(max_workers=2, thread_name_prefix="price_history_refresh")
+_demand = collections.Counter()
+_demand_items = {}
+_demand_lock = threading.Lock()
+_refresher = None
+_refresher_lock = threading.Lock()
+_prices_cache = None
+_prices_cache_lock = threading.Lock()
+
+
+def get_prices_cache():
+    """
+    Price entries: in-process L1 in front of the shared cache, built on
+    first use so its size and TTL come from the settings in effect then.
+    """
+    global _prices_cache
+    if _prices_cache is None:
+        with _prices_cache_lock:
+            if _prices_cache is None:
+                _prices_cache = TieredCache("prices", settings.PRICE_L1_SIZE, settings.PRICE_L1_TTL)
+    return _prices_cache
+
+
+def price_key(name, quantity):
+    return f"{normalize_key(name)}|{' '.join(str(quantity or '').lower().split())}"
+
+
+def cache_key(key):
+    return f"ai_prices:{prompt_key(key)}"
+
+
+# -------------------------------------------------
+#  OBSERVATIONS (database)
+# -------------------------------------------------
+def record(rows):
+    close_old_connections()
+    try:
+        PriceObservation.objects.bulk_create([PriceObservation(**row) for row in rows])
+    except DatabaseError:
+        logger.exception("price history: recording prices failed")
+
+
+def observation_rows(items, prices_list, source, observed):
+    observed_at = datetime.fromtimestamp(observed, tz=dt_timezone.utc)
+    return [
+        {
+            "key": price_key(name, quantity),
+            "name": str(name)[:255],
+            "quantity": str(quantity or "")[:100],
+            "store": store,
+            "price": price,
+            "source": source,
+            "observed_at": observed_at,
+        }
+        for (name, quantity), prices in zip(items, prices_list)
+        for store, price in (prices or {}).items()
+        if price is not None
+    ]
+
+
+def record_catalog_prices(items, prices_list):
+    """
+    Queues catalog prices for the history, at most once per ingredient
+    quantity every PRICE_FRESH_TTL seconds.
+    """
+    if settings.PRICE_HISTORY_ENABLED and items:
+        _writer.submit(write_catalog_prices, list(items), list(prices_list))
+
+
+def write_catalog_prices(items, prices_list):
+    seen_keys = {f"price_seen:{prompt_key(price_key(*item))}": (item, prices) for item, prices in zip(items, prices_list)}
+    try:
+        seen = cache.get_many(list(seen_keys))
+        new = {k: v for k, v in seen_keys.items() if k not in seen}
+        if not new:
+            return
+        cache.set_many({k: 1 for k in new}, timeout=settings.PRICE_FRESH_TTL)
+    except Exception:
+        logger.exception("price history: counting requests failed")
+        return
+
+    new_items = [item for item, _ in new.values()]
+    new_prices = [prices for _, prices in new.values()]
+    record(observation_rows(new_items, new_prices, PriceObservation.CATALOG, time.time()))
+
+
+def latest_observations(keys):
+    """
+    {key: {"prices", "observed"}} from the newest AI observation of each key
+    within PRICE_STALE_TTL.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.PRICE_STALE_TTL)
+    try:
+        rows = list(
+            PriceObservation.objects
+            .filter(key__in=keys, source=PriceObservation.AI, observed_at__gte=cutoff)
+            .order_by("key", "-observed_at")
+            .values_list("key", "store", "price", "observed_at")
+        )
+    except DatabaseError:
+        logger.exception("price history: reading prices failed")
+        return {}
+
+    entries = {}
+    for key, store, price, observed_at in rows:
+        observed = observed_at.timestamp()
+        entry = entries.get(key)
+        if entry is None:
+            entry = entries[key] = {"prices": dict.fromkeys(STORES), "observed": observed}
+        # Only the stores of the newest reply
+        if observed == entry["observed"]:
+            entry["prices"][store] = price
+    return entries
+
+
+# -------------------------------------------------
+#  READ PATH (cache, then history, then the AI)
+# -------------------------------------------------
+def read_entries(keys):
+    """
+    Cached entries of keys, filled from the history on a cache miss:
+    {"prices", "observed"} for a price, {"failed"} for a recent failure.
+    """
+    prices_cache = get_prices_cache()
+    with span("cache"):
+        cached = prices_cache.get_many([cache_key(k) for k in keys])
+    entries = {k: cached[cache_key(k)] for k in keys if cache_key(k) in cached}
+
+    missing = [k for k in keys if k not in entries]
+    if missing:
+        recorded = latest_observations(missing)
+        if recorded:
+            with span("cache"):
+                prices_cache.set_many(
+                    {cache_key(k): e for k, e in recorded.items()}, timeout=settings.PRICE_STALE_TTL, notify=False
+                )
+            entries.update(recorded)
+    return entries
+
+
+def state_of(entry, now):
+    if entry is None:
+        return MISSING
+    if "failed" in entry:
+        return FAILED if now - entry["failed"] < settings.PRICE_NEGATIVE_TTL else MISSING
+    age = now - entry["observed"]
+    if age < settings.PRICE_FRESH_TTL:
+        return FRESH
+    if age < settings.PRICE_STALE_TTL:
+        return STALE
+    return MISSING
+
+
+def note_demand(keys, items):
+    with _demand_lock:
+        for key, item in zip(keys, items):
+            _demand[key] += 1
+            _demand_items[key] = item
+
+
+def plan(items):
+    """
+    (known prices or None per item, indexes to ask the AI for, stale items
+    to refresh in the background).
+    """
+    keys = [price_key(name, quantity) for name, quantity in items]
+    note_demand(keys, items)
+    entries = read_entries(list(dict.fromkeys(keys)))
+
+    now = time.time()
+    results = [None] * len(items)
+    fetch = []
+    stale = {}
+    for i, key in enumerate(keys):
+        entry = entries.get(key)
+        state = state_of(entry, now)
+        if state in (FRESH, STALE):
+            results[i] = dict(entry["prices"])
+        if state == STALE:
+            stale[key] = items[i]
+        elif state == MISSING:
+            fetch.append(i)
+        # FAILED: no AI price until the negative entry expires
+    return results, fetch, list(stale.values())
+
+
+def save_prices(items, prices_list, keep_failures=True):
+    """
+    Caches and records AI prices. Failures are cached for
+    PRICE_NEGATIVE_TTL seconds only (unless keep_failures is off, so a
+    failed refresh doesn't hide the stale price, and an outage or the rate
+    limit doesn't hide prices once the AI answers again).
+    """
+    now = time.time()
+    priced = {}
+    failed = {}
+    good_items, good_prices = [], []
+    for item, prices in zip(items, prices_list):
+        key = cache_key(price_key(*item))
+        if prices and any(v is not None for v in prices.values()):
+            prices = {store: prices.get(store) for store in STORES}
+            priced[key] = {"prices": prices, "observed": now}
+            good_items.append(item)
+            good_prices.append(prices)
+        else:
+            failed[key] = {"failed": now}
+
+    prices_cache = get_prices_cache()
+    with span("cache"):
+        if priced:
+            prices_cache.set_many(priced, timeout=settings.PRICE_STALE_TTL)
+        if failed and keep_failures:
+            prices_cache.set_many(failed, timeout=settings.PRICE_NEGATIVE_TTL)
+    if good_items:
+        _writer.submit(record, observation_rows(good_items, good_prices, PriceObservation.AI, now))
+
+
+def get_ai_prices(items, use_ai=True):
+    """
+    AI prices for (name, quantity) pairs, in input order (None where there
+    is none). Fresh and stale prices come from the cache or the history;
+    stale ones are refreshed in the background. Only the rest is asked of
+    the AI, in batches. use_ai=False (AI down or budget spent) serves what
+    the cache and the history have without asking the AI.
+    """
+    items = list(items)
+    if not settings.PRICE_HISTORY_ENABLED:
+        return generate_prices_batch(items) if use_ai else [None] * len(items)
+
+    results, fetch, stale = plan(items)
+    if not use_ai:
+        return results
+    if stale:
+        refresh_later(stale)
+    if fetch:
+        fetch_items = [items[i] for i in fetch]
+        fetched = generate_prices_batch(fetch_items)
+        save_prices(fetch_items, fetched, keep_failures=not upstream_degraded())
+        for i, prices in zip(fetch, fetched):
+            results[i] = prices
+    return results
+
+
+async def aget_ai_prices(items, chunk_size=None, use_ai=True):
+    """
+    Async get_ai_prices() for the event loop.
+    """
+    items = list(items)
+    if not settings.PRICE_HISTORY_ENABLED:
+        return await agenerate_prices_batch(items, chunk_size=chunk_size) if use_ai else [None] * len(items)
+
+    # plan() may read the history table; database_sync_to_async closes the
+    # worker thread's stale connections around it
+    results, fetch, stale = await database_sync_to_async(plan, thread_sensitive=False)(items)
+    if not use_ai:
+        return results
+    if stale:
+        refresh_later(stale)
+    if fetch:
+        fetch_items = [items[i] for i in fetch]
+        fetched = await agenerate_prices_batch(fetch_items, chunk_size=chunk_size)
+        keep_failures = not await sync_to_async(upstream_degraded, thread_sensitive=False)()
+        await sync_to_async(save_prices, thread_sensitive=False)(fetch_items, fetched, keep_failures)
+        for i, prices in zip(fetch, fetched):
+            results[i] = prices
+    return results
+
+
+# -------------------------------------------------
+#  BACKGROUND REFRESH
+# -------------------------------------------------
+def refresh_lock(item):
+    return f"price_refresh:{prompt_key(price_key(*item))}"
+
+
+def claim(items):
+    """
+    The items no other thread or process is refreshing right now.
+    """
+    timeout = int(settings.AI_REQUEST_DEADLINE * 2)
+    return [item for item in items if cache.add(refresh_lock(item), 1, timeout=timeout)]
+
+
+def refresh(items):
+    """
+    Re-prices items with the AI; returns how many got a new price.
+    """
+    close_old_connections()
+    items = claim(items)
+    if not items:
+        return 0
+    try:
+        prices_list = generate_prices_batch(items)
+        save_prices(items, prices_list, keep_failures=False)
+    finally:
+        cache.delete_many([refresh_lock(item) for item in items])
+    return sum(1 for prices in prices_list if prices and any(v is not None for v in prices.values()))
+
+
+def refresh_safely(items):
+    try:
+        return refresh(items)
+    except Exception:
+        logger.exception("price history: refresh failed")
+        return 0
+
+
+def refresh_later(items):
+    _refreshers.submit(refresh_safely, items)
+
+
+def popular(limit):
+    """
+    The limit most requested items since the last call; counts are halved
+    each time so old favourites fade out.
+    """
+    with _demand_lock:
+        top = [_demand_items[key] for key, _ in _demand.most_common(limit)]
+        for key in list(_demand):
+            _demand[key] //= 2
+            if not _demand[key]:
+                del _demand[key]
+                del _demand_items[key]
+    return top
+
+
+def refresh_popular():
+    """
+    Re-prices this process' popular ingredients whose price is older than
+    PRICE_REFRESH_AGE, before they go stale. Skipped while the AI is down.
+    """
+    if circuit_open():
+        return 0
+    items = popular(settings.PRICE_REFRESH_BATCH)
+    if not items:
+        return 0
+
+    keys = [price_key(*item) for item in items]
+    entries = read_entries(keys)
+    now = time.time()
+    due = [
+        item for item, key in zip(items, keys)
+        if "observed" in entries.get(key, {}) and now - entries[key]["observed"] >= settings.PRICE_REFRESH_AGE
+    ]
+    return refresh(due) if due else 0
+
+
+def refresh_loop():
+    while True:
+        time.sleep(settings.PRICE_REFRESH_INTERVAL)
+        try:
+            refreshed = refresh_popular()
+            if refreshed:
+                logger.info("price history: refreshed %d popular ingredients", refreshed)
+        except Exception:
+            logger.exception("price history: refreshing popular ingredients failed")
+
+
+def start_refresher():
+    """
+    Starts this process' popular-ingredient refresher, once (off when
+    PRICE_REFRESH_INTERVAL is 0).
+    """
+    global _refresher
+    if not settings.PRICE_HISTORY_ENABLED or settings.PRICE_REFRESH_INTERVAL <= 0:
+        return
+    with _refresher_lock:
+        if _refresher is None:
+            _refresher = threading.Thread(target=refresh_loop, name="price_refresher", daemon=True)
+            _refresher.start()
@@ -0,0 +1,57 @@
+from django.conf import settings
+from .parsing import StorePrices, BatchPrices, DishIngredients
+
+
+# -------------------------------------------------
+#  SYSTEM INSTRUCTIONS (sent once per model, not per prompt)
+# -------------------------------------------------
+PRICING = (
+    "You estimate current grocery prices in PHP at three stores in Pampanga, Philippines: "
+    "OSAVE (osave), DALI (dali) and the local public markets (pampanga_market). "
+    "A price covers the whole stated quantity. Reply with JSON only; use null when you can't estimate."
+)
+COOKING = (
+    "You are a Filipino cooking assistant. Reply with JSON only: a list of "
+    '{"name": ingredient, "quantity": amount with unit} objects.'
+)
+
+
+# -------------------------------------------------
+#  PROMPT REGISTRY
+# -------------------------------------------------
+# kind -> (system instruction, template, response schema)
+PROMPTS = {
+    "prices": (
+        PRICING,
+        'Prices for "{name}", quantity "{quantity}": {{"osave": n, "dali": n, "pampanga_market": n}}',
+        StorePrices,
+    ),
+    "batch_prices": (
+        PRICING,
+        'Prices for each ingredient below ("name": "quantity"), keyed by the name exactly as given, '
+        'each {{"osave": n, "dali": n, "pampanga_market": n}}:\n{lines}',
+        BatchPrices,
+    ),
+    "dish_ingredients": (
+        COOKING,
+        'Ingredients for "{dish}", {people} people.',
+        DishIngredients,
+    ),
+}
+
+
+def render(kind, **params):
+    """
+    generate() keyword arguments (prompt, schema, system) for a registered
+    prompt: generate(**render("prices", name=..., quantity=...)).
+    With AI_SYSTEM_INSTRUCTIONS off, the instructions lead the prompt instead.
+    """
+    system, template, schema = PROMPTS[kind]
+    prompt = template.format(**params)
+    if not settings.AI_SYSTEM_INSTRUCTIONS:
+        return {"prompt": f"{system}\n\n{prompt}", "schema": schema, "system": None}
+    return {"prompt": prompt, "schema": schema, "system": system}
+
+
+def batch_lines(chunk):
+    return "\n".join(f'- "{name}": "{quantity}"' for name, quantity in chunk)
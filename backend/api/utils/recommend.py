@@ -0,0 +1,206 @@
+from .catalog import get_catalog, quote_prices
+from .dish_cache import get_dish_ingredients
+from .optimizer import optimize
+from .substitute import suggest_substitutions
+from .upstream import ai_available
+
+
+def parse_ingredients(ingredients_list):
+    """
+    (name, quantity) pairs from a request's ingredient list, skipping
+    entries that aren't objects or have no name.
+    """
+    items = []
+    for ingredient in ingredients_list:
+        if not isinstance(ingredient, dict):
+            continue
+        name = ingredient.get("name")
+        quantity = ingredient.get("quantity", "")
+        if not name:
+            continue
+        items.append((name, quantity))
+    return items
+
+
+def price_entry(name, quantity, prices, purchase=None):
+    """
+    Builds the result entry for one ingredient from its store prices.
+    purchase holds the catalog product and pack count behind a store price.
+    """
+    # Find cheapest store
+    cheapest_store = min(
+        (k for k, v in prices.items() if v is not None),
+        key=lambda k: prices[k],
+        default=None
+    )
+    cheapest_price = prices.get(cheapest_store) if cheapest_store else None
+
+    return {
+        "name": name,
+        "quantity": quantity,
+        "prices": prices,
+        "cheapest_store": cheapest_store,
+        "cheapest_price": cheapest_price,
+        "purchase": purchase or {}
+    }
+
+
+def summarize_recommendation(entries, budget=None):
+    """
+    Recommended store, totals, store plans and budget check for priced
+    ingredient entries (see optimizer.optimize).
+    """
+    plan = optimize(entries, budget)
+
+    # Everything bought at its cheapest store
+    total_cost = plan["cheapest"]["cost"]
+    within_budget = True if (budget is None or total_cost <= budget) else False
+    adjusted_budget = None if within_budget else total_cost
+
+    # Over budget: cheaper catalog products that would make it fit
+    substitutions = None if within_budget else suggest_substitutions(entries, budget, total_cost)
+
+    return {
+        "recommended_store": plan["single_store"],
+        "total_cost": total_cost,
+        "total_per_store": plan["cheapest"]["per_store"],
+        "within_budget": within_budget,
+        "adjusted_budget": adjusted_budget,
+        "store_totals": plan["store_totals"],
+        "best_split": plan["best_split"],
+        "budget_plan": plan["budget_plan"],
+        "substitutions": substitutions,
+    }
+
+
+# -------------------------------------------------
+#  REQUEST HANDLING (shared by views and jobs)
+# -------------------------------------------------
+def recommendation_params(data):
+    """
+    Validated {"items", "people", "budget"} from a recommendation request,
+    or (None, error message).
+    """
+    people = data.get("people", 1)
+    budget = data.get("budget")
+    ingredients_list = data.get("ingredients", [])
+
+    # Validate people
+    try:
+        people = int(people)
+    except (TypeError, ValueError):
+        return None, "People must be a number."
+    if people < 1:
+        return None, "People must be at least 1."
+
+    # Validate budget
+    try:
+        budget = float(budget) if budget else None
+    except (TypeError, ValueError):
+        return None, "Budget must be a number."
+
+    # Validate ingredients
+    if not isinstance(ingredients_list, list):
+        return None, "Ingredients must be a list."
+
+    return {"items": parse_ingredients(ingredients_list), "people": people, "budget": budget}, None
+
+
+def ingredients_params(data):
+    """
+    Validated {"dish", "people"} from an ingredients request, or (None, error message).
+    """
+    dish = data.get("dish")
+    people = data.get("people", 1)
+
+    if not dish:
+        return None, "Dish parameter is required."
+
+    try:
+        people = int(people)
+    except (TypeError, ValueError):
+        return None, "People must be a number."
+    if people < 1:
+        return None, "People must be at least 1."
+
+    return {"dish": dish, "people": people}, None
+
+
+def recommend(items, budget=None, on_catalog=None):
+    """
+    Prices (name, quantity) pairs and picks a store. on_catalog(entries)
+    is called with the catalog-priced entries before any AI call.
+    Catalog and cached AI prices only once the caller's AI token budget is
+    spent or while the AI is down.
+    """
+    use_ai = ai_available()
+
+    # Price the requested quantities from the catalog, batched AI calls
+    # only for misses (input order kept)
+    def on_catalog_entries(hits):
+        on_catalog([price_entry(*items[i], prices, purchase) for i, prices, purchase in hits])
+
+    priced = quote_prices(items, on_catalog=on_catalog_entries if on_catalog is not None else None, use_ai=use_ai)
+
+    result = [
+        price_entry(name, quantity, prices, purchase)
+        for (name, quantity), (prices, purchase) in zip(items, priced)
+        if prices is not None
+    ]
+    summary = summarize_recommendation(result, budget)
+
+    return {
+        "recommended_store": summary["recommended_store"],
+        "ingredients": result,
+        "total_cost": summary["total_cost"],
+        "total_per_store": summary["total_per_store"],
+        "within_budget": summary["within_budget"],
+        "adjusted_budget": summary["adjusted_budget"],
+        "store_totals": summary["store_totals"],
+        "best_split": summary["best_split"],
+        "budget_plan": summary["budget_plan"],
+        "substitutions": summary["substitutions"],
+        "catalog_only": not use_ai
+    }
+
+
+def failure_status(generated):
+    if generated.get("budget_exceeded"):
+        return 429
+    if generated.get("upstream_unavailable") or generated.get("rate_limited"):
+        return 503
+    return 500
+
+
+def dish_ingredients(dish, people):
+    """
+    Ingredients of a dish with their catalog prices, as (response, status).
+    """
+    catalog = get_catalog()
+
+    # Cached per dish, scaled to people locally
+    generated = get_dish_ingredients(dish, people)
+
+    if not generated["success"]:
+        details = {k: v for k, v in generated.items() if k != "error"}
+        # No catalog answer for an unknown dish; ask again tomorrow, or
+        # once the AI is back
+        status = failure_status(generated)
+        return {"error": generated["error"], **details}, status
+
+    # Match with store prices
+    result = []
+    for ingredient in generated["ingredients"]:
+        name = ingredient["name"]
+        quantity = ingredient["quantity"]
+        result.append({
+            "name": name,
+            "quantity": quantity,
+            "catalog_prices": catalog.lookup_prices(name, quantity)
+        })
+
+    return {
+        "dish": dish,
+        "people": people,
+        "ingredients": result
+    }, 200
@@ -0,0 +1,173 @@
+import asyncio
+import copy
+import hashlib
+import threading
+import time
+import weakref
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+
+def prompt_key(prompt):
+    """
+    Hash of the prompt with whitespace collapsed, so the same request
+    formatted differently still shares one upstream call.
+    """
+    normalized = " ".join(str(prompt).split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+# -------------------------------------------------
+#  SINGLE-FLIGHT (request coalescing)
+# -------------------------------------------------
+def single_flight(key, func, share=None):
+    """
+    Runs func() once for every group of concurrent callers with the same key.
+    Threads in this process wait on the leader's call without touching the
+    shared cache. Only a leader that has to call upstream takes the lock in
+    the shared cache, so other processes wait on it and pick the result up
+    from there for SINGLE_FLIGHT_RESULT_TTL seconds. share(result) says
+    whether they may (default: any result). Callers get their own copy of
+    the result.
+    """
+    with _inflight_lock:
+        call = _inflight.get(key)
+        leader = call is None
+        if leader:
+            call = _Call()
+            _inflight[key] = call
+
+    if not leader:
+        if call.done.wait(settings.SINGLE_FLIGHT_WAIT):
+            return copy.deepcopy(call.result)
+        # Leader is stuck; don't wait forever
+        return func()
+
+    try:
+        call.result = _single_flight_shared(key, func, share)
+        return copy.deepcopy(call.result)
+    finally:
+        call.done.set()
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+# The shared entry of a flight: PENDING while the leader is calling
+# upstream, then its result
+PENDING = "singleflight:pending"
+
+
+def flight_entry(key):
+    return f"singleflight:{key}"
+
+
+def _single_flight_shared(key, func, share):
+    entry = flight_entry(key)
+
+    # A read first: cheap, and enough when another process has the answer
+    result = cache.get(entry)
+    if result is None:
+        if cache.add(entry, PENDING, timeout=settings.SINGLE_FLIGHT_WAIT):
+            return _publish(entry, func, share)
+        result = cache.get(entry)
+
+    # Another process is calling upstream, or just did
+    deadline = time.monotonic() + settings.SINGLE_FLIGHT_WAIT
+    while result == PENDING and time.monotonic() < deadline:
+        time.sleep(settings.SINGLE_FLIGHT_POLL_INTERVAL)
+        result = cache.get(entry)
+
+    # Published, or the leader failed (or died) without an answer to share
+    return result if result not in (None, PENDING) else func()
+
+
+def _publish(entry, func, share):
+    result = None
+    try:
+        result = func()
+        return result
+    finally:
+        if result is not None and (share is None or share(result)):
+            cache.set(entry, result, timeout=settings.SINGLE_FLIGHT_RESULT_TTL)
+        else:
+            cache.delete(entry)
+
+
+# -------------------------------------------------
+#  SINGLE-FLIGHT (async callers)
+# -------------------------------------------------
+_inflight_async = weakref.WeakKeyDictionary()
+_FAILED = object()
+
+
+async def single_flight_async(key, func, share=None):
+    """
+    single_flight() for coroutines: await func() once for every group of
+    concurrent callers with the same key, on this event loop and, through the
+    shared cache, across processes.
+    """
+    loop = asyncio.get_running_loop()
+    calls = _inflight_async.setdefault(loop, {})
+    future = calls.get(key)
+
+    if future is not None:
+        try:
+            result = await asyncio.wait_for(asyncio.shield(future), settings.SINGLE_FLIGHT_WAIT)
+        except asyncio.TimeoutError:
+            result = _FAILED
+        if result is _FAILED:
+            # Leader is stuck or raised; make our own call
+            return await func()
+        return copy.deepcopy(result)
+
+    future = loop.create_future()
+    calls[key] = future
+    try:
+        result = await _single_flight_shared_async(key, func, share)
+        future.set_result(result)
+        return copy.deepcopy(result)
+    finally:
+        if not future.done():
+            future.set_result(_FAILED)
+        calls.pop(key, None)
+
+
+async def _single_flight_shared_async(key, func, share):
+    entry = flight_entry(key)
+    cache_call = lambda method, *args, **kwargs: sync_to_async(method, thread_sensitive=False)(*args, **kwargs)
+
+    result = await cache_call(cache.get, entry)
+    if result is None:
+        if await cache_call(cache.add, entry, PENDING, timeout=settings.SINGLE_FLIGHT_WAIT):
+            return await _publish_async(entry, func, share, cache_call)
+        result = await cache_call(cache.get, entry)
+
+    deadline = time.monotonic() + settings.SINGLE_FLIGHT_WAIT
+    while result == PENDING and time.monotonic() < deadline:
+        await asyncio.sleep(settings.SINGLE_FLIGHT_POLL_INTERVAL)
+        result = await cache_call(cache.get, entry)
+
+    return result if result not in (None, PENDING) else await func()
+
+
+async def _publish_async(entry, func, share, cache_call):
+    result = None
+    try:
+        result = await func()
+        return result
+    finally:
+        if result is not None and (share is None or share(result)):
+            await cache_call(cache.set, entry, result, timeout=settings.SINGLE_FLIGHT_RESULT_TTL)
+        else:
+            await cache_call(cache.delete, entry)
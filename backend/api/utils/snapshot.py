@@ -0,0 +1,233 @@
+import json
+import logging
+import os
+import struct
+import tempfile
+import threading
+import time
+from pathlib import Path
+import numpy as np
+from django.conf import settings
+from .catalog import Catalog, CATALOG_FILES, set_catalog
+
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"TIPAIDCATALOG1\n\0"
+ALIGN = 64
+NUMERIC_COLUMNS = ("store_codes", "price", "size", "dimension")
+STRING_COLUMNS = ("category", "brand", "product", "weight")
+
+_reload_lock = threading.Lock()
+_loaded = {"signature": None}
+_watcher = None
+
+
+def csv_path(store):
+    return Path(settings.BASE_DIR) / "csv" / f"{store}.csv"
+
+
+def source_signature(stores=CATALOG_FILES):
+    """
+    (mtime, size) of every catalog CSV; a snapshot built from other files is stale.
+    """
+    signature = {}
+    for store in stores:
+        stat = csv_path(store).stat()
+        signature[store] = [stat.st_mtime_ns, stat.st_size]
+    return signature
+
+
+def file_signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+# -------------------------------------------------
+#  SNAPSHOT FILE
+# -------------------------------------------------
+# Layout: MAGIC, header length (uint64), JSON header, then 64-byte aligned
+# raw arrays. Numeric columns are stored as is; string columns as int32
+# codes into one table of distinct strings (-1 for None), kept as a UTF-8
+# blob plus int64 end offsets.
+def write_snapshot(catalog, path, sources):
+    strings = {}
+
+    def code(value):
+        if value is None:
+            return -1
+        return strings.setdefault(str(value), len(strings))
+
+    arrays = {name: np.ascontiguousarray(getattr(catalog, name)) for name in NUMERIC_COLUMNS}
+    for name in STRING_COLUMNS:
+        arrays[name] = np.array([code(v) for v in getattr(catalog, name)], dtype=np.int32)
+
+    encoded = [s.encode("utf-8") for s in strings]
+    arrays["string_ends"] = np.cumsum([len(b) for b in encoded], dtype=np.int64)
+    arrays["string_blob"] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+    columns = {}
+    offset = 0
+    for name, array in arrays.items():
+        offset = -(-offset // ALIGN) * ALIGN
+        columns[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += array.nbytes
+
+    header = json.dumps({
+        "stores": list(catalog.stores),
+        "rows": len(catalog),
+        "sources": sources,
+        "columns": columns,
+    }).encode("utf-8")
+    start = -(-(len(MAGIC) + 8 + len(header)) // ALIGN) * ALIGN
+
+    # Write next to the target and rename over it: readers see the old
+    # file or the new one, never half of one
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC + struct.pack("<Q", len(header)) + header)
+            for name, array in arrays.items():
+                f.seek(start + columns[name]["offset"])
+                f.write(array.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def read_header(path):
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"Not a catalog snapshot: {path}")
+        (length,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(length))
+    header["start"] = -(-(len(MAGIC) + 8 + length) // ALIGN) * ALIGN
+    return header
+
+
+def read_snapshot(path):
+    """
+    Catalog over a memory-mapped snapshot. Numeric columns stay mapped, so
+    every process on the host shares their pages; only the distinct
+    strings are decoded per process.
+    """
+    header = read_header(path)
+    mapped = np.memmap(path, dtype=np.uint8, mode="r")
+
+    def column(name):
+        spec = header["columns"][name]
+        dtype = np.dtype(spec["dtype"])
+        start = header["start"] + spec["offset"]
+        count = int(np.prod(spec["shape"]))
+        return mapped[start:start + count * dtype.itemsize].view(dtype).reshape(spec["shape"])
+
+    ends = column("string_ends")
+    blob = column("string_blob").tobytes()
+    starts = np.concatenate(([0], ends[:-1])) if len(ends) else ends
+    table = np.array([blob[a:b].decode("utf-8") for a, b in zip(starts, ends)] + [None], dtype=object)
+
+    # Code -1 picks the trailing None
+    strings = {name: table[column(name)] for name in STRING_COLUMNS}
+    return Catalog(
+        header["stores"],
+        store_codes=column("store_codes"),
+        price=column("price"),
+        size=column("size"),
+        dimension=column("dimension"),
+        **strings,
+    )
+
+
+def compile_snapshot(path=None, stores=CATALOG_FILES):
+    """
+    Parses the catalog CSVs once and writes them to the snapshot file.
+    """
+    path = path or settings.CATALOG_SNAPSHOT_PATH
+    sources = source_signature(stores)
+    catalog = Catalog.from_csv(stores)
+    write_snapshot(catalog, path, sources)
+    return catalog
+
+
+def snapshot_is_fresh(path):
+    try:
+        return read_header(path)["sources"] == source_signature()
+    except (OSError, ValueError):
+        return False
+
+
+# -------------------------------------------------
+#  LOADING / HOT RELOAD
+# -------------------------------------------------
+def load_catalog():
+    """
+    Installs the process-wide catalog from the snapshot, compiling it first
+    if it's missing or older than the CSVs. Falls back to the CSVs when the
+    snapshot can't be written.
+    """
+    path = settings.CATALOG_SNAPSHOT_PATH
+    with _reload_lock:
+        if not snapshot_is_fresh(path):
+            try:
+                compile_snapshot(path)
+                logger.info("catalog snapshot compiled: %s", path)
+            except OSError as e:
+                logger.warning("catalog snapshot unavailable (%s); reading the CSVs", e)
+                catalog = Catalog.from_csv()
+                set_catalog(catalog)
+                return catalog
+
+        catalog = read_snapshot(path)
+        _loaded["signature"] = file_signature(path)
+        set_catalog(catalog)
+        return catalog
+
+
+def reload_catalog(compile=False):
+    """
+    Swaps in the current snapshot (recompiling it from the CSVs first if
+    asked). Requests already holding the old catalog finish on it.
+    """
+    path = settings.CATALOG_SNAPSHOT_PATH
+    with _reload_lock:
+        if compile:
+            compile_snapshot(path)
+        catalog = read_snapshot(path)
+        _loaded["signature"] = file_signature(path)
+        set_catalog(catalog)
+    logger.info("catalog is reloaded (%d products)", len(catalog))
+    return catalog
+
+
+def watch_snapshot():
+    """
+    Reloads whenever the snapshot file is replaced, e.g. by
+    `manage.py compile_catalog` in another process.
+    """
+    path = settings.CATALOG_SNAPSHOT_PATH
+    while True:
+        time.sleep(settings.CATALOG_WATCH_INTERVAL)
+        signature = file_signature(path)
+        if signature is None or signature == _loaded["signature"]:
+            continue
+        try:
+            reload_catalog()
+        except Exception as e:
+            # Keep serving the old catalog
+            logger.exception("catalog reload failed")
+            _loaded["signature"] = signature
+
+
+def start_watcher():
+    global _watcher
+    if _watcher is None and settings.CATALOG_WATCH_INTERVAL > 0:
+        _watcher = threading.Thread(target=watch_snapshot, name="catalog_watcher", daemon=True)
+        _watcher.start()
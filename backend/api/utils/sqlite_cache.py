@@ -0,0 +1,231 @@
+import contextlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+
+
+# -------------------------------------------------
+#  FILE-BACKED SHARED CACHE
+# -------------------------------------------------
+class SQLiteCache(BaseCache):
+    """
+    Django cache backend on a single SQLite file (WAL mode), so every worker
+    process shares one cache and entries survive restarts.
+
+    Entries carry their own expiry time. Once MAX_ENTRIES is exceeded, the
+    least recently used 1/CULL_FREQUENCY of the entries are evicted; the
+    size is checked every CULL_EVERY writes, not on each one. Reads don't
+    write: the access times of hits are saved in batches (every
+    TOUCH_BATCH hits or TOUCH_INTERVAL seconds, and before a cull), so the
+    LRU order is approximate.
+    """
+
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.path = str(location)
+        self._local = threading.local()
+
+        options = params.get("OPTIONS", {})
+        self._cull_every = max(1, int(options.get("CULL_EVERY", 100)))
+        self._touch_batch = int(options.get("TOUCH_BATCH", 256))
+        self._touch_interval = float(options.get("TOUCH_INTERVAL", 10))
+        self._writes = 0
+        self._touched = {}
+        self._touched_since = time.time()
+        self._touch_lock = threading.Lock()
+
+    def _connection(self):
+        # One connection per thread, reopened after a fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextlib.contextmanager
+    def _transaction(self, conn):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _live(self, expires, now):
+        return expires is None or expires > now
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        lookup = {self._key(key, version): key for key in keys}
+        conn = self._connection()
+        now = time.time()
+
+        placeholders = ",".join("?" * len(lookup))
+        rows = conn.execute(
+            f"SELECT key, value, expires FROM cache WHERE key IN ({placeholders})", list(lookup)
+        ).fetchall()
+
+        found = {}
+        hits = []
+        for db_key, value, expires in rows:
+            if self._live(expires, now):
+                found[lookup[db_key]] = pickle.loads(value)
+                hits.append(db_key)
+
+        if hits:
+            self._touch(conn, hits, now)
+        return found
+
+    def _touch(self, conn, keys, now):
+        """
+        Notes the access time of keys; writes the batch once it's full or old.
+        """
+        with self._touch_lock:
+            self._touched.update(dict.fromkeys(keys, now))
+            if len(self._touched) < self._touch_batch and now - self._touched_since < self._touch_interval:
+                return
+        self._save_touches(conn)
+
+    def _save_touches(self, conn):
+        with self._touch_lock:
+            touched, self._touched = self._touched, {}
+            self._touched_since = time.time()
+        if touched:
+            with self._transaction(conn):
+                conn.executemany(
+                    "UPDATE cache SET accessed = ? WHERE key = ?", [(now, key) for key, now in touched.items()]
+                )
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout=timeout, version=version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        if not data:
+            return []
+        expires = self.get_backend_timeout(timeout)
+        now = time.time()
+        rows = [
+            (self._key(key, version), pickle.dumps(value, self.pickle_protocol), expires, now)
+            for key, value in data.items()
+        ]
+        conn = self._connection()
+        with self._transaction(conn):
+            if expires is not None and expires <= now:
+                # timeout <= 0 means "expire now"
+                conn.executemany("DELETE FROM cache WHERE key = ?", [(row[0],) for row in rows])
+            else:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)", rows
+                )
+        self._wrote(conn, now, len(rows))
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        db_key = self._key(key, version)
+        expires = self.get_backend_timeout(timeout)
+        now = time.time()
+        conn = self._connection()
+        with self._transaction(conn):
+            conn.execute("DELETE FROM cache WHERE key = ? AND expires IS NOT NULL AND expires <= ?", (db_key, now))
+            added = conn.execute(
+                "INSERT OR IGNORE INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)",
+                (db_key, pickle.dumps(value, self.pickle_protocol), expires, now),
+            ).rowcount == 1
+        if added:
+            self._wrote(conn, now)
+        return added
+
+    def incr(self, key, delta=1, version=None):
+        """
+        Atomic across processes: the read and the write share one write lock.
+        """
+        db_key = self._key(key, version)
+        now = time.time()
+        conn = self._connection()
+        with self._transaction(conn):
+            row = conn.execute("SELECT value, expires FROM cache WHERE key = ?", (db_key,)).fetchone()
+            if row is None or not self._live(row[1], now):
+                raise ValueError("Key '%s' not found" % key)
+            value = pickle.loads(row[0]) + delta
+            conn.execute(
+                "UPDATE cache SET value = ?, accessed = ? WHERE key = ?",
+                (pickle.dumps(value, self.pickle_protocol), now, db_key),
+            )
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        db_key = self._key(key, version)
+        now = time.time()
+        updated = self._connection().execute(
+            "UPDATE cache SET expires = ?, accessed = ? WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (self.get_backend_timeout(timeout), now, db_key, now),
+        )
+        return updated.rowcount == 1
+
+    def has_key(self, key, version=None):
+        db_key = self._key(key, version)
+        row = self._connection().execute("SELECT expires FROM cache WHERE key = ?", (db_key,)).fetchone()
+        return row is not None and self._live(row[0], time.time())
+
+    def delete(self, key, version=None):
+        deleted = self._connection().execute("DELETE FROM cache WHERE key = ?", (self._key(key, version),))
+        return deleted.rowcount == 1
+
+    def delete_many(self, keys, version=None):
+        self._connection().executemany("DELETE FROM cache WHERE key = ?", [(self._key(k, version),) for k in keys])
+
+    def clear(self):
+        with self._touch_lock:
+            self._touched = {}
+        self._connection().execute("DELETE FROM cache")
+
+    def _wrote(self, conn, now, rows=1):
+        """
+        Counts new rows; every CULL_EVERY of them, checks the size.
+        """
+        self._writes += rows
+        if self._writes >= self._cull_every:
+            self._writes = 0
+            self._cull(conn, now)
+
+    def _cull(self, conn, now):
+        count = conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        if count <= self._max_entries:
+            return
+        conn.execute("DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?", (now,))
+        count = conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        if count > self._max_entries:
+            # Least recently used first, by the latest access times
+            self._save_touches(conn)
+            evict = max(count - self._max_entries, count // self._cull_frequency if self._cull_frequency else count)
+            conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed LIMIT ?)", (evict,)
+            )
+
+    def close(self, **kwargs):
+        # Connections are per thread and long-lived; nothing to do per request
+        pass
@@ -0,0 +1,176 @@
+import heapq
+import numpy as np
+from django.conf import settings
+from .catalog import get_catalog
+from .matcher import normalize_key
+from .units import parse_quantity
+
+
+# Quality loss of a swap: a flat cost for changing brand plus the relative
+# drop in price per gram/ml/piece (cheaper per unit reads as a lower tier)
+BRAND_CHANGE_LOSS = 0.5
+
+
+def catalog_store(source):
+    for store, mapped in settings.CATALOG_STORE_MAP.items():
+        if mapped == source:
+            return store
+    return source
+
+
+def ingredient_category(catalog, entry, current):
+    """
+    Catalog category of an ingredient: the one of the product it's bought
+    as, else the one of its best catalog match.
+    """
+    if current and current.get("product"):
+        positions = catalog.by_product.get(normalize_key(current["product"]))
+        if positions is not None:
+            return catalog.category[positions[0]]
+
+    positions = catalog.find(entry["name"])
+    return catalog.category[positions[0]] if len(positions) else None
+
+
+def swap_options(catalog, entry, sources):
+    """
+    Cheaper products of the same category that still cover the ingredient's
+    quantity, as [(saving, loss, swap)] sorted by loss. Only the options
+    worth considering are kept: each saves more than every lower-loss one.
+    """
+    store = entry.get("cheapest_store")
+    cost = entry.get("cheapest_price")
+    if not store or cost is None:
+        return []
+
+    current = (entry.get("purchase") or {}).get(store)
+    category = ingredient_category(catalog, entry, current)
+    if category is None:
+        return []
+
+    rows = catalog.cheaper_in_category(category, cost)
+    rows = rows[np.isin(catalog.store_codes[rows], sources)]
+    if len(rows) == 0:
+        return []
+
+    packs = np.ones(len(rows))
+    required = parse_quantity(entry.get("quantity"))
+    current_size = parse_quantity(current["weight"]) if current else None
+    if required is not None:
+        # Same pack and per-piece rules as Catalog.quote
+        rows, packs = catalog.cover(rows, *required)
+        sensible = packs <= settings.CATALOG_MAX_PACKS
+        rows, packs = rows[sensible], packs[sensible]
+    elif current_size is not None:
+        # No quantity to cover: at least as much product as before
+        amount, dimension = current_size
+        same = (catalog.dimension[rows] == dimension) & (catalog.size[rows] >= amount)
+        rows, packs = rows[same], packs[same]
+
+    costs = packs * catalog.price[rows]
+    cheaper = costs < cost
+    rows, packs, costs = rows[cheaper], packs[cheaper], costs[cheaper]
+    if len(rows) == 0:
+        return []
+
+    # Every swap to another brand loses BRAND_CHANGE_LOSS (always, for an
+    # AI-priced ingredient: no product to compare with)
+    loss = np.full(len(rows), BRAND_CHANGE_LOSS)
+    if current:
+        loss[np.isin(rows, catalog.find_brand(current.get("brand") or ""))] = 0.0
+        current_unit = (cost / current["packs"]) / current_size[0] if current_size and current.get("packs") else None
+        if current_unit:
+            drop = 1 - catalog.unit_price[rows] / current_unit
+            loss += np.clip(np.nan_to_num(drop, nan=0.0), 0.0, 1.0)
+
+    # Lowest loss first; keep the options saving more than all before them
+    savings = cost - costs
+    order = np.lexsort((-savings, loss))
+    best_before = np.concatenate(([-np.inf], np.maximum.accumulate(savings[order])[:-1]))
+    order = order[savings[order] > best_before]
+
+    store_names = [catalog_store(source) for source in catalog.stores]
+    options = []
+    for row, n, new_cost, row_loss in zip(rows[order], packs[order], costs[order], loss[order]):
+        options.append((float(cost - new_cost), float(row_loss), {
+            "ingredient": entry["name"],
+            "from": {"store": store, "price": cost, **({
+                "product": current["product"], "brand": current["brand"], "weight": current["weight"],
+            } if current else {})},
+            "to": {
+                "store": store_names[catalog.store_codes[row]],
+                "price": round(float(new_cost), 2),
+                "product": catalog.product[row],
+                "brand": catalog.brand[row],
+                "weight": catalog.weight[row],
+                "packs": int(n),
+            },
+        }))
+    return options
+
+
+# -------------------------------------------------
+#  BUDGET SUBSTITUTIONS
+# -------------------------------------------------
+def suggest_substitutions(entries, budget, total_cost=None):
+    """
+    Catalog swaps (same category, cheaper brand or pack size) that bring
+    the basket under budget for the least quality loss.
+    Greedy over each ingredient's loss/saving frontier (see swap_options):
+    the swap saving the most per unit of loss goes first, then swaps not
+    needed any more are undone, biggest loss first.
+    Returns {"fits", "total_cost", "savings", "swaps"}.
+    """
+    if total_cost is None:
+        total_cost = sum(e["cheapest_price"] for e in entries if e.get("cheapest_price") is not None)
+    gap = total_cost - budget
+
+    catalog = get_catalog()
+    sources = [
+        catalog.stores.index(source) for source in settings.CATALOG_STORE_MAP.values()
+        if source in catalog.stores
+    ]
+
+    fronts = [swap_options(catalog, entry, sources) if gap > 0 else [] for entry in entries]
+    chosen = [-1] * len(entries)
+    saved = 0.0
+
+    def upgrade(i):
+        step = chosen[i] + 1
+        if step >= len(fronts[i]):
+            return None
+        saving, loss = fronts[i][step][:2]
+        before_saving, before_loss = fronts[i][chosen[i]][:2] if chosen[i] >= 0 else (0.0, 0.0)
+        return -(saving - before_saving) / (loss - before_loss + 0.01), i, step
+
+    heap = [u for u in (upgrade(i) for i in range(len(entries))) if u]
+    heapq.heapify(heap)
+    while heap and saved < gap:
+        _, i, step = heapq.heappop(heap)
+        if chosen[i] != step - 1:
+            continue
+        saved += fronts[i][step][0] - (fronts[i][chosen[i]][0] if chosen[i] >= 0 else 0.0)
+        chosen[i] = step
+        nxt = upgrade(i)
+        if nxt:
+            heapq.heappush(heap, nxt)
+
+    # Undo swaps the basket fits without
+    for i in sorted((i for i in range(len(entries)) if chosen[i] >= 0), key=lambda i: -fronts[i][chosen[i]][1]):
+        if saved - fronts[i][chosen[i]][0] >= gap:
+            saved -= fronts[i][chosen[i]][0]
+            chosen[i] = -1
+
+    swaps = []
+    for i, step in enumerate(chosen):
+        if step >= 0:
+            saving, loss, swap = fronts[i][step]
+            swaps.append({**swap, "saving": round(saving, 2), "quality_loss": round(loss, 3)})
+
+    new_total = total_cost - saved
+    return {
+        "fits": new_total <= budget + 1e-9,
+        "total_cost": round(new_total, 2),
+        "savings": round(saved, 2),
+        "swaps": swaps,
+    }
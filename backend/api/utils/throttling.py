@@ -0,0 +1,118 @@
+import time
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from .budget import add_count, requester_of
+from .tracing import increment
+
+
+# authentication_classes of the throttled AI views: the user comes from the
+# token's claims, without a database query per request. These views only
+# need the user's id (requester_of); everything else keeps JWTAuthentication
+# and its is_active/is_staff checks.
+AI_AUTHENTICATION = [JWTStatelessUserAuthentication]
+
+
+# -------------------------------------------------
+#  RATE CHECK (shared cache, fixed window)
+# -------------------------------------------------
+def scope_rate(scope, authenticated):
+    """
+    (scope, rate) for a caller: anonymous callers get "<scope>_anon".
+    Scopes without a rate in DEFAULT_THROTTLE_RATES aren't throttled.
+    """
+    if not authenticated:
+        scope = f"{scope}_anon"
+    return scope, api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+
+
+# Rate periods as DRF spells them ("30/min", "1000/day"): first letter counts
+PERIODS = {"s": 1, "m": 60, "h": 60 * 60, "d": 60 * 60 * 24}
+
+
+def parse_rate(rate):
+    """
+    (requests, seconds) of a DRF rate string: "30/min" -> (30, 60).
+    """
+    requests, period = rate.split("/")
+    return int(requests), PERIODS[period[0]]
+
+
+def hit(scope, rate, requester, now):
+    """
+    Counts one request of requester against rate ("30/min") in scope.
+    One atomic increment of this window's counter, whatever the rate.
+    Returns None if it's allowed, else the seconds until the window resets.
+    """
+    limit, duration = parse_rate(rate)
+    window, into = divmod(now, duration)
+    count = add_count(f"throttle:{scope}:{requester}:{int(window)}", 1, timeout=duration * 2)
+    if count <= limit:
+        return None
+    increment("tipaid_throttled_total", {"scope": scope})
+    return duration - into
+
+
+def check(scopes, requester, authenticated, now):
+    """
+    hit() for every scope; the longest wait, or None if all allow it.
+    For callers outside DRF (the websocket).
+    """
+    waits = []
+    for scope in scopes:
+        scope, rate = scope_rate(scope, authenticated)
+        if rate:
+            wait = hit(scope, rate, requester, now)
+            if wait is not None:
+                waits.append(wait)
+    return max(waits, default=None)
+
+
+# -------------------------------------------------
+#  DRF THROTTLES
+# -------------------------------------------------
+class CounterRateThrottle(BaseThrottle):
+    """
+    DRF's SimpleRateThrottle rates on a per-window counter in the shared
+    cache: one atomic increment per request (O(1), no database), where
+    SimpleRateThrottle keeps a list of timestamps that concurrent workers
+    read and overwrite.
+    Callers are told apart by requester_of(): the user of a valid JWT, else
+    the IP, and anonymous callers get the scope's "_anon" rate.
+    """
+
+    scope = None
+    timer = time.time
+
+    def __init__(self):
+        super().__init__()
+        # The rate depends on the caller; picked in allow_request()
+        self.wait_seconds = None
+
+    def allow_request(self, request, view):
+        authenticated = bool(request.user and request.user.is_authenticated)
+        scope, rate = scope_rate(self.scope, authenticated)
+        if not rate:
+            return True
+        self.wait_seconds = hit(scope, rate, requester_of(request), self.timer())
+        return self.wait_seconds is None
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class AIThrottle(CounterRateThrottle):
+    """
+    All AI endpoints together, per caller.
+    """
+
+    scope = "ai"
+
+
+def ai_throttles(endpoint):
+    """
+    throttle_classes of an AI view: the shared "ai" rate plus the
+    endpoint's own scope.
+    """
+    endpoint_throttle = type(f"{endpoint.title().replace('_', '')}Throttle", (CounterRateThrottle,), {"scope": endpoint})
+    return [AIThrottle, endpoint_throttle]
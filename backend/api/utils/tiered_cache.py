@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from cachetools import TTLCache
+from channels.layers import InMemoryChannelLayer, get_channel_layer
+from django.core.cache import cache
+from .tracing import increment
+
+
+logger = logging.getLogger(__name__)
+
+GROUP = "tipaid.cache-invalidation"
+# Tells this process' own broadcasts apart from the other workers'
+ORIGIN = uuid.uuid4().hex
+# Group memberships expire in the channel layer; renew well before that
+REJOIN_INTERVAL = 60 * 60
+
+_missing = object()
+_caches = {}
+_listener_loop = None
+_listener_lock = threading.Lock()
+
+
+# -------------------------------------------------
+#  L1 (per process) IN FRONT OF L2 (shared cache)
+# -------------------------------------------------
+class TieredCache:
+    """
+    A bounded in-process TTL/LRU cache (L1) in front of the shared Django
+    cache (L2). Reads take what they can from L1 and fetch every miss from
+    L2 in one get_many; writes go to both, and the other workers are told
+    through the channel layer to drop their L1 copies. L1 entries live at
+    most ttl seconds, which bounds staleness if a broadcast is lost.
+    Values are shared between callers: treat them as read-only.
+    """
+
+    def __init__(self, name, maxsize, ttl):
+        self.name = name
+        self.l1 = TTLCache(maxsize, ttl) if maxsize > 0 and ttl > 0 else None
+        self._lock = threading.Lock()
+        _caches[name] = self
+
+    def get_many(self, keys):
+        found = {}
+        missing = list(keys)
+        if self.l1 is not None:
+            ensure_listener()
+            missing = []
+            with self._lock:
+                for key in keys:
+                    value = self.l1.get(key, _missing)
+                    if value is _missing:
+                        missing.append(key)
+                    else:
+                        found[key] = value
+            increment("tipaid_l1_cache_total", {"cache": self.name, "result": "hit"}, len(found))
+            increment("tipaid_l1_cache_total", {"cache": self.name, "result": "miss"}, len(missing))
+
+        if missing:
+            fetched = cache.get_many(missing)
+            found.update(fetched)
+            self._remember(fetched)
+        return found
+
+    def set_many(self, mapping, timeout, notify=True):
+        """
+        notify=False skips the broadcast, for refills of values the other
+        workers can't hold a newer copy of.
+        """
+        if not mapping:
+            return
+        cache.set_many(mapping, timeout=timeout)
+        self._remember(mapping)
+        if notify:
+            broadcast(self.name, list(mapping))
+
+    def delete_many(self, keys):
+        keys = list(keys)
+        if not keys:
+            return
+        cache.delete_many(keys)
+        self.forget(keys)
+        broadcast(self.name, keys)
+
+    def forget(self, keys):
+        if self.l1 is None:
+            return
+        with self._lock:
+            for key in keys:
+                self.l1.pop(key, None)
+
+    def clear_local(self):
+        if self.l1 is not None:
+            with self._lock:
+                self.l1.clear()
+
+    def _remember(self, mapping):
+        if self.l1 is None or not mapping:
+            return
+        with self._lock:
+            self.l1.update(mapping)
+
+
+# -------------------------------------------------
+#  INVALIDATION BROADCAST (channel layer)
+# -------------------------------------------------
+def shared_layer():
+    """
+    The channel layer if it reaches other processes; the in-memory layer
+    doesn't, so there's no one to tell.
+    """
+    layer = get_channel_layer()
+    if layer is None or isinstance(layer, InMemoryChannelLayer):
+        return None
+    return layer
+
+
+def broadcast(name, keys):
+    """
+    Tells the other workers to drop keys of cache name from their L1.
+    Fire and forget, on the listener's event loop.
+    """
+    loop = ensure_listener()
+    if loop is None:
+        return
+    message = {"type": "cache.invalidate", "cache": name, "keys": keys, "origin": ORIGIN}
+    asyncio.run_coroutine_threadsafe(shared_layer().group_send(GROUP, message), loop)
+
+
+def invalidated(message):
+    if message.get("origin") == ORIGIN:
+        return
+    tiered = _caches.get(message.get("cache"))
+    if tiered is not None:
+        tiered.forget(message.get("keys") or [])
+
+
+async def listen(layer):
+    channel = await layer.new_channel()
+    loop = asyncio.get_running_loop()
+    while True:
+        await layer.group_add(GROUP, channel)
+        rejoin = loop.time() + REJOIN_INTERVAL
+        while loop.time() < rejoin:
+            try:
+                message = await asyncio.wait_for(layer.receive(channel), timeout=60)
+            except asyncio.TimeoutError:
+                continue
+            invalidated(message)
+
+
+def run_listener(loop, layer):
+    asyncio.set_event_loop(loop)
+    while True:
+        try:
+            loop.run_until_complete(listen(layer))
+        except Exception:
+            logger.exception("L1 invalidation listener failed")
+            time.sleep(5)
+
+
+def ensure_listener():
+    """
+    Starts this process' invalidation listener once; returns its event loop
+    (None without a shared channel layer).
+    """
+    global _listener_loop
+    if _listener_loop is not None:
+        return _listener_loop
+    layer = shared_layer()
+    if layer is None:
+        return None
+    with _listener_lock:
+        if _listener_loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=run_listener, args=(loop, layer), name="cache_invalidation", daemon=True).start()
+            _listener_loop = loop
+    return _listener_loop
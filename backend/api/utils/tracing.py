@@ -0,0 +1,197 @@
+import bisect
+import contextlib
+import contextvars
+import functools
+import random
+import threading
+import time
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+
+
+# Histogram upper bounds (seconds)
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_trace = contextvars.ContextVar("trace", default=None)
+_histograms = {}
+_histograms_lock = threading.Lock()
+_counters = {}
+_noop = contextlib.nullcontext()
+
+
+class Trace:
+    """
+    Span durations of one sampled request or job, summed per span name.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds):
+        with self._lock:
+            total, count = self.spans.get(name, (0.0, 0))
+            self.spans[name] = (total + seconds, count + 1)
+
+
+# -------------------------------------------------
+#  HISTOGRAMS / COUNTERS (per process, Prometheus text format)
+# -------------------------------------------------
+def observe(family, labels, seconds):
+    key = (family, tuple(sorted(labels.items())))
+    with _histograms_lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0}
+        index = bisect.bisect_left(BUCKETS, seconds)
+        if index < len(BUCKETS):
+            histogram["buckets"][index] += 1
+        histogram["sum"] += seconds
+        histogram["count"] += 1
+
+
+def increment(family, labels, amount=1):
+    key = (family, tuple(sorted(labels.items())))
+    with _histograms_lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def label_text(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    return ",".join(f'{name}="{escape(value)}"' for name, value in pairs)
+
+
+def prometheus_text():
+    with _histograms_lock:
+        snapshot = {key: {**h, "buckets": list(h["buckets"])} for key, h in _histograms.items()}
+        counters = dict(_counters)
+
+    lines = []
+    for family in sorted({family for family, _ in counters}):
+        lines.append(f"# TYPE {family} counter")
+        for (name, labels), value in sorted(counters.items()):
+            if name == family:
+                lines.append(f"{family}{{{label_text(labels)}}} {value}")
+    families = sorted({family for family, _ in snapshot})
+    for family in families:
+        lines.append(f"# TYPE {family} histogram")
+        for (name, labels), histogram in sorted(snapshot.items()):
+            if name != family:
+                continue
+            cumulative = 0
+            for bound, count in zip(BUCKETS, histogram["buckets"]):
+                cumulative += count
+                lines.append(f"{family}_bucket{{{label_text(labels, le=bound)}}} {cumulative}")
+            lines.append(f"{family}_bucket{{{label_text(labels, le='+Inf')}}} {histogram['count']}")
+            lines.append(f"{family}_sum{{{label_text(labels)}}} {histogram['sum']:.6f}")
+            lines.append(f"{family}_count{{{label_text(labels)}}} {histogram['count']}")
+    return "\n".join(lines) + "\n"
+
+
+# -------------------------------------------------
+#  TRACES / SPANS
+# -------------------------------------------------
+def start_trace():
+    """
+    Starts a trace for TRACING_SAMPLE_RATE of the calls; returns the
+    (trace, token) to hand to finish_trace, or None when not sampled.
+    """
+    rate = settings.TRACING_SAMPLE_RATE
+    if rate <= 0 or (rate < 1 and random.random() >= rate):
+        return None
+    trace = Trace()
+    return trace, _trace.set(trace)
+
+
+def finish_trace(started):
+    trace, token = started
+    _trace.reset(token)
+    return trace
+
+
+@contextlib.contextmanager
+def _timed(trace, name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        trace.add(name, seconds)
+        observe("tipaid_span_seconds", {"span": name}, seconds)
+
+
+def span(name):
+    """
+    Times a block under name in the current trace; a shared no-op when the
+    request isn't sampled.
+    """
+    trace = _trace.get()
+    if trace is None:
+        return _noop
+    return _timed(trace, name)
+
+
+def traced(name):
+    """
+    span() as a decorator.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def server_timing(trace, total):
+    entries = [
+        f'{name.replace(".", "-")};dur={seconds * 1000:.1f};desc="{name} x{count}"'
+        for name, (seconds, count) in sorted(trace.spans.items())
+    ]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+class TracingMiddleware:
+    """
+    Samples requests, records their spans and duration, and adds a
+    Server-Timing header when TRACING_SERVER_TIMING is on.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = start_trace()
+        if started is None:
+            return self.get_response(request)
+
+        try:
+            response = self.get_response(request)
+        finally:
+            trace = finish_trace(started)
+
+        total = time.perf_counter() - trace.started
+        match = getattr(request, "resolver_match", None)
+        route = match.route if match else "unmatched"
+        observe("tipaid_request_seconds", {"route": route, "method": request.method}, total)
+
+        if settings.TRACING_SERVER_TIMING:
+            response["Server-Timing"] = server_timing(trace, total)
+        return response
+
+
+class TracedJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer with its serialization time as the "render" span.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with span("render"):
+            return super().render(data, accepted_media_type, renderer_context)
@@ -0,0 +1,155 @@
+import re
+import numpy as np
+from .lazy import get_pandas
+
+
+MASS, VOLUME, COUNT = 0, 1, 2
+UNKNOWN = -1
+
+# unit -> (dimension, size in grams / milliliters / pieces)
+UNITS = {
+    "mg": (MASS, 0.001),
+    "g": (MASS, 1.0), "gram": (MASS, 1.0), "grams": (MASS, 1.0),
+    "kg": (MASS, 1000.0), "kilo": (MASS, 1000.0), "kilos": (MASS, 1000.0), "kilogram": (MASS, 1000.0),
+    "kilograms": (MASS, 1000.0),
+    "oz": (MASS, 28.35), "ounce": (MASS, 28.35), "ounces": (MASS, 28.35),
+    "lb": (MASS, 453.6), "lbs": (MASS, 453.6), "pound": (MASS, 453.6), "pounds": (MASS, 453.6),
+    "ml": (VOLUME, 1.0), "milliliter": (VOLUME, 1.0), "milliliters": (VOLUME, 1.0),
+    "l": (VOLUME, 1000.0), "liter": (VOLUME, 1000.0), "liters": (VOLUME, 1000.0),
+    "litre": (VOLUME, 1000.0), "litres": (VOLUME, 1000.0),
+    "cup": (VOLUME, 240.0), "cups": (VOLUME, 240.0),
+    "tbsp": (VOLUME, 15.0), "tablespoon": (VOLUME, 15.0), "tablespoons": (VOLUME, 15.0),
+    "tsp": (VOLUME, 5.0), "teaspoon": (VOLUME, 5.0), "teaspoons": (VOLUME, 5.0),
+}
+
+_QUANTITY = re.compile(r"(\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?)\s*([a-z]+)?")
+
+
+def parse_amount(text):
+    """
+    "2" -> 2.0, "1/2" -> 0.5, "1 1/2" -> 1.5
+    """
+    whole, _, fraction = text.strip().rpartition(" ")
+    if "/" in fraction:
+        numerator, denominator = fraction.split("/")
+        if float(denominator) == 0:
+            return None
+        value = float(numerator) / float(denominator)
+        return value + float(whole) if whole else value
+    return float(text)
+
+
+def parse_quantity(text):
+    """
+    Parses a free-text quantity ("2 cups", "1/2 kg", "3 cloves") into
+    (amount, dimension) in grams, milliliters or pieces.
+    Unknown units count as pieces. Returns None when there is no number.
+    """
+    if text is None:
+        return None
+    match = _QUANTITY.search(str(text).lower())
+    if not match:
+        return None
+
+    amount = parse_amount(match.group(1))
+    if not amount:
+        return None
+
+    dimension, size = UNITS.get(match.group(2) or "", (COUNT, 1.0))
+    return amount * size, dimension
+
+
+# Piece words that all mean "one item"
+PIECES = {"", "pc", "pcs", "piece", "pieces", "x"}
+
+
+def singular(unit):
+    return unit[:-1] if len(unit) > 3 and unit.endswith("s") and not unit.endswith("ss") else unit
+
+
+def measure(text):
+    """
+    (unit group, amount) for adding quantities up: ((MASS, ""), grams),
+    ((VOLUME, ""), milliliters) or ((COUNT, unit word), pieces), so
+    "3 cloves" and "2 clove" add up but "2 heads" stays apart.
+    None when there is no number.
+    """
+    if text is None:
+        return None
+    match = _QUANTITY.search(str(text).lower())
+    if not match:
+        return None
+
+    amount = parse_amount(match.group(1))
+    if not amount:
+        return None
+
+    unit = match.group(2) or ""
+    if unit in UNITS:
+        dimension, size = UNITS[unit]
+        return (dimension, ""), amount * size
+    return (COUNT, "" if unit in PIECES else singular(unit)), amount
+
+
+def format_measure(group, amount):
+    """
+    Quantity text for a measure() total: 1500 g -> "1.5 kg", 5 cloves -> "5 cloves".
+    """
+    dimension, unit = group
+    if dimension == MASS:
+        return f"{format_amount(amount / 1000)} kg" if amount >= 1000 else f"{format_amount(amount)} g"
+    if dimension == VOLUME:
+        return f"{format_amount(amount / 1000)} l" if amount >= 1000 else f"{format_amount(amount)} ml"
+    if not unit:
+        return f"{format_amount(amount)} pcs"
+    return f"{format_amount(amount)} {unit}{'' if amount == 1 else 's'}"
+
+
+def parse_weights(values):
+    """
+    Vectorized parse of a catalog Weight column ("110ml", "1.5kg", "N/A").
+    Returns (sizes, dimensions): canonical sizes as float64 (NaN if unknown)
+    and dimension codes as int8 (UNKNOWN if unknown).
+    """
+    pd = get_pandas()
+    parts = pd.Series(values, dtype=object).astype(str).str.lower().str.extract(
+        r"^\s*(\d+(?:\.\d+)?)\s*([a-z]+)\s*$"
+    )
+    amounts = pd.to_numeric(parts[0], errors="coerce").to_numpy(dtype=np.float64)
+    units = parts[1].to_numpy(dtype=object)
+
+    factors = np.array([UNITS.get(u, (UNKNOWN, np.nan))[1] for u in units], dtype=np.float64)
+    dimensions = np.array([UNITS.get(u, (UNKNOWN, np.nan))[0] for u in units], dtype=np.int8)
+
+    sizes = amounts * factors
+    dimensions[np.isnan(sizes) | (sizes <= 0)] = UNKNOWN
+    return sizes, dimensions
+
+
+def packs_needed(required, sizes):
+    """
+    How many packs of each size cover the required amount (at least one).
+    """
+    return np.maximum(np.ceil(required / sizes - 1e-9), 1)
+
+
+def format_amount(value):
+    return f"{round(value, 2):g}"
+
+
+def scale_quantity(quantity, factor):
+    """
+    Scales the first number in a free-text quantity, keeping the rest:
+    scale_quantity("2 cups", 1.5) -> "3 cups". Text without a number is kept as-is.
+    """
+    if not quantity or factor == 1:
+        return quantity
+    text = str(quantity)
+    match = _QUANTITY.search(text.lower())
+    if not match:
+        return quantity
+
+    amount = parse_amount(match.group(1))
+    if amount is None:
+        return quantity
+    return text[:match.start(1)] + format_amount(amount * factor) + text[match.end(1):]
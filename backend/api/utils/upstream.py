@@ -0,0 +1,249 @@
+import asyncio
+import logging
+import random
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from .tracing import increment
+from .budget import ai_allowed, add_count
+
+
+logger = logging.getLogger(__name__)
+
+# Sliding window of the rate limiter (Gemini quotas are per minute)
+RATE_WINDOW = 60
+CIRCUIT_KEY = "ai_circuit"
+PROBE_KEY = "ai_circuit:probe"
+
+CLOSED = "closed"
+PROBE = "probe"
+
+# When this process last had to turn a call away for the rate limit
+_last_limited = None
+
+
+class RateLimited(Exception):
+    """
+    No upstream call slot within AI_RATE_WAIT seconds.
+    """
+
+
+# -------------------------------------------------
+#  RATE LIMITER (shared cache, sliding window)
+# -------------------------------------------------
+def rate_key(window):
+    return f"ai_rate:{window}"
+
+
+def take_slot():
+    """
+    Counts one upstream call against AI_RATE_LIMIT calls per minute across
+    every worker. A sliding window over two per-minute counters: the
+    previous minute weighs in by the part of it still inside the window,
+    so a full minute's quota can go out in a burst but never more.
+    Only atomic increments, so it works on any cache backend.
+    Returns True if the call may go out now.
+    """
+    now = time.time()
+    window, into = divmod(now, RATE_WINDOW)
+    window = int(window)
+    previous = cache.get(rate_key(window - 1), 0)
+    current = add_count(rate_key(window), 1, RATE_WINDOW * 2)
+    if previous * (1 - into / RATE_WINDOW) + current <= settings.AI_RATE_LIMIT:
+        return True
+    add_count(rate_key(window), -1, RATE_WINDOW * 2)
+    return False
+
+
+def limited():
+    global _last_limited
+    _last_limited = time.monotonic()
+    increment("tipaid_ai_rate_limited_total", {})
+    return RateLimited(f"AI rate limit of {settings.AI_RATE_LIMIT} calls/minute reached")
+
+
+def pause():
+    # Jittered, so waiting workers don't retry in lockstep
+    return random.uniform(0.05, 0.25)
+
+
+def acquire():
+    """
+    Waits up to AI_RATE_WAIT seconds for a call slot; raises RateLimited
+    when there's none.
+    """
+    if not settings.AI_RATE_LIMIT:
+        return
+    deadline = time.monotonic() + settings.AI_RATE_WAIT
+    while not take_slot():
+        if time.monotonic() >= deadline:
+            raise limited()
+        time.sleep(pause())
+
+
+async def aacquire():
+    """
+    acquire() for the event loop.
+    """
+    if not settings.AI_RATE_LIMIT:
+        return
+    deadline = time.monotonic() + settings.AI_RATE_WAIT
+    while not await sync_to_async(take_slot, thread_sensitive=False)():
+        if time.monotonic() >= deadline:
+            raise limited()
+        await asyncio.sleep(pause())
+
+
+# -------------------------------------------------
+#  CIRCUIT BREAKER (shared cache)
+# -------------------------------------------------
+def failure_keys(now):
+    window = int(now // settings.AI_CIRCUIT_WINDOW)
+    return f"ai_calls:{window}", f"ai_failures:{window}"
+
+
+def open_circuit(reason):
+    now = time.time()
+    state = {"opened": now, "until": now + settings.AI_CIRCUIT_COOLDOWN, "reason": reason}
+    # Outlives the cooldown so the next call still probes; expires anyway
+    # if no call ever comes
+    cache.set(CIRCUIT_KEY, state, timeout=settings.AI_CIRCUIT_COOLDOWN * 10)
+    increment("tipaid_ai_circuit_total", {"event": "opened"})
+    logger.warning("AI circuit opened for %ss: %s", settings.AI_CIRCUIT_COOLDOWN, reason)
+
+
+def close_circuit():
+    cache.delete_many([CIRCUIT_KEY, PROBE_KEY, *failure_keys(time.time())])
+    increment("tipaid_ai_circuit_total", {"event": "closed"})
+    logger.info("AI circuit closed")
+
+
+def circuit_open():
+    """
+    True while the breaker is open and cooling down (calls fail fast).
+    """
+    if not settings.AI_CIRCUIT_FAILURES:
+        return False
+    state = cache.get(CIRCUIT_KEY)
+    return state is not None and time.time() < state["until"]
+
+
+def begin_call():
+    """
+    Ticket for one upstream call: CLOSED (go ahead), PROBE (the one call
+    let through after the cooldown to see if the upstream is back) or None
+    (open: fail fast).
+    """
+    if not settings.AI_CIRCUIT_FAILURES:
+        return CLOSED
+    state = cache.get(CIRCUIT_KEY)
+    if state is None:
+        add_count(failure_keys(time.time())[0], 1, settings.AI_CIRCUIT_WINDOW * 2)
+        return CLOSED
+    if time.time() >= state["until"]:
+        # Half-open: one caller across the workers probes
+        probe_timeout = int(settings.AI_TIMEOUT * settings.AI_ATTEMPTS) + 10
+        if cache.add(PROBE_KEY, 1, timeout=probe_timeout):
+            increment("tipaid_ai_circuit_total", {"event": "probe"})
+            return PROBE
+    increment("tipaid_ai_circuit_total", {"event": "rejected"})
+    return None
+
+
+def call_succeeded(ticket):
+    if ticket == PROBE:
+        close_circuit()
+
+
+def call_skipped(ticket):
+    """
+    The call never went out (rate limited): let the next caller probe.
+    """
+    if ticket == PROBE:
+        cache.delete(PROBE_KEY)
+
+
+def call_failed(ticket, error):
+    """
+    A failed probe reopens the breaker. Otherwise it opens once
+    AI_CIRCUIT_FAILURES calls failed within AI_CIRCUIT_WINDOW seconds and
+    they're at least AI_CIRCUIT_FAILURE_RATIO of the calls.
+    """
+    if ticket == PROBE:
+        cache.delete(PROBE_KEY)
+        open_circuit(f"probe failed: {error}")
+        return
+    if ticket != CLOSED:
+        return
+
+    calls_key, failures_key = failure_keys(time.time())
+    failures = add_count(failures_key, 1, settings.AI_CIRCUIT_WINDOW * 2)
+    if failures < settings.AI_CIRCUIT_FAILURES:
+        return
+    calls = cache.get(calls_key) or failures
+    if failures / calls >= settings.AI_CIRCUIT_FAILURE_RATIO and not circuit_open():
+        open_circuit(f"{failures}/{calls} calls failed, last: {error}")
+
+
+def upstream_unavailable():
+    """
+    generate() result when the breaker is open and the model wasn't asked.
+    """
+    return {"success": False, "error": "AI temporarily unavailable", "upstream_unavailable": True}
+
+
+# -------------------------------------------------
+#  DEGRADED MODE
+# -------------------------------------------------
+def ai_available():
+    """
+    ai_allowed(), and the upstream isn't known to be down. Otherwise
+    callers price from the catalog and the cached price history (fresh or
+    stale) alone; see price_history.get_ai_prices(use_ai=False).
+    """
+    return not circuit_open() and ai_allowed()
+
+
+def upstream_degraded():
+    """
+    True while the breaker is open or this process was just rate limited:
+    failures then say nothing about the ingredient, so they aren't cached.
+    """
+    if _last_limited is not None and time.monotonic() - _last_limited < settings.AI_RATE_WAIT + 5:
+        return True
+    return circuit_open()
+
+
+def upstream_status():
+    state = cache.get(CIRCUIT_KEY) if settings.AI_CIRCUIT_FAILURES else None
+    now = time.time()
+    if state is None:
+        circuit = {"state": "closed"}
+    elif now < state["until"]:
+        circuit = {"state": "open", "retry_in": round(state["until"] - now, 1), "reason": state["reason"]}
+    else:
+        circuit = {"state": "half_open", "reason": state["reason"]}
+
+    window = int(now // RATE_WINDOW)
+    return {
+        "circuit": circuit,
+        "rate": {
+            "limit_per_minute": settings.AI_RATE_LIMIT or None,
+            "calls_this_minute": cache.get(rate_key(window), 0),
+        },
+    }
+
+
+def upstream_metrics():
+    """
+    Gauges of the shared breaker and limiter state, in the Prometheus text
+    format (read at scrape time, so every worker reports the same).
+    """
+    status = upstream_status()
+    return "".join([
+        "# TYPE tipaid_ai_circuit_open gauge\n",
+        f"tipaid_ai_circuit_open {1 if status['circuit']['state'] == 'open' else 0}\n",
+        "# TYPE tipaid_ai_rate_calls gauge\n",
+        f"tipaid_ai_rate_calls {status['rate']['calls_this_minute']}\n",
+    ])
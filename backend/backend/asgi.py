@@ -12,13 +12,21 @@ import os
 from django.core.asgi import get_asgi_application
 
 from channels.routing import ProtocolTypeRouter, URLRouter
-from websocket.routing import websocket_urlpatterns
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
+# Sets Django up; the consumers import models, so routing comes after
 http_response_app = get_asgi_application()
 
+from websocket.routing import websocket_urlpatterns  # noqa: E402
+from websocket.middleware import JWTAuthMiddleware  # noqa: E402
+from api.apps import start_services  # noqa: E402
+
+# Catalog, refresher, ledger flusher and warm-up of this server process
+start_services()
+
 application = ProtocolTypeRouter({
     "http": http_response_app,
-    "websocket": URLRouter(websocket_urlpatterns),
+    # ?token=<access token> makes AI usage and throttles per user, not per IP
+    "websocket": JWTAuthMiddleware(URLRouter(websocket_urlpatterns)),
 })
\ No newline at end of file
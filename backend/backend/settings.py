@@ -54,12 +54,34 @@ INSTALLED_APPS = [
     'corsheaders'
 ]
 
+# Throttle rates of the AI endpoints (api/utils/throttling.py), per signed-in
+# user or, for "_anon", per IP: "ai" covers all of them together, the
+# others one endpoint each (its job endpoint included)
+THROTTLE_ENABLED = env.bool("THROTTLE_ENABLED", default=True)
+THROTTLE_RATES = {
+    'ai': env("THROTTLE_AI", default="300/hour"),
+    'ai_anon': env("THROTTLE_AI_ANON", default="60/hour"),
+    'recommendation': env("THROTTLE_RECOMMENDATION", default="30/min"),
+    'recommendation_anon': env("THROTTLE_RECOMMENDATION_ANON", default="10/min"),
+    'ingredients': env("THROTTLE_INGREDIENTS", default="30/min"),
+    'ingredients_anon': env("THROTTLE_INGREDIENTS_ANON", default="10/min"),
+    'meal_plan': env("THROTTLE_MEAL_PLAN", default="10/min"),
+    'meal_plan_anon': env("THROTTLE_MEAL_PLAN_ANON", default="2/min"),
+}
+
 REST_FRAMEWORK = {
 
     'DEFAULT_AUTHENTICATION_CLASSES': (
 
         'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+    ),
+
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.utils.tracing.TracedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+
+    'DEFAULT_THROTTLE_RATES': THROTTLE_RATES if THROTTLE_ENABLED else {},
 
 }
 
@@ -113,6 +135,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'api.utils.tracing.TracingMiddleware',
 ]
 
 ROOT_URLCONF = 'backend.urls'
@@ -144,7 +167,7 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': env("DATABASE_PATH", default=str(BASE_DIR / 'db.sqlite3')),
     }
 }
 
@@ -218,10 +241,196 @@ else:
         }
     }
     
-CACHES = {
-    "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-        "LOCATION": "ai_prices_cache",
-        "TIMEOUT": 60*60*24,  # 24 hours
+# Bump CACHE_VERSION to invalidate every cached entry after a format change
+CACHE_VERSION = env.int("CACHE_VERSION", default=1)
+
+if redis_host and redis_port:
+    # Shared across workers and hosts. Size capping is Redis' job here:
+    # run it with maxmemory and maxmemory-policy allkeys-lru.
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": f"redis://{redis_host}:{redis_port}/1",
+            "KEY_PREFIX": "tipaid",
+            "VERSION": CACHE_VERSION,
+            "TIMEOUT": 60*60*24,  # 24 hours
+        }
     }
+else:
+    # Fallback to a SQLite file every worker on this host shares
+    CACHES = {
+        "default": {
+            "BACKEND": "api.utils.sqlite_cache.SQLiteCache",
+            "LOCATION": env("CACHE_PATH", default=str(BASE_DIR / "cache.sqlite3")),
+            "KEY_PREFIX": "tipaid",
+            "VERSION": CACHE_VERSION,
+            "TIMEOUT": 60*60*24,  # 24 hours
+            "OPTIONS": {
+                "MAX_ENTRIES": env.int("CACHE_MAX_ENTRIES", default=20000),
+                "CULL_FREQUENCY": 10,
+            },
+        }
+    }
+
+# Max number of AI calls a single request keeps in flight, and how long
+# (seconds) a request waits for all of them before giving up on stragglers
+AI_MAX_CONCURRENCY = env.int("AI_MAX_CONCURRENCY", default=8)
+AI_REQUEST_DEADLINE = env.float("AI_REQUEST_DEADLINE", default=30.0)
+
+# Ingredients priced per AI call in batch mode (1 disables batching)
+AI_PRICE_BATCH_SIZE = env.int("AI_PRICE_BATCH_SIZE", default=10)
+
+# Which catalog CSV prices each recommendation store. DTI suggested retail
+# prices stand in for local market prices.
+CATALOG_STORE_MAP = {
+    "osave": "osave",
+    "dali": "dali",
+    "pampanga_market": "dti",
+}
+
+# Fuzzy ingredient -> catalog product matching
+MATCH_TOP_K = env.int("MATCH_TOP_K", default=10)
+MATCH_THRESHOLD = env.float("MATCH_THRESHOLD", default=0.6)
+# One-word ingredient names share trigrams with unrelated words by chance:
+# below this they only match rows that contain the word whole
+MATCH_SHORT_THRESHOLD = env.float("MATCH_SHORT_THRESHOLD", default=0.75)
+
+# Catalog quotes needing more packs than this are treated as misses
+CATALOG_MAX_PACKS = env.int("CATALOG_MAX_PACKS", default=12)
+
+# Compiled catalog (manage.py compile_catalog) that workers memory-map, and
+# how often (seconds) each worker checks it for a new version; 0 disables
+CATALOG_SNAPSHOT_PATH = env("CATALOG_SNAPSHOT_PATH", default=str(BASE_DIR / "catalog.snapshot"))
+CATALOG_WATCH_INTERVAL = env.float("CATALOG_WATCH_INTERVAL", default=2.0)
+
+# Single-flight: how long duplicate callers wait on the in-flight AI call
+# (seconds), how long its result stays visible to other processes, and how
+# often they check for it
+SINGLE_FLIGHT_WAIT = env.float("SINGLE_FLIGHT_WAIT", default=60.0)
+SINGLE_FLIGHT_RESULT_TTL = env.int("SINGLE_FLIGHT_RESULT_TTL", default=15)
+SINGLE_FLIGHT_POLL_INTERVAL = env.float("SINGLE_FLIGHT_POLL_INTERVAL", default=0.1)
+
+# Dish ingredient cache: lists are generated for DISH_CACHE_BASE_PEOPLE people
+# and scaled to the requested count locally
+DISH_CACHE_BASE_PEOPLE = 4
+DISH_CACHE_TTL = env.int("DISH_CACHE_TTL", default=60*60*24*7)  # 1 week
+DISH_CACHE_WARM_ON_STARTUP = env.bool("DISH_CACHE_WARM_ON_STARTUP", default=False)
+POPULAR_DISHES = env.list("POPULAR_DISHES", default=[
+    "Adobo", "Sinigang", "Tinola", "Kare-Kare", "Sisig", "Menudo", "Caldereta",
+    "Afritada", "Nilaga", "Pancit Canton", "Lumpia", "Bicol Express", "Pinakbet",
+    "Arroz Caldo", "Lechon Kawali", "Bistek Tagalog", "Ginataang Gulay",
+    "Chicken Curry", "Filipino Spaghetti", "Giniling",
+])
+
+# Gemini API key; without one the app runs catalog-only and AI calls fail
+AI_KEY = env("AI_KEY", default=None)
+
+# "fake" answers every AI call offline with canned JSON after AI_FAKE_LATENCY
+# seconds, failing AI_FAKE_FAILURE_RATE of them (benchmarks, load tests)
+AI_BACKEND = env("AI_BACKEND", default="gemini")
+AI_FAKE_LATENCY = env.float("AI_FAKE_LATENCY", default=0.3)
+AI_FAKE_FAILURE_RATE = env.float("AI_FAKE_FAILURE_RATE", default=0.0)
+
+# Ask Gemini for bare JSON (with a response schema where one fits)
+AI_JSON_MODE = env.bool("AI_JSON_MODE", default=True)
+
+# Gemini client: per-call timeout (seconds), attempts per call including
+# retries, and max model calls in flight per process
+AI_MODEL = env("AI_MODEL", default="models/gemini-2.5-flash")
+AI_TIMEOUT = env.float("AI_TIMEOUT", default=20.0)
+AI_ATTEMPTS = env.int("AI_ATTEMPTS", default=3)
+AI_GLOBAL_CONCURRENCY = env.int("AI_GLOBAL_CONCURRENCY", default=32)
+
+# Ingredients per AI call when streaming over the websocket; smaller batches
+# mean earlier first results
+AI_STREAM_BATCH_SIZE = env.int("AI_STREAM_BATCH_SIZE", default=3)
+
+# Share of requests (0-1) whose hot-path spans are timed; 0 turns tracing
+# off. Sampled responses carry a Server-Timing header if enabled
+TRACING_SAMPLE_RATE = env.float("TRACING_SAMPLE_RATE", default=0.0)
+TRACING_SERVER_TIMING = env.bool("TRACING_SERVER_TIMING", default=False)
+
+# Most stores the optimizer will split a basket across
+OPTIMIZER_MAX_STORES = env.int("OPTIMIZER_MAX_STORES", default=2)
+
+# Background jobs: worker threads per process, how long job records and
+# results are kept (seconds), and where the queue lives (Redis when
+# configured, else a SQLite file shared by the workers on this host).
+# A running job's lease is renewed every JOB_LEASE/3 seconds; a job whose
+# lease runs out (its worker died) is run again, at most JOB_MAX_ATTEMPTS
+# times in all
+JOB_WORKERS = env.int("JOB_WORKERS", default=4)
+JOB_RESULT_TTL = env.int("JOB_RESULT_TTL", default=60*60)
+JOB_LEASE = env.float("JOB_LEASE", default=60.0)
+JOB_MAX_ATTEMPTS = env.int("JOB_MAX_ATTEMPTS", default=3)
+JOB_POLL_INTERVAL = env.float("JOB_POLL_INTERVAL", default=0.2)
+JOB_QUEUE_PATH = env("JOB_QUEUE_PATH", default=str(BASE_DIR / "jobs.sqlite3"))
+JOB_QUEUE_REDIS_URL = f"redis://{redis_host}:{redis_port}/2" if redis_host and redis_port else None
+
+# Send the shared prompt instructions once per model as Gemini's
+# system_instruction (see api/utils/prompts.py); off, they're prepended to
+# every prompt instead
+AI_SYSTEM_INSTRUCTIONS = env.bool("AI_SYSTEM_INSTRUCTIONS", default=True)
+
+# Daily AI token budgets (prompt + output) per user or IP and for the whole
+# app; 0 means unlimited. Past a budget, answers come from the catalog alone
+AI_TOKEN_BUDGET_PER_USER = env.int("AI_TOKEN_BUDGET_PER_USER", default=0)
+AI_TOKEN_BUDGET_GLOBAL = env.int("AI_TOKEN_BUDGET_GLOBAL", default=0)
+
+# Price history: AI prices are served from the cache/database while younger
+# than PRICE_FRESH_TTL, served and refreshed in the background up to
+# PRICE_STALE_TTL, and failures are remembered for PRICE_NEGATIVE_TTL only
+# (seconds). Every PRICE_REFRESH_INTERVAL the PRICE_REFRESH_BATCH most
+# requested ingredients older than PRICE_REFRESH_AGE are re-priced (0 = off)
+PRICE_HISTORY_ENABLED = env.bool("PRICE_HISTORY_ENABLED", default=True)
+PRICE_FRESH_TTL = env.int("PRICE_FRESH_TTL", default=60*60*12)
+PRICE_STALE_TTL = env.int("PRICE_STALE_TTL", default=60*60*24*7)
+PRICE_NEGATIVE_TTL = env.int("PRICE_NEGATIVE_TTL", default=5*60)
+PRICE_REFRESH_INTERVAL = env.int("PRICE_REFRESH_INTERVAL", default=10*60)
+PRICE_REFRESH_AGE = env.int("PRICE_REFRESH_AGE", default=60*60*10)
+PRICE_REFRESH_BATCH = env.int("PRICE_REFRESH_BATCH", default=50)
+
+# Production server (manage.py serve): worker processes (0 = one per CPU
+# core), listen backlog, and seconds workers get to finish on shutdown
+SERVE_WORKERS = env.int("SERVE_WORKERS", default=0)
+SERVE_BACKLOG = env.int("SERVE_BACKLOG", default=2048)
+SERVE_GRACEFUL_TIMEOUT = env.int("SERVE_GRACEFUL_TIMEOUT", default=30)
+
+# In-process (L1) cache of ingredient prices in front of the shared cache:
+# max entries and seconds an entry is kept. Writes are broadcast over the
+# channel layer (Redis) so other workers drop their copies; 0 turns L1 off
+PRICE_L1_SIZE = env.int("PRICE_L1_SIZE", default=10000)
+PRICE_L1_TTL = env.int("PRICE_L1_TTL", default=60)
+
+# Most dishes/ingredient lists in one meal plan request (generate/plan/)
+MEAL_PLAN_MAX_DISHES = env.int("MEAL_PLAN_MAX_DISHES", default=21)
+
+# Gemini protection (see api/utils/upstream.py). AI_RATE_LIMIT: upstream
+# calls per minute across all workers, matched to the API quota (0 = off);
+# a call waits at most AI_RATE_WAIT seconds for a slot. The circuit breaker
+# opens after AI_CIRCUIT_FAILURES failed calls (at least
+# AI_CIRCUIT_FAILURE_RATIO of the calls) within AI_CIRCUIT_WINDOW seconds,
+# fails fast for AI_CIRCUIT_COOLDOWN seconds, then lets one call probe
+# (AI_CIRCUIT_FAILURES=0 turns it off)
+AI_RATE_LIMIT = env.int("AI_RATE_LIMIT", default=0)
+AI_RATE_WAIT = env.float("AI_RATE_WAIT", default=2.0)
+AI_CIRCUIT_FAILURES = env.int("AI_CIRCUIT_FAILURES", default=5)
+AI_CIRCUIT_FAILURE_RATIO = env.float("AI_CIRCUIT_FAILURE_RATIO", default=0.5)
+AI_CIRCUIT_WINDOW = env.int("AI_CIRCUIT_WINDOW", default=30)
+AI_CIRCUIT_COOLDOWN = env.int("AI_CIRCUIT_COOLDOWN", default=30)
+
+# How often (seconds) each worker writes the per-user AI call and token
+# counters to the usage ledger (AIUsage); 0 = never
+AI_USAGE_FLUSH_INTERVAL = env.int("AI_USAGE_FLUSH_INTERVAL", default=60)
+
+# Level of the app's own log messages (api.*, websocket.*) on the console
+LOG_LEVEL = env("LOG_LEVEL", default="INFO")
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "api": {"handlers": ["console"], "level": LOG_LEVEL},
+        "websocket": {"handlers": ["console"], "level": LOG_LEVEL},
+    },
 }
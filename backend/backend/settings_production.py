@@ -0,0 +1,31 @@
+"""
+Production profile: python manage.py serve --settings=backend.settings_production
+
+Same as settings.py, minus the development conveniences. Set ALLOWED_HOSTS
+in the environment; with DEBUG off Django rejects every other host.
+"""
+
+from .settings import *  # noqa: F401,F403
+
+
+# Also stops Django from keeping every SQL query of a request in memory
+# (connection.queries)
+DEBUG = False
+
+# JSON only, no browsable API pages
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.utils.tracing.TracedJSONRenderer',
+    ),
+}
+
+# Several worker processes write the price history: WAL so readers don't
+# wait on writers, and take the write lock up front instead of failing
+# with "database is locked" halfway through a transaction
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    DATABASES['default']['OPTIONS'] = {
+        'timeout': 20,
+        'transaction_mode': 'IMMEDIATE',
+        'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;',
+    }
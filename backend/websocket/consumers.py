@@ -1,10 +1,27 @@
+import asyncio
 import json
+import time
+from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from django.conf import settings
+from api.utils.catalog import catalog_quote, needs_ai, merge_prices
+from api.utils.dish_cache import get_dish_ingredients
+from api.utils.price_history import aget_ai_prices
+from api.utils.recommend import parse_ingredients, price_entry, summarize_recommendation
+from api.utils.budget import charge_to, requester_of_scope
+from api.utils.upstream import ai_available
+from api.utils.throttling import check
+
+
+def catalog_quotes(items):
+    return [catalog_quote(name, quantity) for name, quantity in items]
+
 
 class MyWebSocketConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         self.id = self.scope['url_route']['kwargs']['id']
+        self.job = None
         await self.channel_layer.group_add(
             f'group_{self.id}',
             self.channel_name
@@ -15,11 +32,156 @@ class MyWebSocketConsumer(AsyncWebsocketConsumer):
         }))
 
     async def disconnect(self, close_code):
+        if self.job and not self.job.done():
+            self.job.cancel()
+
         await self.channel_layer.group_discard(
             f'group_{self.id}',
             self.channel_name
         )
-        
+
         await self.close()
 
-    
\ No newline at end of file
+    async def receive(self, text_data=None, bytes_data=None):
+        """
+        Starts a recommendation job. Send {"dish": ..., "people": ...} or
+        {"ingredients": [{"name": ..., "quantity": ...}], "budget": ...}.
+        """
+        try:
+            data = json.loads(text_data or "")
+        except json.JSONDecodeError:
+            await self.send(text_data=json.dumps({'type': 'error', 'error': 'Invalid JSON.'}))
+            return
+
+        if not isinstance(data, dict):
+            await self.send(text_data=json.dumps({'type': 'error', 'error': 'Expected a JSON object.'}))
+            return
+
+        if self.job and not self.job.done():
+            await self.send(text_data=json.dumps({'type': 'error', 'error': 'A recommendation is already running.'}))
+            return
+
+        # Same throttles as the recommendation endpoint
+        user = self.scope.get('user')
+        authenticated = user is not None and user.is_authenticated
+        wait = await sync_to_async(check, thread_sensitive=False)(
+            ['ai', 'recommendation'], requester_of_scope(self.scope), authenticated, time.time()
+        )
+        if wait is not None:
+            await self.send(text_data=json.dumps({
+                'type': 'error', 'error': 'Request was throttled.', 'retry_after': round(wait),
+            }))
+            return
+
+        self.job = asyncio.ensure_future(self.run_charged(data))
+
+    async def broadcast(self, payload):
+        # Every connection in the group (e.g. other tabs) gets the progress
+        await self.channel_layer.group_send(
+            f'group_{self.id}',
+            {'type': 'recommendation.progress', 'payload': payload}
+        )
+
+    async def recommendation_progress(self, event):
+        await self.send(text_data=json.dumps(event['payload']))
+
+    async def run_charged(self, data):
+        # AI calls count against this connection's token budget
+        with charge_to(requester_of_scope(self.scope)):
+            await self.run_recommendation(data)
+
+    async def run_recommendation(self, data):
+        """
+        Pushes each ingredient's prices as soon as they're known, then the
+        store recommendation and totals.
+        """
+        people = data.get("people", 1)
+        budget = data.get("budget")
+        dish = data.get("dish")
+        ingredients_list = data.get("ingredients")
+
+        try:
+            people = int(people)
+        except (TypeError, ValueError):
+            await self.broadcast({'type': 'error', 'error': 'People must be a number.'})
+            return
+        if people < 1:
+            await self.broadcast({'type': 'error', 'error': 'People must be at least 1.'})
+            return
+
+        try:
+            budget = float(budget) if budget else None
+        except (TypeError, ValueError):
+            await self.broadcast({'type': 'error', 'error': 'Budget must be a number.'})
+            return
+
+        if ingredients_list is None and dish:
+            generated = await sync_to_async(get_dish_ingredients, thread_sensitive=False)(dish, people)
+            if not generated["success"]:
+                await self.broadcast({'type': 'error', 'error': generated["error"]})
+                return
+            ingredients_list = generated["ingredients"]
+            await self.broadcast({'type': 'ingredients', 'dish': dish, 'people': people, 'ingredients': ingredients_list})
+
+        if not isinstance(ingredients_list, list):
+            await self.broadcast({'type': 'error', 'error': 'Send a dish or a list of ingredients.'})
+            return
+
+        items = parse_ingredients(ingredients_list)
+        # Catalog matching is CPU work; keep it off the event loop
+        quotes = await sync_to_async(catalog_quotes, thread_sensitive=False)(items)
+        entries = [None] * len(items)
+
+        async def publish(i, prices):
+            name, quantity = items[i]
+            entries[i] = price_entry(name, quantity, prices, quotes[i][1])
+            await self.broadcast({'type': 'ingredient', 'index': i, 'ingredient': entries[i]})
+
+        # Catalog hits go out right away
+        misses = []
+        for i, (prices, _) in enumerate(quotes):
+            if needs_ai(prices):
+                misses.append(i)
+            else:
+                await publish(i, prices)
+
+        # Small AI batches so the first results arrive after a single call
+        size = max(1, settings.AI_STREAM_BATCH_SIZE)
+        chunks = [misses[j:j + size] for j in range(0, len(misses), size)]
+
+        # Token budget spent or the AI down: the catalog and the cached price
+        # history are the whole answer
+        use_ai = await sync_to_async(ai_available, thread_sensitive=False)()
+
+        async def price_chunk(chunk):
+            return chunk, await aget_ai_prices([items[i] for i in chunk], chunk_size=size, use_ai=use_ai)
+
+        tasks = [asyncio.ensure_future(price_chunk(chunk)) for chunk in chunks]
+        try:
+            for next_done in asyncio.as_completed(tasks, timeout=settings.AI_REQUEST_DEADLINE):
+                try:
+                    chunk, ai_prices = await next_done
+                except asyncio.TimeoutError:
+                    break
+                except Exception:
+                    continue
+                for i, prices in zip(chunk, ai_prices):
+                    merged = merge_prices(quotes[i][0], prices)
+                    if merged is not None:
+                        await publish(i, merged)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        # Whatever the AI couldn't price: catalog prices if any, else report it
+        for i in misses:
+            if entries[i] is not None:
+                continue
+            if quotes[i][0] is not None:
+                await publish(i, quotes[i][0])
+            else:
+                await self.broadcast({'type': 'ingredient_failed', 'index': i, 'name': items[i][0]})
+
+        result = [entry for entry in entries if entry is not None]
+        summary = await sync_to_async(summarize_recommendation, thread_sensitive=False)(result, budget)
+        await self.broadcast({'type': 'recommendation', 'ingredients': result, **summary, 'catalog_only': not use_ai})
@@ -0,0 +1,45 @@
+from urllib.parse import parse_qs
+from django.contrib.auth.models import AnonymousUser
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+
+def token_of(scope):
+    """
+    The access token of a websocket handshake: ?token=<jwt> (browsers can't
+    set headers on a websocket) or an "Authorization: Bearer <jwt>" header.
+    """
+    token = parse_qs(scope.get("query_string", b"").decode()).get("token")
+    if token:
+        return token[0]
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            parts = value.decode().split()
+            if len(parts) == 2 and parts[0].lower() == "bearer":
+                return parts[1]
+    return None
+
+
+class JWTAuthMiddleware:
+    """
+    Sets scope["user"] from the handshake's JWT, like the throttled AI
+    views do (JWTStatelessUserAuthentication: the token's claims, no
+    database query). No or an invalid token means an anonymous user.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.authentication = JWTStatelessUserAuthentication()
+
+    def user_of(self, scope):
+        raw = token_of(scope)
+        if raw is None:
+            return AnonymousUser()
+        try:
+            return self.authentication.get_user(self.authentication.get_validated_token(raw))
+        except (InvalidToken, TokenError):
+            return AnonymousUser()
+
+    async def __call__(self, scope, receive, send):
+        scope = dict(scope, user=self.user_of(scope))
+        return await self.app(scope, receive, send)
@@ -0,0 +1,73 @@
+import asyncio
+from unittest import mock
+
+import pandas as pd
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.test import SimpleTestCase, override_settings
+
+from api.tests import LOCMEM, NO_THROTTLES
+from api.utils import catalog as catalog_module
+from api.utils.catalog import Catalog, set_catalog
+from .middleware import JWTAuthMiddleware
+from .routing import websocket_urlpatterns
+
+
+PRICES = {"osave": 10.0, "dali": 12.0, "pampanga_market": 8.0}
+# Seconds the fake AI takes per ingredient
+DELAYS = {"Garlic": 0.3, "Vinegar": 0.05}
+
+
+async def fake_ai_prices(items, chunk_size=None, use_ai=True):
+    await asyncio.sleep(max(DELAYS[name] for name, _ in items))
+    return [dict(PRICES) for _ in items]
+
+
+@override_settings(CACHES=LOCMEM, REST_FRAMEWORK=NO_THROTTLES, AI_STREAM_BATCH_SIZE=1, AI_REQUEST_DEADLINE=5)
+class RecommendationStreamTests(SimpleTestCase):
+    def setUp(self):
+        self.addCleanup(set_catalog, catalog_module._catalog)
+        columns = ["Category", "Brand", "Product", "Weight", "Price"]
+        set_catalog(Catalog.from_frames({
+            store: pd.DataFrame([["Rice & Grains", "Local", "Rice", "1kg", 60.0]], columns=columns)
+            for store in ("osave", "dali", "dti")
+        }))
+        for patcher in (
+            mock.patch("websocket.consumers.aget_ai_prices", side_effect=fake_ai_prices),
+            mock.patch("websocket.consumers.ai_available", return_value=True),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def test_prices_stream_as_they_are_known(self):
+        application = JWTAuthMiddleware(URLRouter(websocket_urlpatterns))
+        communicator = WebsocketCommunicator(application, "/ws/some_path/test/")
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        self.assertEqual(await communicator.receive_json_from(), {"message": "WebSocket connection established"})
+
+        await communicator.send_json_to({"ingredients": [
+            {"name": "Garlic", "quantity": "3 cloves"},
+            {"name": "Rice", "quantity": "1 kg"},
+            {"name": "Vinegar", "quantity": "1 l"},
+        ]})
+        messages = [await communicator.receive_json_from(timeout=3) for _ in range(4)]
+        await communicator.disconnect()
+
+        # The catalog hit first, then the AI answers as they arrive, the
+        # summary last
+        self.assertEqual([m["type"] for m in messages], ["ingredient"] * 3 + ["recommendation"])
+        self.assertEqual([m["ingredient"]["name"] for m in messages[:3]], ["Rice", "Vinegar", "Garlic"])
+        self.assertEqual([m["index"] for m in messages[:3]], [1, 2, 0])
+        self.assertEqual(len(messages[3]["ingredients"]), 3)
+        self.assertFalse(messages[3]["catalog_only"])
+
+    async def test_invalid_json_is_an_error(self):
+        application = JWTAuthMiddleware(URLRouter(websocket_urlpatterns))
+        communicator = WebsocketCommunicator(application, "/ws/some_path/test/")
+        await communicator.connect()
+        await communicator.receive_json_from()
+
+        await communicator.send_to(text_data="{")
+        self.assertEqual(await communicator.receive_json_from(), {"type": "error", "error": "Invalid JSON."})
+        await communicator.disconnect()